@@ -1,11 +1,38 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import numpy_financial as npf
-import plotly.express as px
 import plotly.graph_objects as go
+import collections
 import datetime
+import inspect
 import io
+import json
+import os
+import time
+
+_RERUN_T0 = time.perf_counter()
+
+from engine import (
+    CONST_TYPES,
+    FIVE_CASES_DATA,
+    MODEL_EPOCH,
+    OFFICIAL_STANDARD,
+    STATISTICS_AVG,
+    PARKING_GFA_PER_SPACE,
+    ModelParams,
+    evaluate,
+    get_risk_fee_rate,
+)
+from cases import DEVELOPER_TYPES, MODEL_RATE_FIELDS, CaseFilter, CaseStore
+from comparables import ComparableIndex, ProjectProfile, comparable_rates
+from downsample import downsample_grid
+from excel_stream import write_excel
+from memo import LRUCache, params_key
+from profiler import ALLOC_ENV_FLAG, RerunProfiler, chrome_trace, env_enabled
+from risk_fee import DEFAULT_SCHEDULE
+
+# plotly.express 與各標籤頁專用的分析模組於首次使用時才匯入，縮短冷啟動時間；
+# 匯入成本可用 `python benchmarks/bench_startup.py` 量測
 
 # ============================================================================
 # 🎨 頁面設定與主題
@@ -17,96 +44,14 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# ============================================================================
-# 📊 五案件統計數據（論文3.2.2節）
-# ============================================================================
-FIVE_CASES_DATA = {
-    "案件1": {
-        "location": "蘆洲光華965",
-        "area_ping": 941.985,
-        "floors": "17F+16F+B4",
-        "developer": "更新會",
-        "total_cost": 2056098558,
-        "demolition_pct": 2.35,
-        "reloc_comp_pct": 8.45,
-        "design_fee_pct": 1.80,
-        "loan_interest_pct": 6.12,
-        "tax_pct": 0.10,
-        "mgmt_fee_pct": 33.81,
-    },
-    "案件2": {
-        "location": "新莊思源段",
-        "area_ping": 603.4633,
-        "floors": "15F+B5",
-        "developer": "建設公司",
-        "total_cost": 1392840119,
-        "demolition_pct": 5.75,
-        "reloc_comp_pct": 5.59,
-        "design_fee_pct": 3.13,
-        "loan_interest_pct": 5.24,
-        "tax_pct": 3.74,
-        "mgmt_fee_pct": 30.42,
-    },
-    "案件3": {
-        "location": "新店316",
-        "area_ping": 500.731,
-        "floors": "19F+B4",
-        "developer": "建設公司",
-        "total_cost": 1422714391,
-        "demolition_pct": 3.54,
-        "reloc_comp_pct": 6.25,
-        "design_fee_pct": 2.41,
-        "loan_interest_pct": 5.19,
-        "tax_pct": 5.30,
-        "mgmt_fee_pct": 30.39,
-    },
-    "案件4": {
-        "location": "三重381",
-        "area_ping": 1098.284,
-        "floors": "23F+B5",
-        "developer": "建設公司",
-        "total_cost": 2881408210,
-        "demolition_pct": 2.00,
-        "reloc_comp_pct": 5.00,
-        "design_fee_pct": 2.05,
-        "loan_interest_pct": 5.00,
-        "tax_pct": 4.00,
-        "mgmt_fee_pct": 32.00,
-    },
-    "案件5": {
-        "location": "淡水930",
-        "area_ping": 584.403,
-        "floors": "14F+B5",
-        "developer": "更新會",
-        "total_cost": 1422332224,
-        "demolition_pct": 0.0,  # 原地安置
-        "reloc_comp_pct": 0.0,  # 原地安置
-        "design_fee_pct": 1.89,
-        "loan_interest_pct": 5.00,
-        "tax_pct": 0.10,
-        "mgmt_fee_pct": 27.00,
-    }
-}
-
-# 統計平均值（論文表3-2）
-STATISTICS_AVG = {
-    "demolition_pct": 3.41,
-    "reloc_comp_pct": 6.32,
-    "design_fee_pct": 2.26,
-    "loan_interest_pct": 5.31,
-    "tax_pct": 4.35,
-    "mgmt_fee_pct": 30.72,
-}
-
-# 官方基準（論文表3-2）
-OFFICIAL_STANDARD = {
-    "demolition_pct": 3.50,
-    "reloc_comp_pct": 7.00,
-    "design_fee_pct": 2.50,
-    "loan_interest_pct": 5.50,
-    "tax_pct": 4.00,
-    "mgmt_fee_pct": 30.00,
-}
+# 效能剖析：網址加上 ?profile=1（或設定環境變數 APP_PROFILE=1）啟用；記憶體配置會對整個行程啟動
+# tracemalloc，只能由伺服器端 APP_PROFILE_ALLOC=1 開啟。停用時各 checkpoint / section 直接返回
+prof = RerunProfiler(
+    enabled=env_enabled() or st.query_params.get("profile") == "1",
+    track_alloc=env_enabled(ALLOC_ENV_FLAG),
+    t0=_RERUN_T0,
+)
+prof.checkpoint("CSS 注入")
 
 # ============================================================================
 # 🎨 現代化 CSS 設計系統
@@ -365,6 +310,7 @@ st.markdown(
 # ============================================================================
 # 📋 標題與說明區
 # ============================================================================
+prof.checkpoint("標題與說明")
 col_title, col_emoji = st.columns([0.95, 0.05])
 with col_title:
     st.title("🏙️ 新北市防災都更權利變換試算模型")
@@ -386,6 +332,7 @@ st.info(
 # ============================================================================
 # ⚙️ 側邊欄：參數設定（組織優化）
 # ============================================================================
+prof.checkpoint("側邊欄")
 st.sidebar.markdown(
     """
     <div style='background: linear-gradient(135deg, #2E7D87 0%, #4A9FB5 100%); 
@@ -408,9 +355,13 @@ case_reference = st.sidebar.selectbox(
 
 # 根據選擇載入案件數據
 if case_reference != "自訂設定":
-    case_key = f"案件{case_reference[0]}"
+    case_key = case_reference.split()[0]
     case_data = FIVE_CASES_DATA[case_key]
-    st.sidebar.success(f"✅ 已載入 {case_data['location']} 的參考參數")
+    st.sidebar.success(
+        f"✅ 已套用 {case_data['location']} 的費率：拆遷補償 {case_data['demolition_pct']:.2f}%、"
+        f"拆遷安置 {case_data['reloc_comp_pct']:.2f}%、設計費 {case_data['design_fee_pct']:.2f}%、"
+        f"稅捐 {case_data['tax_pct']:.2f}%"
+    )
 
 # ========== 1. 基地與容積 ==========
 with st.sidebar.expander("1️⃣ 基地與容積參數", expanded=True):
@@ -432,16 +383,10 @@ with st.sidebar.expander("1️⃣ 基地與容積參數", expanded=True):
 with st.sidebar.expander("2️⃣ 營建與建材設定", expanded=True):
     const_type = st.selectbox(
         "建材結構等級",
-        ["RC 一般標準 (S0)", "RC 高階 (+0.11)", "SRC/SC (+0.30)"],
+        list(CONST_TYPES),
         help="選擇建築結構類型"
     )
-
-    if "高階" in const_type:
-        mat_coeff = 0.11
-    elif "SRC" in const_type:
-        mat_coeff = 0.30
-    else:
-        mat_coeff = 0.0
+    mat_coeff = CONST_TYPES[const_type]
 
     base_unit_cost = st.number_input("營建基準單價 (萬/坪)", value=16.23, step=0.5, help="基準營建成本")
     final_unit_cost = base_unit_cost * (1 + mat_coeff)
@@ -481,30 +426,6 @@ with st.sidebar.expander("3️⃣ 財務與風險參數", expanded=True):
         dev_months = st.number_input("開發期程 (月)", value=48, step=6, help="開發期程")
 
     # ===== 風險費率查表 =====
-    def get_risk_fee_rate(gfa_ping: float, owners: int) -> float:
-        """風險管理費率查表（表3-1）"""
-        if gfa_ping <= 2500:
-            if owners < 30:
-                return 0.12
-            elif owners <= 100:
-                return 0.125
-            else:
-                return 0.13
-        elif gfa_ping <= 7500:
-            if owners < 30:
-                return 0.125
-            elif owners <= 100:
-                return 0.13
-            else:
-                return 0.135
-        else:
-            if owners < 30:
-                return 0.13
-            elif owners <= 100:
-                return 0.135
-            else:
-                return 0.14
-
     area_far_temp = base_area * far_base_exist * bonus_multiplier
     area_total_temp = area_far_temp * coeff_gfa
     risk_rate = get_risk_fee_rate(area_total_temp, num_owners)
@@ -519,6 +440,9 @@ with st.sidebar.expander("3️⃣ 財務與風險參數", expanded=True):
         """,
         unsafe_allow_html=True,
     )
+    with st.popover("📋 查看表 3-1"):
+        st.caption(f"{DEFAULT_SCHEDULE.name}（可以環境變數 RISK_FEE_SCHEDULE 指定費率表檔案）")
+        st.dataframe(DEFAULT_SCHEDULE.to_frame().map(lambda r: f"{r * 100:.1f}%"))
 
 # ========== 4. 進階費用 ==========
 with st.sidebar.expander("4️⃣ 進階費用設定 (B/G/H 類)", expanded=False):
@@ -532,19 +456,48 @@ with st.sidebar.expander("5️⃣ 估價與銷售參數", expanded=False):
     price_unit_sale = st.number_input("更新後預售單價 (萬/坪)", value=60.0, step=2.0, help="預售單價")
     price_parking = st.number_input("車位單價 (萬/個)", value=220, step=10, help="停車位單價")
 
+# ========== 5.4 參考案件資料庫 ==========
+# 資料庫連線跨重跑保留；統計結果依篩選條件快取於 CaseStore
+if "case_store" not in st.session_state:
+    st.session_state["case_store"] = CaseStore.open_default()
+case_store = st.session_state["case_store"]
+
+with st.sidebar.expander("🗂️ 參考案件資料庫", expanded=False):
+    case_developer = st.selectbox("實施主體", ["全部", *DEVELOPER_TYPES], help="篩選參考案件的實施主體")
+    case_districts = st.multiselect("行政區", case_store.districts(), help="未選擇表示不限")
+    col_ca, col_cb = st.columns(2)
+    with col_ca:
+        case_min_area = st.number_input("基地面積下限 (坪)", value=0.0, step=100.0, min_value=0.0, help="0 表示不限")
+    with col_cb:
+        case_max_area = st.number_input("基地面積上限 (坪)", value=0.0, step=100.0, min_value=0.0, help="0 表示不限")
+    case_filter = CaseFilter(
+        districts=tuple(case_districts),
+        developer=None if case_developer == "全部" else case_developer,
+        min_area=case_min_area or None,
+        max_area=case_max_area or None,
+    )
+    case_stats = case_store.aggregate(case_filter)
+    if case_stats.count:
+        st.caption(f"符合條件 {case_stats.count:,} 件（資料庫共 {len(case_store):,} 件），平均費率套用至模型")
+    else:
+        st.warning("沒有符合條件的案件，沿用論文統計平均")
+    # 篩選結果缺少的項目（例如全為原地安置）沿用論文統計平均
+    case_rates = case_stats.model_rates(STATISTICS_AVG)
+    case_avg = {k: (v if v is not None else STATISTICS_AVG[k]) for k, v in case_stats.mean.items()}
+
 # ========== 5.5 五案件統計對標 ==========
 with st.sidebar.expander("📊 五案件統計對標", expanded=False):
     st.markdown("#### 費用項目統計對比（單位：%）")
     
     comparison_df = pd.DataFrame({
         "費用項目": ["拆遷補償", "拆遷安置", "設計費", "貸款利息", "稅捐", "管理費"],
-        "五案件平均": [
-            f"{STATISTICS_AVG['demolition_pct']:.2f}%",
-            f"{STATISTICS_AVG['reloc_comp_pct']:.2f}%",
-            f"{STATISTICS_AVG['design_fee_pct']:.2f}%",
-            f"{STATISTICS_AVG['loan_interest_pct']:.2f}%",
-            f"{STATISTICS_AVG['tax_pct']:.2f}%",
-            f"{STATISTICS_AVG['mgmt_fee_pct']:.2f}%",
+        f"篩選案件平均 (n={case_stats.count})": [
+            f"{case_avg['demolition_pct']:.2f}%",
+            f"{case_avg['reloc_comp_pct']:.2f}%",
+            f"{case_avg['design_fee_pct']:.2f}%",
+            f"{case_avg['loan_interest_pct']:.2f}%",
+            f"{case_avg['tax_pct']:.2f}%",
+            f"{case_avg['mgmt_fee_pct']:.2f}%",
         ],
         "官方基準": [
             f"{OFFICIAL_STANDARD['demolition_pct']:.2f}%",
@@ -576,93 +529,376 @@ with st.sidebar.expander("📊 五案件統計對標", expanded=False):
 # 🔧 核心計算模型與工具函式
 # ============================================================================
 
+def model_params() -> ModelParams:
+    """由側邊欄參數組成 ModelParams"""
+    return ModelParams(
+        base_area=base_area,
+        far_base_exist=far_base_exist,
+        bonus_multiplier=bonus_multiplier,
+        coeff_gfa=coeff_gfa,
+        coeff_sale=coeff_sale,
+        final_unit_cost=final_unit_cost,
+        num_owners=num_owners,
+        loan_ratio=loan_ratio,
+        rate_personnel=rate_personnel,
+        rate_sales=rate_sales,
+        loan_rate=loan_rate,
+        dev_months=dev_months,
+        cost_bonus_app=cost_bonus_app,
+        cost_urban_plan=cost_urban_plan,
+        cost_transfer=cost_transfer,
+        price_unit_sale=price_unit_sale,
+        price_parking=price_parking,
+        **case_rates,
+    )
+
+
 def calculate_model():
-    """核心財務模型計算 - 整合五案件費率"""
-    # 1. 面積計算
-    area_far = base_area * far_base_exist * bonus_multiplier
-    area_total = area_far * coeff_gfa
-    area_sale = area_far * coeff_sale
-    num_parking = int(area_total / 35)
+    """核心財務模型計算 - 交給 engine.evaluate"""
+    return evaluate(model_params())
 
-    # 2. 工程費（使用五案件平均或官方基準）
-    c_demo = area_total * STATISTICS_AVG['demolition_pct'] / 100  # 改用統計百分比
-    c_build = area_total * final_unit_cost
-    c_engineering = c_demo + c_build
 
-    # 3. 進階費用
-    c_advanced = cost_bonus_app + cost_urban_plan + cost_transfer
+def build_cost_table(res_dict: dict) -> pd.DataFrame:
+    """成本結構表（TAB 1）"""
+    df_cost = pd.DataFrame(
+        {
+            "項目": list(res_dict["Details"].keys()),
+            "金額(萬元)": list(res_dict["Details"].values()),
+        }
+    )
+
+    df_cost["佔比(%)"] = (df_cost["金額(萬元)"] / df_cost["金額(萬元)"].sum() * 100).round(2)
+    return df_cost
 
-    # 4. 設計 / 安置費（使用五案件平均）
-    c_design = c_build * (STATISTICS_AVG['design_fee_pct'] / 100)
-    c_reloc = c_build * (STATISTICS_AVG['reloc_comp_pct'] / 100)
 
-    # 5. 管理費（含查表風險費）
-    c_mgmt_risk = c_build * risk_rate
-    c_mgmt_personnel = c_build * rate_personnel
-    c_mgmt_sales = (area_sale * price_unit_sale) * rate_sales
-    c_mgmt_total = c_mgmt_risk + c_mgmt_personnel + c_mgmt_sales
+def build_cost_figure(df_cost: pd.DataFrame):
+    """成本結構甜甜圈圖（TAB 1）"""
+    import plotly.express as px
+    fig_cost = px.pie(
+        df_cost,
+        values="金額(萬元)",
+        names="項目",
+        hole=0.4,
+        color_discrete_sequence=["#2E7D87", "#E67E22", "#27AE60", "#3498DB", "#9B59B6", "#E74C3C", "#F39C12", "#1ABC9C", "#34495E"],
+        title="成本結構比例（甜甜圈圖）",
+    )
 
-    # 6. 利息（使用五案件平均百分比）
-    fund_demand = c_engineering + c_advanced + c_design + c_reloc
-    c_interest = fund_demand * loan_ratio * loan_rate * (dev_months / 12) * 0.5
+    fig_cost.update_layout(
+        height=500,
+        font=dict(size=12),
+        showlegend=True,
+        hovermode="closest",
+    )
+    return fig_cost
 
-    # 7. 稅捐（使用五案件平均）
-    c_tax = c_build * (STATISTICS_AVG['tax_pct'] / 100)
 
-    # 8. 總成本（共同負擔）
-    c_total = c_engineering + c_advanced + c_design + c_reloc + c_mgmt_total + c_interest + c_tax
+# 熱力圖超過此格數時不附數字標籤
+HEATMAP_TEXT_MAX_CELLS = 400
 
-    # 9. 總銷價值
-    val_parking_total = num_parking * price_parking
-    val_new_total = (area_sale * price_unit_sale) + val_parking_total
+# IRR 無解（現金流全部同號，或找不到 NPV = 0 的報酬率）時的說明；舊版於此情形顯示 0%
+IRR_NAN_NOTE = "現金流無正負號變化或 NPV 無零點，IRR 無解；舊版於此情形記為 0%，現改為無解以免誤判為零報酬"
 
-    ratio_burden = c_total / val_new_total if val_new_total > 0 else 0
-    ratio_landlord = 1 - ratio_burden
 
-    # 10. IRR 現金流
-    equity_ratio = 1 - loan_ratio
-    initial_out = (c_advanced + c_design) + (c_engineering * equity_ratio * 0.1)
-    yearly_cost = (c_engineering * equity_ratio * 0.9) / 3
-    loan_repay = fund_demand * loan_ratio
-    final_in = val_new_total - loan_repay - c_tax - c_mgmt_total - c_interest
+def build_heatmap_figure(p: ModelParams, price_range, price_step, cost_range, cost_step, heat_metric):
+    """敏感度熱力圖（TAB 2）"""
+    from sweep import auto_workers, run_sweep
 
-    cashflow = [-initial_out, -yearly_cost, -yearly_cost, -yearly_cost, final_in]
+    prices = np.arange(p.price_unit_sale + price_range[0], p.price_unit_sale + price_range[1] + price_step / 2, price_step)
+    costs = np.arange(p.final_unit_cost + cost_range[0], p.final_unit_cost + cost_range[1] + cost_step / 2, cost_step)
 
-    try:
-        irr_val = npf.irr(cashflow)
-    except Exception:
-        irr_val = 0
+    # 以完整模型廣播計算整個網格（列：營建單價，欄：房價），格數夠多時分散到多個行程
+    output = "IRR" if heat_metric == "實施者 IRR" else "Landlord_Ratio"
+    grid = run_sweep(
+        p,
+        outputs=(output,),
+        workers=auto_workers(prices.size * costs.size),
+        price_unit_sale=prices[None, :],
+        final_unit_cost=costs[:, None],
+    )
+    z_matrix = grid[output] * 100
+    heat_label = "IRR%" if output == "IRR" else "地主分回%"
+
+    # 格數過多時不附數字標籤，超過螢幕解析度時先在伺服器端平均合併，避免圖表卡頓
+    show_text = z_matrix.size <= HEATMAP_TEXT_MAX_CELLS
+    z_plot, x_plot, y_plot = downsample_grid(z_matrix, prices, costs)
+    resolution = ""
+    if z_plot.shape != z_matrix.shape:
+        resolution = f"（{z_matrix.shape[0]}×{z_matrix.shape[1]} 格平均至 {z_plot.shape[0]}×{z_plot.shape[1]}）"
+    fig_heat = go.Figure(
+        data=go.Heatmap(
+            z=z_plot,
+            x=x_plot,
+            y=y_plot,
+            colorscale="Viridis",
+            text=[[f"{v:.1f}%" for v in r] for r in z_matrix] if show_text else None,
+            texttemplate="%{text}" if show_text else None,
+            hovertemplate=f"房價 %{{x:.2f}}<br>營建單價 %{{y:.2f}}<br>{heat_label} %{{z:.2f}}<extra></extra>",
+            colorbar=dict(title=heat_label)
+        )
+    )
 
+    fig_heat.update_layout(
+        title=f"{heat_metric}敏感度熱力圖{resolution}",
+        xaxis_title="房價 (萬/坪)",
+        yaxis_title="營建單價 (萬/坪)",
+        height=500,
+        font=dict(size=11),
+    )
+    return fig_heat
+
+
+def build_tornado_figures(p: ModelParams, pct: float):
+    """龍捲風圖（TAB 2）：回傳 (IRR 圖, 地主分回比圖)"""
+    from sensitivity import PARAM_LABELS, tornado
+    t = tornado(p, pct)
+    figs = []
+    for metric, base_val, low, high, title in (
+        ("IRR", t.base_irr, t.irr_low, t.irr_high, "實施者 IRR (%)"),
+        ("Landlord_Ratio", t.base_landlord, t.landlord_low, t.landlord_high, "地主分回比 (%)"),
+    ):
+        order = t.ranking(metric)[::-1]  # Plotly 由下往上排列，影響最大者置頂
+        labels = [PARAM_LABELS[t.fields[i]] for i in order]
+        fig = go.Figure()
+        for name, values, color in ((f"-{pct * 100:.0f}%", low, "#3498DB"), (f"+{pct * 100:.0f}%", high, "#E67E22")):
+            fig.add_trace(go.Bar(
+                y=labels,
+                x=(values[order] - base_val) * 100,
+                base=base_val * 100,
+                orientation="h",
+                name=name,
+                marker_color=color,
+            ))
+        fig.add_vline(x=base_val * 100, line_color="#2C3E50")
+        fig.update_layout(
+            title=f"{title}：各參數 ±{pct * 100:.0f}%",
+            barmode="overlay",
+            xaxis_title=title,
+            height=620,
+            font=dict(size=11),
+            legend=dict(orientation="h", yanchor="bottom", y=1.0),
+        )
+        figs.append(fig)
+    return tuple(figs)
+
+
+def build_marginal_table(p: ModelParams) -> pd.DataFrame:
+    """邊際影響表（TAB 2）：解析偏導數換算的彈性，依 IRR 彈性絕對值排序"""
+    from gradients import evaluate_gradients
+    from sensitivity import PARAM_LABELS
+    g = evaluate_gradients(p)
+    df = pd.DataFrame({
+        "參數": [PARAM_LABELS[name] for name in g.fields],
+        "目前值": g.inputs,
+        "+1% 時 IRR 變動 (百分點)": g.grads["IRR"] * g.inputs * 0.01 * 100,
+        "+1% 時地主分回比變動 (百分點)": g.grads["Landlord_Ratio"] * g.inputs * 0.01 * 100,
+        "IRR 彈性": g.elasticity("IRR"),
+        "地主分回比彈性": g.elasticity("Landlord_Ratio"),
+        "共同負擔彈性": g.elasticity("Total_Cost"),
+        "總銷彈性": g.elasticity("Total_Value"),
+    })
+    return df.iloc[np.argsort(-np.abs(np.nan_to_num(df["IRR 彈性"].to_numpy())), kind="stable")]
+
+
+def build_detail_table(p: ModelParams, res_dict: dict) -> pd.DataFrame:
+    """詳細成本明細表（TAB 4）"""
+    area_far = p.base_area * p.far_base_exist * p.bonus_multiplier
+    area_total = area_far * p.coeff_gfa
+    area_sale = area_far * p.coeff_sale
+    num_parking = int(area_total / PARKING_GFA_PER_SPACE)
+
+    detailed_costs = pd.DataFrame({
+        "成本項目": [
+            "基地面積", "總樓地板面積", "可銷售面積", "車位數量",
+            "拆除費", "營建工程費", "設計費", "拆遷安置費",
+            "風險管理費", "人事行政費", "銷售管理費",
+            "貸款利息", "稅捐",
+            "容積獎勵申請", "都計變更費", "容積移轉代金",
+        ],
+        "數量": [
+            f"{p.base_area:.0f} 坪", f"{area_total:.0f} 坪", f"{area_sale:.0f} 坪", f"{num_parking} 個",
+            f"{area_total:.0f} 坪", f"{area_total:.0f} 坪", "-", "-",
+            "-", "-", "-",
+            "-", f"{area_total * p.final_unit_cost:.0f} 萬",
+            "-", "-", "-",
+        ],
+        "金額(萬元)": [
+            "-", "-", "-", "-",
+            f"{res_dict['Details']['工程費(含拆除)'] * 0.05:.2f}",
+            f"{area_total * p.final_unit_cost:.2f}",
+            f"{res_dict['Details']['設計費']:.2f}",
+            f"{res_dict['Details']['拆遷安置費']:.2f}",
+            f"{res_dict['Details']['風險管理費']:.2f}",
+            f"{res_dict['Details']['人事管理費']:.2f}",
+            f"{res_dict['Details']['銷售管理費']:.2f}",
+            f"{res_dict['Details']['貸款利息']:.2f}",
+            f"{res_dict['Details']['稅捐']:.2f}",
+            f"{p.cost_bonus_app:.2f}",
+            f"{p.cost_urban_plan:.2f}",
+            f"{p.cost_transfer:.2f}",
+        ]
+    })
+    return detailed_costs
+
+
+def excel_sheets(res_dict: dict) -> dict:
+    """Excel 匯出的基本工作表：成本拆解與現金流量表"""
+    cf = res_dict["Cashflow"]
     return {
-        "GFA": area_total,
-        "Total_Cost": c_total,
-        "Total_Value": val_new_total,
-        "Landlord_Ratio": ratio_landlord,
-        "IRR": irr_val,
-        "Risk_Rate": risk_rate,
-        "Details": {
-            "工程費(含拆除)": c_engineering,
-            "設計費": c_design,
-            "拆遷安置費": c_reloc,
-            "風險管理費": c_mgmt_risk,
-            "人事管理費": c_mgmt_personnel,
-            "銷售管理費": c_mgmt_sales,
-            "貸款利息": c_interest,
-            "稅捐": c_tax,
-            "進階費用": c_advanced,
-        },
-        "Cashflow": {"T0": cashflow[0], "T1": cashflow[1], "T2": cashflow[2], "T3": cashflow[3], "T4": cashflow[4]},
+        "成本拆解": pd.DataFrame(res_dict["Details"].items(), columns=["項目", "金額(萬元)"]),
+        "現金流量表": pd.DataFrame({
+            "期別": ["T0", "T1", "T2", "T3", "T4"],
+            "金額(萬元)": [cf["T0"], cf["T1"], cf["T2"], cf["T3"], cf["T4"]],
+        }),
     }
 
 
+def excel_bytes(sheets: dict) -> bytes:
+    """以串流方式寫入暫存檔（大量列也不在記憶體中組出活頁簿），完成後讀回供下載"""
+    path = write_excel(sheets)
+    try:
+        with open(path, "rb") as fh:
+            return fh.read()
+    finally:
+        os.unlink(path)
+
+
+# 蒙地卡羅抽樣明細的輸出欄位名稱；超過匯出上限時檔案過大，不提供下載
+MC_OUTPUT_LABELS = {"IRR": "實施者 IRR", "Landlord_Ratio": "地主分回比", "Total_Cost": "共同負擔 (萬)"}
+MC_EXPORT_MAX_DRAWS = 1_000_000
+
+
+def generate_mc_excel(summary) -> bytes:
+    """蒙地卡羅抽樣明細 Excel：成本拆解、現金流量表，以及逐塊重現的每次抽樣與輸出"""
+    from montecarlo import iter_draws
+    from sensitivity import PARAM_LABELS
+
+    labels = {**PARAM_LABELS, **MC_OUTPUT_LABELS}
+    draws = ({labels.get(k, k): v for k, v in chunk.items()} for chunk in iter_draws(summary))
+    return excel_bytes({**excel_sheets(evaluate(summary.base)), "抽樣明細": draws})
+
+
+# 蒙地卡羅密度圖的最大分箱數 (x, y)
+MC_DENSITY_BINS = (150, 150)
+
+
+def build_mc_cloud_figure(summary):
+    """蒙地卡羅 地主分回比 × IRR：全部抽樣的密度（伺服器端分箱）疊加 WebGL 抽樣散點"""
+    x, y, counts = summary.joint.coarsen(MC_DENSITY_BINS)
+    fig = go.Figure(go.Heatmap(
+        x=x * 100,
+        y=y * 100,
+        z=np.where(counts > 0, counts, np.nan).astype(np.float32),
+        colorscale="Blues",
+        colorbar=dict(title="抽樣次數"),
+        hovertemplate="地主分回比 %{x:.1f}%<br>IRR %{y:.1f}%<br>次數 %{z:,.0f}<extra></extra>",
+        name="密度",
+    ))
+    n_sample = len(summary.sample["IRR"])
+    fig.add_trace(go.Scattergl(
+        x=summary.sample["Landlord_Ratio"] * 100,
+        y=summary.sample["IRR"] * 100,
+        mode="markers",
+        marker=dict(size=2, color="#E67E22", opacity=0.3),
+        name=f"抽樣點（前 {n_sample:,} 次）",
+        hoverinfo="skip",
+    ))
+    fig.add_hline(y=summary.irr_target * 100, line_dash="dash", line_color="#E74C3C")
+    for bound in summary.landlord_band:
+        fig.add_vline(x=bound * 100, line_dash="dot", line_color="#27AE60")
+    fig.update_layout(
+        title=f"地主分回比 × 實施者 IRR（{summary.n_draws:,} 次抽樣的密度）",
+        xaxis_title="地主分回比 (%)",
+        yaxis_title="IRR (%)",
+        height=500,
+        legend=dict(orientation="h", yanchor="bottom", y=1.0),
+    )
+    return fig
+
+
+# Streamlit 1.52 起 download_button 可接受 callable，於點擊時才產生檔案
+LAZY_DOWNLOAD = tuple(int(v) for v in st.__version__.split(".")[:2]) >= (1, 52)
+
+
+def timed(profiler: RerunProfiler, name: str, fn, *args):
+    """在剖析區段內呼叫 fn（下載 callable 於背景執行緒執行，記錄在觸發時的重跑紀錄中）"""
+    with profiler.section(name):
+        return fn(*args)
+
+
+def download_on_demand(label: str, build, file_name: str, mime: str, key: str) -> None:
+    """只在使用者要求時才產生匯出檔；舊版 Streamlit 改為先按「準備」再下載"""
+    if LAZY_DOWNLOAD:
+        st.download_button(label=label, data=build, file_name=file_name, mime=mime, key=key)
+    elif st.button(f"準備 {label}", key=f"{key}_prepare"):
+        st.download_button(label=label, data=build(), file_name=file_name, mime=mime, key=key)
+
+
 # ============================================================================
 # 📊 執行模型並顯示結果
 # ============================================================================
-res = calculate_model()
+# 以參數雜湊為鍵的 session 快取：只改動無關元件時直接重用結果與圖表
+memo = st.session_state.setdefault("memo", LRUCache(maxsize=32))
+
+# ========== 5.6 相似案件搜尋（側邊欄；以篩選案件平均費率試算的隱含單價為比對特徵）==========
+prof.checkpoint("相似案件")
+with st.sidebar.expander("🔎 相似案件搜尋", expanded=False):
+    col_sa, col_sb = st.columns(2)
+    with col_sa:
+        project_floors = st.number_input("預計地上樓層", value=15, step=1, min_value=1, help="本案規劃的地上樓層數")
+    with col_sb:
+        project_developer = st.selectbox("本案實施主體", DEVELOPER_TYPES, index=1)
+    n_comparables = st.slider("相似案件數", 1, 10, 3)
+
+    base_params = model_params()
+    base_res = memo.get_or_compute(("model", params_key(base_params)), lambda: evaluate(base_params))
+    profile = ProjectProfile.from_model(base_params, base_res, project_floors, project_developer)
+    comparable_index = st.session_state.get("comparable_index")
+    if comparable_index is None or comparable_index.store is not case_store \
+            or comparable_index.version != case_store.version:
+        comparable_index = st.session_state["comparable_index"] = ComparableIndex(case_store)
+    comparables = comparable_index.query(profile, n_comparables)
+
+    st.caption(f"本案：基地 {profile.area_ping:,.0f} 坪、{project_floors} 層、隱含單價 {profile.unit_cost:.1f} 萬/坪")
+    st.dataframe(
+        pd.DataFrame({
+            "案件": [c.case["case_key"] for c in comparables],
+            "地點": [c.case["location"] for c in comparables],
+            "實施主體": [c.case["developer"] for c in comparables],
+            "基地(坪)": [c.case["area_ping"] for c in comparables],
+            "樓層": [c.case["floors"] for c in comparables],
+            "距離": [c.distance for c in comparables],
+            "拆遷補償%": [c.case["demolition_pct"] for c in comparables],
+            "拆遷安置%": [c.case["reloc_comp_pct"] for c in comparables],
+            "設計費%": [c.case["design_fee_pct"] for c in comparables],
+            "稅捐%": [c.case["tax_pct"] for c in comparables],
+        }).round(2),
+        use_container_width=True,
+        hide_index=True,
+    )
+    apply_comparables = st.checkbox("套用相似案件平均費率", value=False,
+                                    help="以最相似案件的平均費率取代篩選案件平均（選擇參考案件時以參考案件為準）")
+
+# 費率來源優先順序：參考案件 > 相似案件平均 > 資料庫篩選平均
+if case_reference != "自訂設定":
+    case_rates = {name: case_data[name] for name in MODEL_RATE_FIELDS}
+    rate_source = f"參考案件 {case_key}（{case_data['location']}）"
+elif apply_comparables:
+    case_rates = comparable_rates(comparables, case_rates)
+    rate_source = f"相似案件平均（{len(comparables)} 件）"
+elif case_stats.count:
+    rate_source = f"資料庫篩選平均（{case_stats.count:,} 件）"
+else:
+    rate_source = "論文統計平均（篩選無符合案件）"
+
+prof.checkpoint("模型計算")
+params = model_params()
+params_hash = params_key(params)
+res = memo.get_or_compute(("model", params_hash), calculate_model)
 
 # ============================================================================
 # 🎯 結果看板（KPI 指標區）
 # ============================================================================
+prof.checkpoint("KPI 看板")
 st.markdown("### 📊 運算結果看板")
 
 col1, col2, col3, col4 = st.columns(4)
@@ -691,127 +927,203 @@ with col3:
 
 with col4:
     irr_pct = res['IRR'] * 100
-    st.metric(
-        "📊 實施者 IRR",
-        f"{irr_pct:.2f}%",
-        delta="可行" if irr_pct >= 12 else "需調整",
-        delta_color="inverse"
-    )
+    if np.isnan(irr_pct):
+        st.metric("📊 實施者 IRR", "無解", delta="需調整", delta_color="inverse", help=IRR_NAN_NOTE)
+    else:
+        st.metric(
+            "📊 實施者 IRR",
+            f"{irr_pct:.2f}%",
+            delta="可行" if irr_pct >= 12 else "需調整",
+            delta_color="inverse"
+        )
 
 st.divider()
 
 # ============================================================================
 # 📑 標籤頁面：成本、敏感度、情境
 # ============================================================================
-tab1, tab2, tab3, tab4, tab5 = st.tabs(
-    ["📈 成本結構", "🎲 敏感度分析", "📚 情境比較", "📋 詳細明細", "📊 五案件統計"]
-)
+# 只執行目前開啟的標籤頁；其餘標籤頁在切換過去時才計算與繪圖
 
 # ===== TAB 1: 成本結構 =====
-with tab1:
+def render_cost_tab():
     st.subheader("共同負擔成本結構拆解")
 
-    df_cost = pd.DataFrame(
-        {
-            "項目": list(res["Details"].keys()),
-            "金額(萬元)": list(res["Details"].values()),
-        }
-    )
-
-    df_cost["佔比(%)"] = (df_cost["金額(萬元)"] / df_cost["金額(萬元)"].sum() * 100).round(2)
-
-    fig_cost = px.pie(
-        df_cost,
-        values="金額(萬元)",
-        names="項目",
-        hole=0.4,
-        color_discrete_sequence=["#2E7D87", "#E67E22", "#27AE60", "#3498DB", "#9B59B6", "#E74C3C", "#F39C12", "#1ABC9C", "#34495E"],
-        title="成本結構比例（甜甜圈圖）",
-    )
-
-    fig_cost.update_layout(
-        height=500,
-        font=dict(size=12),
-        showlegend=True,
-        hovermode="closest",
-    )
+    df_cost = memo.get_or_compute(("cost_table", params_hash), lambda: build_cost_table(res))
+    fig_cost = memo.get_or_compute(("cost_figure", params_hash), lambda: build_cost_figure(df_cost))
 
     col_chart, col_table = st.columns([0.6, 0.4])
 
-    with col_chart:
+    with col_chart, prof.section("成本圖 st.plotly_chart"):
         st.plotly_chart(fig_cost, use_container_width=True)
 
     with col_table:
         st.markdown("#### 成本明細")
-        st.dataframe(
-            df_cost.style.format({"金額(萬元)": "{:,.0f}", "佔比(%)": "{:.2f}%"}),
-            use_container_width=True,
-            hide_index=True
-        )
+        with prof.section("成本表 st.dataframe"):
+            st.dataframe(
+                df_cost.style.format({"金額(萬元)": "{:,.0f}", "佔比(%)": "{:.2f}%"}),
+                use_container_width=True,
+                hide_index=True
+            )
+
 
 # ===== TAB 2: 敏感度分析 =====
-with tab2:
+def render_sensitivity_tab():
+    from sensitivity import PARAM_LABELS
+
     st.subheader("敏感度分析（房價 vs 營建成本）")
 
     col_sens_a, col_sens_b = st.columns(2)
     with col_sens_a:
-        price_range = st.slider("房價變動範圍 (萬/坪)", -15, 15, (-10, 10), key="price_range")
+        price_range = st.slider("房價變動範圍 (萬/坪)", -15, 15, key="price_range")
+        price_step = st.select_slider("房價步距 (萬/坪)", options=[0.05, 0.1, 0.2, 0.5, 1.0, 2.0], key="price_step")
     with col_sens_b:
-        cost_range = st.slider("營建成本變動範圍 (萬/坪)", -6, 8, (-4, 6), key="cost_range")
-
-    prices = np.arange(price_unit_sale + price_range[0], price_unit_sale + price_range[1] + 1, 2)
-    costs = np.arange(final_unit_cost + cost_range[0], final_unit_cost + cost_range[1] + 1, 1)
-
-    z_matrix = []
-    for c in costs:
-        row = []
-        for p in prices:
-            area_far_temp = base_area * far_base_exist * bonus_multiplier
-            area_total_temp = area_far_temp * coeff_gfa
-            area_sale_temp = area_far_temp * coeff_sale
-            num_parking_temp = int(area_total_temp / 35)
-
-            val_new_temp = (area_sale_temp * p) + (num_parking_temp * price_parking)
-            cost_build_temp = area_total_temp * c
-            cost_total_temp = cost_build_temp * 1.55
+        cost_range = st.slider("營建成本變動範圍 (萬/坪)", -6, 8, key="cost_range")
+        cost_step = st.select_slider("營建步距 (萬/坪)", options=[0.05, 0.1, 0.2, 0.5, 1.0], key="cost_step")
 
-            ratio = (1 - cost_total_temp / val_new_temp) * 100 if val_new_temp > 0 else 0
-            row.append(ratio)
+    heat_metric = st.radio("熱力圖指標", ["地主分回比", "實施者 IRR"], horizontal=True, key="heat_metric")
 
-        z_matrix.append(row)
-
-    fig_heat = go.Figure(
-        data=go.Heatmap(
-            z=z_matrix,
-            x=prices,
-            y=costs,
-            colorscale="Viridis",
-            text=[[f"{v:.1f}%" for v in r] for r in z_matrix],
-            texttemplate="%{text}",
-            colorbar=dict(title="地主分回%")
-        )
-    )
-
-    fig_heat.update_layout(
-        title="地主分回比例敏感度熱力圖",
-        xaxis_title="房價 (萬/坪)",
-        yaxis_title="營建單價 (萬/坪)",
-        height=500,
-        font=dict(size=11),
+    fig_heat = memo.get_or_compute(
+        ("heatmap", params_key(params, price_range, price_step, cost_range, cost_step, heat_metric)),
+        lambda: build_heatmap_figure(params, price_range, price_step, cost_range, cost_step, heat_metric),
     )
 
-    st.plotly_chart(fig_heat, use_container_width=True)
+    with prof.section("熱力圖 st.plotly_chart"):
+        st.plotly_chart(fig_heat, use_container_width=True)
 
     with st.expander("💡 敏感度解讀"):
         st.markdown("""
         - **顏色越深（紫色）**：地主分回比例越高（利潤空間大）
         - **顏色越淺（黃色）**：地主分回比例越低（風險較高）
         - **建議目標**：地主分回比 45-55% 為合理區間
+        - **IRR 指標**：可對照實施者 12% 投資門檻判斷可行區域
         """)
 
+    st.subheader("龍捲風圖（單因子敏感度）")
+    tornado_pct = st.select_slider("擾動幅度 (±%)", options=[1, 5, 10, 20, 30], key="tornado_pct")
+    fig_tornado_irr, fig_tornado_landlord = memo.get_or_compute(
+        ("tornado", params_hash, tornado_pct),
+        lambda: build_tornado_figures(params, tornado_pct / 100),
+    )
+    col_tor_a, col_tor_b = st.columns(2)
+    with col_tor_a:
+        st.plotly_chart(fig_tornado_irr, use_container_width=True)
+    with col_tor_b:
+        st.plotly_chart(fig_tornado_landlord, use_container_width=True)
+    st.caption(f"{len(PARAM_LABELS)} 個參數 × 2 = {2 * len(PARAM_LABELS)} 個擾動情境以單次批次計算；數值為 0 的參數（如容積移轉代金）擾動後不變")
+
+    st.subheader("邊際影響（解析偏導數）")
+    df_marginal = memo.get_or_compute(("marginal", params_hash), lambda: build_marginal_table(params))
+    st.dataframe(
+        df_marginal.style.format({
+            "目前值": "{:.4g}",
+            "+1% 時 IRR 變動 (百分點)": "{:+.3f}",
+            "+1% 時地主分回比變動 (百分點)": "{:+.3f}",
+            "IRR 彈性": "{:+.3f}",
+            "地主分回比彈性": "{:+.3f}",
+            "共同負擔彈性": "{:+.3f}",
+            "總銷彈性": "{:+.3f}",
+        }, na_rep="-"),
+        use_container_width=True,
+        hide_index=True,
+    )
+    st.caption("彈性 = 輸入變動 1% 時輸出變動的百分比；IRR 以 NPV = 0 隱函數微分求得。風險費率與車位數為階梯函數，在跳躍點之間導數為 0")
+
+
 # ===== TAB 3: 情境比較 =====
-with tab3:
-    st.subheader("預設情境模板 & 官方基準對標")
+# 可全域修改的參數：欄位 → (標籤, 顯示倍率)
+SCENARIO_GLOBAL_FIELDS = {
+    "loan_rate": ("貸款年利率 (%)", 100),
+    "loan_ratio": ("貸款成數 (%)", 100),
+    "price_unit_sale": ("更新後預售單價 (萬/坪)", 1),
+    "final_unit_cost": ("修正後營建單價 (萬/坪)", 1),
+    "dev_months": ("開發期程 (月)", 1),
+}
+
+
+def scenario_frame(store) -> pd.DataFrame:
+    """情境庫比較表（直接由欄位陣列組成）"""
+    p, out = store.param_columns(), store.output_columns()
+    return pd.DataFrame({
+        "情境": store.names,
+        "預售單價": p["price_unit_sale"],
+        "營建單價": p["final_unit_cost"],
+        "貸款成數%": p["loan_ratio"] * 100,
+        "貸款利率%": p["loan_rate"] * 100,
+        "產權人數": p["num_owners"],
+        "總價值(億)": out["Total_Value"] / 10000,
+        "共同負擔(億)": out["Total_Cost"] / 10000,
+        "地主分回比%": out["Landlord_Ratio"] * 100,
+        "IRR%": out["IRR"] * 100,
+    })
+
+
+def render_scenario_tab():
+    from scenarios import ScenarioStore
+
+    st.subheader("情境庫：儲存並比較多組設定")
+    store = st.session_state.setdefault("scenario_store", ScenarioStore())
+
+    col_s1, col_s2 = st.columns([3, 1])
+    with col_s1:
+        sc_name = st.text_input("情境名稱", value=f"情境 {len(store) + 1}")
+    with col_s2:
+        st.write("")
+        if st.button("💾 儲存目前設定", key="sc_save", use_container_width=True):
+            store.add(sc_name, params, res)
+
+    if not len(store):
+        st.info("調整側邊欄參數後按「儲存目前設定」，即可在此並列比較多個情境")
+    else:
+        with st.expander("🌐 全域修改並重算所有情境", expanded=False):
+            col_g1, col_g2, col_g3 = st.columns([2, 2, 1])
+            with col_g1:
+                sc_field = st.selectbox("修改參數", list(SCENARIO_GLOBAL_FIELDS),
+                                        format_func=lambda f: SCENARIO_GLOBAL_FIELDS[f][0], key="sc_field")
+            label, scale = SCENARIO_GLOBAL_FIELDS[sc_field]
+            with col_g2:
+                sc_value = st.number_input(label, key=f"sc_value_{sc_field}")
+            with col_g3:
+                st.write("")
+                if st.button("套用", key="sc_apply", use_container_width=True):
+                    with prof.section("情境批次重算"):
+                        store.apply(**{sc_field: sc_value / scale})
+                    st.success(f"已將 {len(store)} 個情境的{label}設為 {sc_value:g}，以單次批次計算重算")
+
+        col_f1, col_f2, col_f3 = st.columns(3)
+        with col_f1:
+            sc_min_irr = st.number_input("IRR 下限 (%)", step=1.0, key="sc_min_irr")
+        with col_f2:
+            sc_min_landlord = st.number_input("地主分回比下限 (%)", step=1.0, key="sc_min_landlord")
+        with col_f3:
+            sc_sort = st.selectbox("排序依據", ["IRR%", "地主分回比%", "共同負擔(億)", "情境"], key="sc_sort")
+
+        df_sc = scenario_frame(store)
+        shown = df_sc[(df_sc["IRR%"].fillna(-np.inf) >= sc_min_irr) & (df_sc["地主分回比%"] >= sc_min_landlord)]
+        shown = shown.sort_values(sc_sort, ascending=sc_sort == "情境", na_position="last")
+        st.caption(f"共 {len(store)} 個情境，符合條件 {len(shown)} 個（欄式儲存 {store.nbytes() / 1024:.1f} KB）")
+        st.dataframe(shown.round(2), use_container_width=True, hide_index=True)
+
+        fig_sc = go.Figure(go.Scattergl(
+            x=shown["地主分回比%"], y=shown["IRR%"], text=shown["情境"], mode="markers",
+            marker=dict(size=9, color="#2E7D87"),
+            hovertemplate="%{text}<br>地主分回比 %{x:.2f}%<br>IRR %{y:.2f}%<extra></extra>",
+        ))
+        fig_sc.update_layout(height=420, xaxis_title="地主分回比 (%)", yaxis_title="實施者 IRR (%)",
+                             title="情境分布：地主分回比 vs 實施者 IRR")
+        st.plotly_chart(fig_sc, use_container_width=True)
+
+        col_d1, col_d2 = st.columns([3, 1])
+        with col_d1:
+            sc_drop = st.multiselect("選擇要刪除的情境", list(range(len(store))),
+                                     format_func=lambda i: store.names[i])
+        with col_d2:
+            st.write("")
+            if st.button("🗑️ 刪除", key="sc_remove", disabled=not sc_drop, use_container_width=True):
+                store.remove(sc_drop)
+                st.rerun()
+
+    st.divider()
+    st.markdown("#### 預設情境模板 & 官方基準對標")
 
     scenario_desc = pd.DataFrame({
         "比較項目": ["營建單價", "風險費率", "貸款成數", "設計費率", "拆遷安置", "管理費率"],
@@ -830,51 +1142,19 @@ with tab3:
     - **市場實務**：市場調查與建商實務估算
     """)
 
+
 # ===== TAB 4: 詳細明細表 =====
-with tab4:
+def render_detail_tab():
     st.subheader("詳細成本明細表")
 
-    area_far = base_area * far_base_exist * bonus_multiplier
-    area_total = area_far * coeff_gfa
-    area_sale = area_far * coeff_sale
-    num_parking = int(area_total / 35)
+    detailed_costs = memo.get_or_compute(("detail_table", params_hash), lambda: build_detail_table(params, res))
 
-    detailed_costs = pd.DataFrame({
-        "成本項目": [
-            "基地面積", "總樓地板面積", "可銷售面積", "車位數量",
-            "拆除費", "營建工程費", "設計費", "拆遷安置費",
-            "風險管理費", "人事行政費", "銷售管理費",
-            "貸款利息", "稅捐",
-            "容積獎勵申請", "都計變更費", "容積移轉代金",
-        ],
-        "數量": [
-            f"{base_area:.0f} 坪", f"{area_total:.0f} 坪", f"{area_sale:.0f} 坪", f"{num_parking} 個",
-            f"{area_total:.0f} 坪", f"{area_total:.0f} 坪", "-", "-",
-            "-", "-", "-",
-            "-", f"{area_total * final_unit_cost:.0f} 萬",
-            "-", "-", "-",
-        ],
-        "金額(萬元)": [
-            "-", "-", "-", "-",
-            f"{res['Details']['工程費(含拆除)'] * 0.05:.2f}",
-            f"{area_total * final_unit_cost:.2f}",
-            f"{res['Details']['設計費']:.2f}",
-            f"{res['Details']['拆遷安置費']:.2f}",
-            f"{res['Details']['風險管理費']:.2f}",
-            f"{res['Details']['人事管理費']:.2f}",
-            f"{res['Details']['銷售管理費']:.2f}",
-            f"{res['Details']['貸款利息']:.2f}",
-            f"{res['Details']['稅捐']:.2f}",
-            f"{cost_bonus_app:.2f}",
-            f"{cost_urban_plan:.2f}",
-            f"{cost_transfer:.2f}",
-        ]
-    })
+    with prof.section("明細表 st.dataframe"):
+        st.dataframe(detailed_costs, use_container_width=True, hide_index=True)
 
-    st.dataframe(detailed_costs, use_container_width=True, hide_index=True)
 
 # ===== TAB 5: 五案件統計 =====
-with tab5:
+def render_cases_tab():
     st.subheader("五案件統計數據與分析（論文表3-1、表3-2）")
     
     # 五案件基本信息表
@@ -967,38 +1247,399 @@ with tab5:
     ✓ **驗證意義**：本統計數據驗證了官方基準制定的科學性，同時確認統計數據可直接作為模型參數
     """)
 
+
+# ===== TAB 6: 蒙地卡羅模擬 =====
+def render_montecarlo_tab():
+    from montecarlo import default_distributions, run_monte_carlo
+
+    st.subheader("蒙地卡羅不確定性分析")
+    st.caption(f"拆遷補償、拆遷安置、設計費、稅捐費率以資料庫篩選案件（{case_stats.count:,} 件，不含不列入統計的項目）"
+               f"的最小 / 最大值為範圍、目前套用的費率（{rate_source}）為眾數，以三角分布抽樣；"
+               "房價與營建單價以目前設定為中心的常態分布抽樣")
+
+    col_mc_a, col_mc_b, col_mc_c, col_mc_d = st.columns(4)
+    with col_mc_a:
+        mc_draws = st.select_slider("抽樣次數", options=[10_000, 100_000, 1_000_000, 5_000_000], key="mc_draws")
+    with col_mc_b:
+        mc_seed = st.number_input("亂數種子", step=1, key="mc_seed")
+    with col_mc_c:
+        mc_price_sd = st.number_input("房價標準差 (%)", step=1.0, key="mc_price_sd") / 100
+    with col_mc_d:
+        mc_cost_sd = st.number_input("營建單價標準差 (%)", step=1.0, key="mc_cost_sd") / 100
+
+    if st.button("▶️ 執行模擬", key="mc_run"):
+        mc_progress = st.progress(0.0)
+        st.session_state["mc_summary"] = run_monte_carlo(
+            params,
+            n_draws=int(mc_draws),
+            seed=int(mc_seed),
+            distributions=default_distributions(params, mc_price_sd, mc_cost_sd, case_stats),
+            on_chunk=lambda done, total: mc_progress.progress(done / total),
+        )
+
+    mc_summary = st.session_state.get("mc_summary")
+    if mc_summary is None:
+        st.info("設定抽樣條件後按下「執行模擬」")
+    else:
+        if mc_summary.base != params:
+            st.warning("側邊欄參數已變更，以下為上次模擬的結果，請重新執行")
+
+        col_p1, col_p2, col_p3, col_p4 = st.columns(4)
+        mc_pct = mc_summary.percentiles()
+        with col_p1:
+            st.metric("P(IRR ≥ 12%)", f"{mc_summary.p_irr_ok * 100:.1f}%")
+        with col_p2:
+            st.metric("P(地主分回 45-55%)", f"{mc_summary.p_landlord_in_band * 100:.1f}%")
+        with col_p3:
+            st.metric("IRR 中位數", f"{mc_pct['IRR'][50] * 100:.2f}%")
+        with col_p4:
+            st.metric("地主分回比中位數", f"{mc_pct['Landlord_Ratio'][50] * 100:.2f}%")
+
+        df_mc = pd.DataFrame({
+            "分位數": [f"P{q}" for q in mc_pct["IRR"]],
+            "實施者 IRR (%)": [v * 100 for v in mc_pct["IRR"].values()],
+            "地主分回比 (%)": [v * 100 for v in mc_pct["Landlord_Ratio"].values()],
+            "共同負擔 (億)": [v / 10000 for v in mc_pct["Total_Cost"].values()],
+        })
+        st.dataframe(
+            df_mc.style.format({"實施者 IRR (%)": "{:.2f}", "地主分回比 (%)": "{:.2f}", "共同負擔 (億)": "{:.2f}"}),
+            use_container_width=True,
+            hide_index=True,
+        )
+
+        irr_centers, irr_counts = mc_summary.irr.coarsen(100)
+        fig_mc = go.Figure(go.Bar(x=irr_centers * 100, y=irr_counts, marker_color="#2E7D87"))
+        fig_mc.add_vline(x=mc_summary.irr_target * 100, line_dash="dash", line_color="#E74C3C")
+        fig_mc.update_layout(
+            title=f"實施者 IRR 分布（{mc_summary.n_draws:,} 次抽樣，種子 {mc_summary.seed}）",
+            xaxis_title="IRR (%)",
+            yaxis_title="次數",
+            height=400,
+            bargap=0,
+        )
+        st.plotly_chart(fig_mc, use_container_width=True)
+
+        if mc_summary.joint is not None:
+            st.plotly_chart(build_mc_cloud_figure(mc_summary), use_container_width=True)
+
+        if mc_summary.n_draws <= MC_EXPORT_MAX_DRAWS:
+            download_on_demand(
+                label="📊 抽樣明細 Excel",
+                build=lambda: timed(prof, "匯出抽樣明細", generate_mc_excel, mc_summary),
+                file_name=f"MonteCarlo_Draws_seed{mc_summary.seed}.xlsx",
+                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                key="download_mc_xlsx",
+            )
+        else:
+            st.caption(f"抽樣明細匯出上限為 {MC_EXPORT_MAX_DRAWS:,} 次抽樣")
+
+
+# ===== TAB 7: 目標搜尋 =====
+GOAL_INPUT_LABELS = {
+    "price_unit_sale": "更新後預售單價 (萬/坪)",
+    "final_unit_cost": "修正後營建單價 (萬/坪)",
+    "bonus_multiplier": "防災獎勵倍數",
+}
+# 目標輸出：(顯示名稱, 顯示單位換算倍數)
+GOAL_METRIC_LABELS = {
+    "IRR": ("實施者 IRR (%)", 100),
+    "Landlord_Ratio": ("地主分回比 (%)", 100),
+    "Total_Cost": ("共同負擔 (億)", 1 / 10000),
+}
+
+
+def render_goalseek_tab():
+    from goalseek import goal_seek
+
+    st.subheader("目標搜尋：反推達標所需條件")
+    st.caption("分別調整單一參數（其餘維持側邊欄設定），求使目標輸出恰好等於目標值的參數值")
+
+    col_gs_a, col_gs_b = st.columns(2)
+    with col_gs_a:
+        gs_metric = st.selectbox("目標輸出", list(GOAL_METRIC_LABELS),
+                                 format_func=lambda m: GOAL_METRIC_LABELS[m][0], key="gs_metric")
+    metric_label, metric_scale = GOAL_METRIC_LABELS[gs_metric]
+    with col_gs_b:
+        gs_target = st.number_input(f"目標值：{metric_label}", step=0.5, key=f"gs_target_{gs_metric}")
+
+    target = gs_target / metric_scale
+    rows = memo.get_or_compute(
+        ("goalseek", params_hash, gs_metric, target),
+        lambda: [(name, goal_seek(params, name, gs_metric, target)) for name in GOAL_INPUT_LABELS],
+    )
+    values = {name: float(r.value) for name, r in rows}
+
+    current_metric = res[gs_metric] * metric_scale
+    st.metric(f"目前{metric_label}", f"{current_metric:.2f}", delta=f"{current_metric - gs_target:+.2f} 相對目標",
+              delta_color="off")
+
+    achieved_label = f"達成{metric_label}"
+    df_gs = pd.DataFrame({
+        "反推參數": [GOAL_INPUT_LABELS[name] for name, _ in rows],
+        "目前值": [getattr(params, name) for name, _ in rows],
+        "所需值": list(values.values()),
+        achieved_label: [float(r.achieved) * metric_scale for _, r in rows],
+        "狀態": ["✅ 達標" if r.converged else "⚠️ 跳躍點" if np.isfinite(r.value) else "—" for _, r in rows],
+    })
+    df_gs["變動幅度 (%)"] = (df_gs["所需值"] / df_gs["目前值"] - 1) * 100
+    st.dataframe(
+        df_gs.style.format({"目前值": "{:.2f}", "所需值": "{:.2f}", achieved_label: "{:.2f}", "變動幅度 (%)": "{:+.1f}"},
+                           na_rep="搜尋範圍內無解"),
+        use_container_width=True,
+        hide_index=True,
+    )
+    for name, r in rows:
+        if not r.converged and np.isfinite(r.value):
+            st.warning(f"{GOAL_INPUT_LABELS[name]}：目標落在模型跳躍點上，無法恰好達到 {gs_target:.2f}；"
+                       f"最接近的值 {float(r.value):.2f} 對應{metric_label} {float(r.achieved) * metric_scale:.2f}")
+    final_cost_needed = values["final_unit_cost"]
+    if np.isfinite(final_cost_needed):
+        st.caption(f"換算營建基準單價：{final_cost_needed / (1 + mat_coeff):.2f} 萬/坪（建材係數 +{mat_coeff}）")
+    st.caption("車位數取整與風險費率查表使模型呈階梯狀，所需值可能落在跳躍點上")
+
+
+# ===== TAB 8: 參數最佳化 =====
+def render_optimize_tab():
+    from optimize import optimize
+
+    st.subheader("協商參數最佳化")
+    st.caption("在指定範圍內搜尋貸款成數、獎勵倍數、建材等級與管理費率；每輪批次評估大量候選組合並逐輪縮小範圍，可處理建材等級與風險費率查表的不連續")
+
+    opt_objective = st.radio(
+        "最佳化目標",
+        ["IRR", "Landlord_Ratio"],
+        format_func=lambda m: {"IRR": "最大化實施者 IRR（地主分回比 ≥ 下限）",
+                               "Landlord_Ratio": "最大化地主分回比（實施者 IRR ≥ 下限）"}[m],
+        key="opt_objective",
+        horizontal=True,
+    )
+    floor_label = "地主分回比下限 (%)" if opt_objective == "IRR" else "實施者 IRR 下限 (%)"
+    col_o1, col_o2, col_o3 = st.columns(3)
+    with col_o1:
+        opt_floor = st.number_input(floor_label, step=1.0, key=f"opt_floor_{opt_objective}") / 100
+        opt_grades = st.multiselect("可選建材等級", list(CONST_TYPES), key="opt_grades")
+    with col_o2:
+        opt_loan = st.slider("貸款成數範圍 (%)", 40, 80, key="opt_loan")
+        opt_bonus = st.slider("獎勵倍數範圍", 1.0, 2.0, step=0.05, key="opt_bonus")
+    with col_o3:
+        opt_personnel = st.slider("人事管理費率範圍 (%)", 0.5, 6.0, step=0.5, key="opt_personnel")
+        opt_sales = st.slider("銷售管理費率範圍 (%)", 1.0, 10.0, step=0.5, key="opt_sales")
+    opt_candidates = st.select_slider("候選組合數", options=[10_000, 100_000, 1_000_000], key="opt_candidates")
+
+    if st.button("▶️ 執行最佳化", key="opt_run", disabled=not opt_grades):
+        st.session_state["opt_result"] = optimize(
+            params,
+            objective=opt_objective,
+            floor=opt_floor,
+            bounds={
+                "loan_ratio": (opt_loan[0] / 100, opt_loan[1] / 100),
+                "bonus_multiplier": tuple(opt_bonus),
+                "rate_personnel": (opt_personnel[0] / 100, opt_personnel[1] / 100),
+                "rate_sales": (opt_sales[0] / 100, opt_sales[1] / 100),
+            },
+            grades=opt_grades,
+            base_unit_cost=base_unit_cost,
+            n_candidates=int(opt_candidates),
+        )
+        st.session_state["opt_base"] = params
+
+    opt_result = st.session_state.get("opt_result")
+    if opt_result is None:
+        st.info("設定範圍與下限後按下「執行最佳化」")
+        return
+    if st.session_state.get("opt_base") != params:
+        st.warning("側邊欄參數已變更，以下為上次最佳化的結果，請重新執行")
+    if not opt_result.feasible:
+        st.error("範圍內找不到滿足下限的組合，以下為最接近下限者")
+
+    col_r1, col_r2, col_r3 = st.columns(3)
+    with col_r1:
+        st.metric(GOAL_METRIC_LABELS[opt_result.objective][0], f"{opt_result.objective_value * 100:.2f}",
+                  delta=f"{(opt_result.objective_value - res[opt_result.objective]) * 100:+.2f} 相對目前")
+    with col_r2:
+        con_name = "Landlord_Ratio" if opt_result.objective == "IRR" else "IRR"
+        st.metric(GOAL_METRIC_LABELS[con_name][0], f"{opt_result.constraint_value * 100:.2f}",
+                  delta=f"{(opt_result.constraint_value - res[con_name]) * 100:+.2f} 相對目前")
+    with col_r3:
+        st.metric("評估組合數", f"{opt_result.n_evaluated:,}", delta=f"{opt_result.seconds:.2f} 秒", delta_color="off")
+
+    best = opt_result.params
+    st.dataframe(
+        pd.DataFrame({
+            "參數": ["建材等級", "貸款成數 (%)", "防災獎勵倍數", "人事行政管理費率 (%)", "銷售管理費率 (%)"],
+            "目前設定": [const_type, f"{loan_ratio * 100:.1f}", f"{bonus_multiplier:.2f}",
+                     f"{rate_personnel * 100:.2f}", f"{rate_sales * 100:.2f}"],
+            "最佳化結果": [opt_result.const_type, f"{best.loan_ratio * 100:.1f}", f"{best.bonus_multiplier:.2f}",
+                      f"{best.rate_personnel * 100:.2f}", f"{best.rate_sales * 100:.2f}"],
+        }),
+        use_container_width=True,
+        hide_index=True,
+    )
+
+
+# ===== TAB 9: 逐月現金流 =====
+def render_monthly_tab():
+    from cashflow import monthly_batch
+
+    st.subheader("逐月現金流（S 曲線撥款與貸款餘額計息）")
+    st.caption("工程費依 S 曲線撥付、預售款於工期內分期收取並先支應支出，利息按月以貸款餘額計算；與看板的五期簡化模型並列參考")
+
+    col_cf_a, col_cf_b = st.columns([3, 1])
+    with col_cf_a:
+        cf_deposit = st.slider("預售期間分期收取比例 (%)", 0, 40, key="cf_deposit")
+    with col_cf_b:
+        cf_start = st.date_input("開工日期（XIRR 起算日）", key="cf_start")
+    monthly = memo.get_or_compute(("monthly", params_hash, cf_deposit, cf_start),
+                                  lambda: monthly_batch(params, cf_deposit / 100, start=cf_start))
+
+    col_m1, col_m2, col_m3, col_m4 = st.columns(4)
+    with col_m1:
+        st.metric("年化月 IRR", f"{monthly.irr_annual[0] * 100:.2f}%",
+                  delta=f"{(monthly.irr_annual[0] - res['IRR']) * 100:+.2f} 相對五期模型", delta_color="off")
+    with col_m2:
+        st.metric("XIRR", f"{monthly.xirr[0] * 100:.2f}%")
+    with col_m3:
+        st.metric("逐月累計利息", f"{monthly.interest[0]:,.0f} 萬",
+                  delta=f"{monthly.interest[0] - res['Details']['貸款利息']:+,.0f} 相對簡化估算", delta_color="off")
+    with col_m4:
+        st.metric("貸款餘額峰值", f"{monthly.peak_loan[0] / 10000:.2f} 億")
+
+    n_months = int(monthly.months[0])
+    month_axis = np.arange(n_months + 1)
+    fig_monthly = go.Figure()
+    fig_monthly.add_trace(go.Bar(x=month_axis, y=monthly.cashflow[0, :n_months + 1], name="實施者淨現金流 (萬)",
+                                 marker_color="#2E7D87"))
+    fig_monthly.add_trace(go.Scatter(x=month_axis, y=monthly.loan_balance[0, :n_months + 1], name="貸款餘額 (萬)",
+                                     yaxis="y2", line=dict(color="#E67E22", width=2)))
+    fig_monthly.update_layout(
+        title=f"逐月現金流與貸款餘額（{n_months} 個月）",
+        xaxis_title="月份",
+        yaxis=dict(title="淨現金流 (萬)"),
+        yaxis2=dict(title="貸款餘額 (萬)", overlaying="y", side="right"),
+        height=450,
+        legend=dict(orientation="h", yanchor="bottom", y=1.0),
+    )
+    st.plotly_chart(fig_monthly, use_container_width=True)
+
+    with st.expander("📋 逐月明細"):
+        st.dataframe(
+            pd.DataFrame({
+                "月份": month_axis,
+                "淨現金流 (萬)": monthly.cashflow[0, :n_months + 1],
+                "累計現金流 (萬)": np.cumsum(monthly.cashflow[0, :n_months + 1]),
+                "貸款餘額 (萬)": monthly.loan_balance[0, :n_months + 1],
+            }).style.format("{:,.1f}", subset=["淨現金流 (萬)", "累計現金流 (萬)", "貸款餘額 (萬)"]),
+            use_container_width=True,
+            hide_index=True,
+        )
+
+
+MAIN_TABS = {
+    "📈 成本結構": render_cost_tab,
+    "🎲 敏感度分析": render_sensitivity_tab,
+    "📚 情境比較": render_scenario_tab,
+    "📋 詳細明細": render_detail_tab,
+    "📊 五案件統計": render_cases_tab,
+    "🎰 蒙地卡羅": render_montecarlo_tab,
+    "🎯 目標搜尋": render_goalseek_tab,
+    "🧭 參數最佳化": render_optimize_tab,
+    "📅 逐月現金流": render_monthly_tab,
+}
+
+# 標籤頁內的元件在未渲染時會被 Streamlit 清除狀態；預設值改放 session_state，
+# 每次執行重新指定一次以保留使用者在其他標籤頁的設定
+TAB_WIDGET_DEFAULTS = {
+    "main_tab": next(iter(MAIN_TABS)),
+    "price_range": (-10, 10),
+    "price_step": 2.0,
+    "cost_range": (-4, 6),
+    "cost_step": 1.0,
+    "heat_metric": "地主分回比",
+    "tornado_pct": 10,
+    "mc_draws": 100_000,
+    "mc_seed": 2024,
+    "mc_price_sd": 10.0,
+    "mc_cost_sd": 8.0,
+    "gs_metric": "IRR",
+    "gs_target_IRR": 12.0,
+    "gs_target_Landlord_Ratio": 55.0,
+    "gs_target_Total_Cost": 6.0,
+    "opt_objective": "IRR",
+    "opt_floor_IRR": 50.0,
+    "opt_floor_Landlord_Ratio": 12.0,
+    "opt_grades": list(CONST_TYPES),
+    "opt_loan": (40, 80),
+    "opt_bonus": (1.0, 2.0),
+    "opt_personnel": (1.0, 5.0),
+    "opt_sales": (3.0, 8.0),
+    "opt_candidates": 100_000,
+    "cf_deposit": 15,
+    "cf_start": MODEL_EPOCH,
+    "sc_field": next(iter(SCENARIO_GLOBAL_FIELDS)),
+    "sc_value_loan_rate": 3.0,
+    "sc_value_loan_ratio": 60.0,
+    "sc_value_price_unit_sale": 60.0,
+    "sc_value_final_unit_cost": 16.23,
+    "sc_value_dev_months": 48.0,
+    "sc_min_irr": -100.0,
+    "sc_min_landlord": 0.0,
+    "sc_sort": "IRR%",
+}
+prof.checkpoint("標籤頁")
+for _key, _default in TAB_WIDGET_DEFAULTS.items():
+    st.session_state[_key] = st.session_state.get(_key, _default)
+
+# 舊版 Streamlit 不支援 on_change，此時各標籤頁的 .open 為 None，全部照常執行
+if "on_change" in inspect.signature(st.tabs).parameters:
+    main_tabs = st.tabs(list(MAIN_TABS), key="main_tab", on_change="rerun")
+else:
+    main_tabs = st.tabs(list(MAIN_TABS))
+
+for tab, (tab_label, render_tab) in zip(main_tabs, MAIN_TABS.items()):
+    with tab:
+        if getattr(tab, "open", None) is not False:
+            with prof.section(f"標籤頁 {tab_label}"):
+                render_tab()
+
 st.divider()
 
 # ============================================================================
 # 📥 報告產生與下載區
 # ============================================================================
 
-def generate_report(res_dict: dict) -> str:
-    """生成 TXT 格式報告"""
+# 報告與參數文字列出的模型費率（ModelParams 欄位，單位 %）
+REPORT_RATE_LABELS = {
+    "demolition_pct": "拆遷補償",
+    "reloc_comp_pct": "拆遷安置",
+    "design_fee_pct": "設計費率",
+    "tax_pct": "稅捐",
+}
+
+
+def generate_report(res_dict: dict, p: ModelParams, base_unit_cost: float, mat_coeff: float, rate_source: str) -> str:
+    """生成 TXT 格式報告本文；只依輸入而定（不含產生時間），可依輸入快取"""
     cf = res_dict["Cashflow"]
     lines = [
-        "【新北市防災都更財務模型｜IRR 計算報告】",
-        f"產生時間：{datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
         "【報告版本】論文修正版 v3.0 - 整合五案件統計數據",
         "=" * 60,
         "",
         "【一、基地與容積參數】",
-        f"基地面積：{base_area:.2f} 坪",
-        f"原建築容積率：{far_base_exist * 100:.1f}%",
-        f"防災獎勵倍數：{bonus_multiplier:.2f}",
-        f"總樓地板係數 K_GFA：{coeff_gfa:.2f}",
-        f"銷售面積係數 K_Sale：{coeff_sale:.2f}",
+        f"基地面積：{p.base_area:.2f} 坪",
+        f"原建築容積率：{p.far_base_exist * 100:.1f}%",
+        f"防災獎勵倍數：{p.bonus_multiplier:.2f}",
+        f"總樓地板係數 K_GFA：{p.coeff_gfa:.2f}",
+        f"銷售面積係數 K_Sale：{p.coeff_sale:.2f}",
         "",
         "【二、營建與建材參數】",
         f"基準營建單價：{base_unit_cost:.2f} 萬/坪",
-        f"修正後營建單價：{final_unit_cost:.2f} 萬/坪",
+        f"修正後營建單價：{p.final_unit_cost:.2f} 萬/坪",
         f"建材係數：+{mat_coeff}",
         "",
         "【三、財務與風險參數】",
-        f"產權人數：{num_owners:.0f} 人",
-        f"貸款成數：{loan_ratio * 100:.0f}%",
-        f"貸款利率：{loan_rate * 100:.2f}%",
-        f"開發期程：{dev_months:.0f} 月",
+        f"產權人數：{p.num_owners:.0f} 人",
+        f"貸款成數：{p.loan_ratio * 100:.0f}%",
+        f"貸款利率：{p.loan_rate * 100:.2f}%",
+        f"開發期程：{p.dev_months:.0f} 月",
         f"風險管理費率（查表）：{res_dict['Risk_Rate'] * 100:.1f}%",
         "",
         "【四、共同負擔成本明細（萬元）】",
@@ -1014,7 +1655,8 @@ def generate_report(res_dict: dict) -> str:
         "【五、總銷價值與分回】",
         f"總銷金額：{res_dict['Total_Value'] / 10000:.2f} 億元",
         f"地主分回比例：{res_dict['Landlord_Ratio'] * 100:.2f}%",
-        f"實施者 IRR：{res_dict['IRR'] * 100:.2f}%",
+        f"實施者 IRR：{res_dict['IRR'] * 100:.2f}%" if not np.isnan(res_dict["IRR"])
+        else f"實施者 IRR：無解（{IRR_NAN_NOTE}）",
         "",
         "【六、現金流（IRR 計算基礎，單位：萬元）】",
         f"T0：{cf['T0']:>12,.2f}",
@@ -1025,66 +1667,85 @@ def generate_report(res_dict: dict) -> str:
         "",
         "【七、投資可行性判斷】",
         "✔ IRR ≥ 12%，專案具投資可行性。" if res_dict["IRR"] >= 0.12
+        else "✘ IRR 無解，專案需調整參數以達到投資門檻。" if np.isnan(res_dict["IRR"])
         else "✘ IRR < 12%，專案需調整參數以達到投資門檻。",
         "",
-        "【八、五案件統計對標說明】",
-        f"本模型已整合五案件統計數據作為參數設定基礎：",
-        f"- 設計費率：{STATISTICS_AVG['design_fee_pct']:.2f}% （官方基準 {OFFICIAL_STANDARD['design_fee_pct']:.2f}%）",
-        f"- 拆遷安置：{STATISTICS_AVG['reloc_comp_pct']:.2f}% （官方基準 {OFFICIAL_STANDARD['reloc_comp_pct']:.2f}%）",
-        f"- 管理費率：{STATISTICS_AVG['mgmt_fee_pct']:.2f}% （官方基準 {OFFICIAL_STANDARD['mgmt_fee_pct']:.2f}%）",
+        "【八、費率設定與官方基準對標】",
+        f"費率來源：{rate_source}",
+        *(f"- {label}：{getattr(p, name):.2f}% （官方基準 {OFFICIAL_STANDARD[name]:.2f}%）"
+          for name, label in REPORT_RATE_LABELS.items()),
     ])
 
     return "\n".join(lines)
 
 
+def stamp_report(body: str) -> str:
+    """於下載當下加上報告標題與產生時間"""
+    return "\n".join([
+        "【新北市防災都更財務模型｜IRR 計算報告】",
+        f"產生時間：{datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
+        body,
+    ])
+
+
 def generate_excel(res_dict: dict) -> io.BytesIO:
     """生成 Excel 檔案"""
-    output = io.BytesIO()
+    return io.BytesIO(excel_bytes(excel_sheets(res_dict)))
 
-    df_cost = pd.DataFrame(
-        res_dict["Details"].items(), columns=["項目", "金額(萬元)"]
-    )
-
-    cf = res_dict["Cashflow"]
-    df_cf = pd.DataFrame({
-        "期別": ["T0", "T1", "T2", "T3", "T4"],
-        "金額(萬元)": [cf["T0"], cf["T1"], cf["T2"], cf["T3"], cf["T4"]],
-    })
 
-    with pd.ExcelWriter(output, engine="openpyxl") as writer:
-        df_cost.to_excel(writer, sheet_name="成本拆解", index=False)
-        df_cf.to_excel(writer, sheet_name="現金流量表", index=False)
+def generate_parquet(res_dict: dict, p: ModelParams) -> bytes:
+    """生成 Parquet 檔案（輸入參數與各項輸出各為一欄，供下游分析）"""
+    from arrow_export import to_parquet_bytes
 
-    output.seek(0)
-    return output
+    return to_parquet_bytes(res_dict, p)
 
 
 # ============================================================================
 # 下載按鈕區
 # ============================================================================
+prof.checkpoint("匯出區")
+
 st.markdown("### 📥 報告與試算結果下載")
 
-col_a, col_b, col_c = st.columns(3)
+col_a, col_b, col_c, col_d = st.columns(4)
 
+# 匯出內容依輸入快取，重複下載不再重新產生；鍵須涵蓋報告用到但不在 ModelParams 中的側邊欄輸入，
+# 產生時間則於下載時才加上
+export_key = (params_hash, base_unit_cost, mat_coeff, rate_source)
 with col_a:
-    report_text = generate_report(res)
-    st.download_button(
+    download_on_demand(
         label="📝 TXT 報告",
-        data=report_text,
+        build=lambda: stamp_report(memo.get_or_compute(
+            ("report_txt", *export_key),
+            lambda: timed(prof, "匯出 TXT", generate_report, res, params, base_unit_cost, mat_coeff,
+                          rate_source),
+        )),
         file_name="IRR_Report_v3.0.txt",
         mime="text/plain",
+        key="download_txt",
     )
 
 with col_b:
-    excel_file = generate_excel(res)
-    st.download_button(
+    download_on_demand(
         label="📊 Excel 數據",
-        data=excel_file,
+        build=lambda: memo.get_or_compute(("report_xlsx", *export_key),
+                                          lambda: timed(prof, "匯出 Excel", generate_excel, res).getvalue()),
         file_name="Urban_Redevelopment_Cost_Cashflow_v3.0.xlsx",
         mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        key="download_xlsx",
     )
 
 with col_c:
+    download_on_demand(
+        label="🗂️ Parquet 結果",
+        build=lambda: memo.get_or_compute(("report_parquet", *export_key),
+                                          lambda: timed(prof, "匯出 Parquet", generate_parquet, res, params)),
+        file_name="Urban_Redevelopment_Result_v3.0.parquet",
+        mime="application/vnd.apache.parquet",
+        key="download_parquet",
+    )
+
+with col_d:
     st.download_button(
         label="📄 複製參數",
         data=f"""【都更模型參數配置 v3.0】
@@ -1097,16 +1758,20 @@ with col_c:
 人事費率: {rate_personnel * 100:.1f}%
 銷售費率: {rate_sales * 100:.1f}%
 ---
-【五案件統計參考】
-設計費率: {STATISTICS_AVG['design_fee_pct']:.2f}%
-拆遷安置: {STATISTICS_AVG['reloc_comp_pct']:.2f}%
-管理費率: {STATISTICS_AVG['mgmt_fee_pct']:.2f}%
-貸款利息: {STATISTICS_AVG['loan_interest_pct']:.2f}%
-""",
+【費率設定】來源：{rate_source}
+""" + "".join(f"{label}: {getattr(params, name):.2f}%\n" for name, label in REPORT_RATE_LABELS.items()),
         file_name="model_params_v3.0.txt",
         mime="text/plain",
     )
 
+prof.checkpoint("頁尾")
+with st.expander("🧠 快取統計（本工作階段）", expanded=False):
+    memo_stats = memo.stats()
+    st.caption(
+        f"命中 {memo_stats['hits']} 次 / 未命中 {memo_stats['misses']} 次"
+        f"（命中率 {memo_stats['hit_rate'] * 100:.0f}%），快取 {memo_stats['size']}/{memo_stats['maxsize']} 筆"
+    )
+
 # ============================================================================
 # 頁尾資訊
 # ============================================================================
@@ -1122,3 +1787,46 @@ st.markdown(
     """,
     unsafe_allow_html=True,
 )
+
+# ============================================================================
+# 🛠️ 效能剖析面板（僅在啟用時顯示，本段不計入剖析）
+# ============================================================================
+prof.finish()
+if prof.enabled:
+    prof.log()
+    profile_history = st.session_state.setdefault("profile_history", collections.deque(maxlen=20))
+    profile_history.append(prof)
+    with st.expander("🛠️ 效能剖析（本次重跑）", expanded=False):
+        df_prof = pd.DataFrame(prof.to_records())
+        df_prof["區段"] = ["　" * d + n for d, n in zip(df_prof["depth"], df_prof["name"])]
+        df_prof["耗時 (ms)"] = df_prof["duration"] * 1000
+        df_prof["佔比 (%)"] = df_prof["duration"] / prof.total * 100
+        columns = ["區段", "耗時 (ms)", "佔比 (%)"]
+        if prof.track_alloc:
+            df_prof["淨配置 (KB)"] = df_prof["alloc_kb"]
+            df_prof["尖峰 (KB)"] = df_prof["peak_kb"]
+            columns += ["淨配置 (KB)", "尖峰 (KB)"]
+        st.caption(f"本次重跑共 {prof.total * 1000:.1f} ms；最近 {len(profile_history)} 次："
+                   + "、".join(f"{p.total * 1000:.0f}" for p in profile_history) + " ms")
+        st.dataframe(
+            df_prof.sort_values("start")[columns].style.format(
+                {c: "{:,.1f}" for c in columns[1:]}
+            ),
+            use_container_width=True,
+            hide_index=True,
+        )
+        col_prof_a, col_prof_b = st.columns(2)
+        with col_prof_a:
+            st.download_button(
+                label="📄 結構化日誌 (JSONL)",
+                data="\n".join(p.to_jsonl() for p in profile_history),
+                file_name="rerun_profile.jsonl",
+                mime="application/x-ndjson",
+            )
+        with col_prof_b:
+            st.download_button(
+                label="🧭 Chrome trace (JSON)",
+                data=json.dumps(chrome_trace(list(profile_history)), ensure_ascii=False),
+                file_name="rerun_trace.json",
+                mime="application/json",
+            )
@@ -0,0 +1,186 @@
+"""欄式（Arrow / Parquet）結果匯出
+
+將單一 `engine.evaluate()` 結果或 `batch.BatchResult` 轉為 pyarrow Table：輸入參數（可選）、
+GFA、Details 各項成本、Total_Cost、Total_Value、Landlord_Ratio、Risk_Rate、IRR 與
+Cashflow_T0..T4 各為一欄。欄位直接由 NumPy 陣列建立（連續的 float64 陣列為零複製），
+不經逐列 Python 轉換；多維批次結果依 C 順序攤平為一維。
+
+- Parquet：預設 zstd 壓縮，row group 固定約 ROW_GROUP_SIZE 列，可依 row group 平行或部分讀取。
+- Arrow IPC（.arrow / .feather）：預設不壓縮，可 memory-map 直接載入。
+- 大量情境請用 `ParquetResultWriter` 逐塊寫出，記憶體只與分塊大小有關；
+  `sweep.run_sweep()` 的結果以 `sweep_table()` 轉換。
+"""
+from __future__ import annotations
+
+import os
+from dataclasses import fields
+from typing import Mapping, Optional, Union
+
+import numpy as np
+
+from batch import CASHFLOW_PERIODS, BatchResult
+from engine import ModelParams
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+ROW_GROUP_SIZE = 128 * 1024
+COMPRESSION = "zstd"
+# 結果幾乎全為高基數浮點欄位，字典編碼只會在每個分頁嘗試後退回，寫出慢 4 倍以上且檔案更大
+PARQUET_OPTIONS = {"use_dictionary": False}
+
+Inputs = Union[ModelParams, Mapping[str, object], None]
+
+
+def available() -> bool:
+    return pa is not None
+
+
+def _require_pyarrow() -> None:
+    if pa is None:
+        raise RuntimeError("Arrow / Parquet 匯出需要安裝 pyarrow")
+
+
+def _as_batch(res) -> BatchResult:
+    """`engine.evaluate()` 的結果轉為長度 1 的 BatchResult"""
+    if isinstance(res, BatchResult):
+        return res
+    one = lambda v: np.array([v], dtype=float)  # noqa: E731
+    irr = one(res.get("IRR", np.nan))
+    return BatchResult(
+        GFA=one(res["GFA"]),
+        Total_Cost=one(res["Total_Cost"]),
+        Total_Value=one(res["Total_Value"]),
+        Landlord_Ratio=one(res["Landlord_Ratio"]),
+        Risk_Rate=one(res["Risk_Rate"]),
+        Details={k: one(v) for k, v in res["Details"].items()},
+        Cashflow=np.array([[res["Cashflow"][t] for t in CASHFLOW_PERIODS]], dtype=float),
+        IRR=irr,
+        IRR_Converged=np.isfinite(irr),
+    )
+
+
+def result_columns(res, inputs: Inputs = None) -> dict:
+    """欄位名稱 → 一維 NumPy 陣列；inputs 的值可為純量或可 broadcast 至結果形狀的陣列"""
+    batch = _as_batch(res)
+    shape = batch.shape
+    flat = lambda a: np.ascontiguousarray(np.broadcast_to(a, shape)).reshape(-1)  # noqa: E731
+    if isinstance(inputs, ModelParams):
+        inputs = {f.name: getattr(inputs, f.name) for f in fields(ModelParams)}
+    cols = {name: flat(np.asarray(v, dtype=float)) for name, v in (inputs or {}).items()}
+    cols["GFA"] = flat(batch.GFA)
+    cols.update((name, flat(v)) for name, v in batch.Details.items())
+    for name in ("Total_Cost", "Total_Value", "Landlord_Ratio", "Risk_Rate"):
+        cols[name] = flat(getattr(batch, name))
+    if batch.IRR is not None:
+        cols["IRR"] = flat(batch.IRR)
+        cols["IRR_Converged"] = flat(batch.IRR_Converged)
+    cf = batch.Cashflow.reshape(-1, len(CASHFLOW_PERIODS))
+    for j, t in enumerate(CASHFLOW_PERIODS):
+        cols[f"Cashflow_{t}"] = np.ascontiguousarray(cf[:, j])
+    return cols
+
+
+def result_table(res, inputs: Inputs = None) -> "pa.Table":
+    """結果轉為 Arrow Table（NaN 保留為浮點 NaN，IRR 是否有解另見 IRR_Converged）"""
+    _require_pyarrow()
+    return pa.table({name: pa.array(v) for name, v in result_columns(res, inputs).items()})
+
+
+def columns_table(columns: Mapping[str, np.ndarray], shape: Optional[tuple] = None) -> "pa.Table":
+    """任意欄位陣列（例如 `SweepResult.outputs` 與掃描輸入）broadcast 至 shape 後攤平為 Table"""
+    _require_pyarrow()
+    arrays = {k: np.asarray(v) for k, v in columns.items()}
+    shape = shape if shape is not None else np.broadcast_shapes(*(a.shape for a in arrays.values()))
+    return pa.table({k: pa.array(np.ascontiguousarray(np.broadcast_to(a, shape)).reshape(-1))
+                     for k, a in arrays.items()})
+
+
+def sweep_table(result, inputs: Optional[Mapping[str, object]] = None) -> "pa.Table":
+    """`sweep.SweepResult` 轉為 Table：掃描輸入（broadcast 至結果形狀）與各輸出欄位；取消時另附 Completed 欄"""
+    cols = {**(inputs or {}), **result.outputs}
+    if result.cancelled:
+        cols["Completed"] = result.completed
+    return columns_table(cols, result.shape)
+
+
+def _is_ipc(path: str) -> bool:
+    return os.path.splitext(path)[1].lower() in (".arrow", ".feather", ".ipc")
+
+
+def write_table(table: "pa.Table", path: str, compression: Optional[str] = COMPRESSION,
+                row_group_size: int = ROW_GROUP_SIZE) -> None:
+    """依副檔名寫出 Parquet 或 Arrow IPC（IPC 一律不壓縮以便 memory-map）"""
+    _require_pyarrow()
+    if _is_ipc(path):
+        with pa.OSFile(path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table, max_chunksize=row_group_size)
+    else:
+        pq.write_table(table, path, compression=compression, row_group_size=row_group_size, **PARQUET_OPTIONS)
+
+
+def write_results(path: str, res, inputs: Inputs = None, **kwargs) -> None:
+    """單一結果或整批結果寫為 Parquet / Arrow IPC"""
+    write_table(result_table(res, inputs), path, **kwargs)
+
+
+def to_parquet_bytes(res, inputs: Inputs = None, compression: Optional[str] = COMPRESSION,
+                     row_group_size: int = ROW_GROUP_SIZE) -> bytes:
+    """結果轉為 Parquet 位元組（供下載）"""
+    _require_pyarrow()
+    sink = pa.BufferOutputStream()
+    pq.write_table(result_table(res, inputs), sink, compression=compression, row_group_size=row_group_size,
+                   **PARQUET_OPTIONS)
+    return sink.getvalue().to_pybytes()
+
+
+class ParquetResultWriter:
+    """逐塊寫出批次結果；累積至 row_group_size 列才寫出一個 row group，避免分塊過小造成零碎的 row group"""
+
+    def __init__(self, path: str, compression: Optional[str] = COMPRESSION, row_group_size: int = ROW_GROUP_SIZE):
+        _require_pyarrow()
+        self.path = path
+        self.compression = compression
+        self.row_group_size = row_group_size
+        self.rows = 0
+        self._writer = None
+        self._pending = []
+        self._pending_rows = 0
+
+    def write(self, res, inputs: Inputs = None) -> None:
+        self.write_table(result_table(res, inputs))
+
+    def write_table(self, table: "pa.Table") -> None:
+        if self._writer is None:
+            self._writer = pq.ParquetWriter(self.path, table.schema, compression=self.compression, **PARQUET_OPTIONS)
+        self._pending.append(table.cast(self._writer.schema))
+        self._pending_rows += table.num_rows
+        self.rows += table.num_rows
+        if self._pending_rows >= self.row_group_size:
+            self._flush(final=False)
+
+    def _flush(self, final: bool) -> None:
+        if not self._pending:
+            return
+        table = pa.concat_tables(self._pending)
+        full = table.num_rows if final else table.num_rows // self.row_group_size * self.row_group_size
+        if full:
+            self._writer.write_table(table.slice(0, full), row_group_size=self.row_group_size)
+        rest = table.slice(full)
+        self._pending = [rest] if rest.num_rows else []
+        self._pending_rows = rest.num_rows
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._flush(final=True)
+            self._writer.close()
+            self._writer = None
+
+    def __enter__(self) -> "ParquetResultWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,253 @@
+"""批次（向量化）模型計算
+
+以 NumPy 陣列一次計算大量參數組合，公式與 `engine.evaluate()` 逐項對應，
+輸入欄位名稱即 `ModelParams` 欄位，未給的欄位沿用 `base` 參數；各欄位依
+NumPy broadcasting 規則組合（例如 `price_unit_sale=p[None, :]`、
+`final_unit_cost=c[:, None]` 即為二維網格）。
+
+公式寫在 `_model_terms()`，輸入可為 NumPy 陣列或前向自動微分的 `_Dual`，
+`gradients.evaluate_gradients()` 與本模組共用同一份公式求值與偏導數。
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, fields
+from typing import Dict, Iterator, Mapping, Optional
+
+import numpy as np
+
+from engine import PARKING_GFA_PER_SPACE, ModelParams
+from irr import irr_batch
+from risk_fee import DEFAULT_SCHEDULE, RiskFeeSchedule
+
+# 可批次輸入的欄位（與 ModelParams 相同）
+BATCH_FIELDS = tuple(f.name for f in fields(ModelParams))
+
+# 現金流期別
+CASHFLOW_PERIODS = ("T0", "T1", "T2", "T3", "T4")
+
+# Details 項目 → `_model_terms()` 中間項
+DETAIL_TERMS = {
+    "工程費(含拆除)": "c_engineering",
+    "設計費": "c_design",
+    "拆遷安置費": "c_reloc",
+    "風險管理費": "c_mgmt_risk",
+    "人事管理費": "c_mgmt_personnel",
+    "銷售管理費": "c_mgmt_sales",
+    "貸款利息": "c_interest",
+    "稅捐": "c_tax",
+    "進階費用": "c_advanced",
+}
+
+
+@dataclass(slots=True)
+class BatchResult:
+    """批次計算結果，欄位意義同 `ModelResult`，每個值皆為同形狀陣列"""
+    GFA: np.ndarray
+    Total_Cost: np.ndarray
+    Total_Value: np.ndarray
+    Landlord_Ratio: np.ndarray
+    Risk_Rate: np.ndarray
+    Details: Dict[str, np.ndarray]
+    Cashflow: np.ndarray  # shape (..., 5)，對應 CASHFLOW_PERIODS
+    IRR: Optional[np.ndarray] = None            # with_irr=False 時為 None
+    IRR_Converged: Optional[np.ndarray] = None  # False 表示無根或未收斂（IRR 為 NaN）
+
+    @property
+    def shape(self) -> tuple:
+        return self.GFA.shape
+
+    def __len__(self) -> int:
+        return len(self.GFA)
+
+    def row(self, i) -> dict:
+        """取出單一情境，格式同 `engine.evaluate()`"""
+        out = {
+            "GFA": float(self.GFA[i]),
+            "Total_Cost": float(self.Total_Cost[i]),
+            "Total_Value": float(self.Total_Value[i]),
+            "Landlord_Ratio": float(self.Landlord_Ratio[i]),
+            "Risk_Rate": float(self.Risk_Rate[i]),
+            "Details": {k: float(v[i]) for k, v in self.Details.items()},
+            "Cashflow": {t: float(self.Cashflow[i][j]) for j, t in enumerate(CASHFLOW_PERIODS)},
+        }
+        if self.IRR is not None:
+            out["IRR"] = float(self.IRR[i])
+        return out
+
+
+class _Dual:
+    """前向模式自動微分的數值：val 形狀 S，dot 形狀 S + (P,)"""
+    __slots__ = ("val", "dot")
+    __array_ufunc__ = None          # ndarray 在左側時改用 _Dual 的反向運算
+
+    def __init__(self, val, dot):
+        self.val = val
+        self.dot = dot
+
+    def __add__(self, other):
+        if isinstance(other, _Dual):
+            return _Dual(self.val + other.val, self.dot + other.dot)
+        return _Dual(self.val + other, self.dot)
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        if isinstance(other, _Dual):
+            return _Dual(self.val - other.val, self.dot - other.dot)
+        return _Dual(self.val - other, self.dot)
+
+    def __rsub__(self, other):
+        return _Dual(other - self.val, -self.dot)
+
+    def __neg__(self):
+        return _Dual(-self.val, -self.dot)
+
+    def __mul__(self, other):
+        if isinstance(other, _Dual):
+            return _Dual(self.val * other.val,
+                         self.dot * np.asarray(other.val)[..., None] + other.dot * np.asarray(self.val)[..., None])
+        return _Dual(self.val * other, self.dot * np.asarray(other)[..., None])
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other):
+        if isinstance(other, _Dual):
+            q = self.val / other.val
+            return _Dual(q, (self.dot - other.dot * np.asarray(q)[..., None]) / np.asarray(other.val)[..., None])
+        return _Dual(self.val / other, self.dot / np.asarray(other)[..., None])
+
+
+def _value(x):
+    """`_Dual` 取其值，陣列原樣回傳（用於階梯函數與條件判斷）"""
+    return x.val if isinstance(x, _Dual) else x
+
+
+def _where(mask: np.ndarray, x, fill: float):
+    """mask 成立處取 x，否則為常數 fill（導數為 0）"""
+    if isinstance(x, _Dual):
+        return _Dual(np.where(mask, x.val, fill), np.where(mask[..., None], x.dot, 0.0))
+    return np.where(mask, x, fill)
+
+
+def risk_fee_rate_batch(gfa_ping, owners, schedule: Optional[RiskFeeSchedule] = None) -> np.ndarray:
+    """風險管理費率查表（表3-1）的向量化版本，結果與 `get_risk_fee_rate` 相同"""
+    return (schedule or DEFAULT_SCHEDULE).rate_batch(gfa_ping, owners)
+
+
+def _columns(base: ModelParams, overrides: Mapping) -> Dict[str, np.ndarray]:
+    unknown = set(overrides) - set(BATCH_FIELDS)
+    if unknown:
+        raise TypeError(f"未知的批次參數：{', '.join(sorted(unknown))}")
+    return {
+        name: np.asarray(overrides[name] if name in overrides else getattr(base, name), dtype=float)
+        for name in BATCH_FIELDS
+    }
+
+
+def _model_terms(c: Mapping) -> Dict[str, object]:
+    """模型公式：由輸入欄位計算各中間項（值可為陣列或 `_Dual`，依 broadcasting 組合）"""
+    # 1. 面積計算
+    area_far = c["base_area"] * c["far_base_exist"] * c["bonus_multiplier"]
+    area_total = area_far * c["coeff_gfa"]
+    area_sale = area_far * c["coeff_sale"]
+    num_parking = np.trunc(_value(area_total) / PARKING_GFA_PER_SPACE)        # 階梯：導數 0
+    risk_rate = risk_fee_rate_batch(_value(area_total), _value(c["num_owners"]))  # 階梯：導數 0
+
+    # 2. 工程費
+    c_demo = area_total * c["demolition_pct"] / 100
+    c_build = area_total * c["final_unit_cost"]
+    c_engineering = c_demo + c_build
+
+    # 3. 進階費用
+    c_advanced = c["cost_bonus_app"] + c["cost_urban_plan"] + c["cost_transfer"]
+
+    # 4. 設計 / 安置費
+    c_design = c_build * (c["design_fee_pct"] / 100)
+    c_reloc = c_build * (c["reloc_comp_pct"] / 100)
+
+    # 5. 管理費
+    c_mgmt_risk = c_build * risk_rate
+    c_mgmt_personnel = c_build * c["rate_personnel"]
+    c_mgmt_sales = (area_sale * c["price_unit_sale"]) * c["rate_sales"]
+    c_mgmt_total = c_mgmt_risk + c_mgmt_personnel + c_mgmt_sales
+
+    # 6. 利息
+    fund_demand = c_engineering + c_advanced + c_design + c_reloc
+    c_interest = fund_demand * c["loan_ratio"] * c["loan_rate"] * (c["dev_months"] / 12) * 0.5
+
+    # 7. 稅捐
+    c_tax = c_build * (c["tax_pct"] / 100)
+
+    # 8. 總成本
+    c_total = c_engineering + c_advanced + c_design + c_reloc + c_mgmt_total + c_interest + c_tax
+
+    # 9. 總銷價值（總銷 ≤ 0 時負擔比例固定為 0）
+    val_parking_total = num_parking * c["price_parking"]
+    val_new_total = (area_sale * c["price_unit_sale"]) + val_parking_total
+
+    positive = _value(val_new_total) > 0
+    ratio_burden = _where(positive, c_total / _where(positive, val_new_total, 1.0), 0.0)
+    ratio_landlord = 1 - ratio_burden
+
+    # 10. IRR 現金流
+    equity_ratio = 1 - c["loan_ratio"]
+    initial_out = (c_advanced + c_design) + (c_engineering * equity_ratio * 0.1)
+    yearly_cost = (c_engineering * equity_ratio * 0.9) / 3
+    loan_repay = fund_demand * c["loan_ratio"]
+    final_in = val_new_total - loan_repay - c_tax - c_mgmt_total - c_interest
+
+    return {
+        "area_total": area_total,
+        "risk_rate": risk_rate,
+        "c_engineering": c_engineering,
+        "c_advanced": c_advanced,
+        "c_design": c_design,
+        "c_reloc": c_reloc,
+        "c_mgmt_risk": c_mgmt_risk,
+        "c_mgmt_personnel": c_mgmt_personnel,
+        "c_mgmt_sales": c_mgmt_sales,
+        "c_interest": c_interest,
+        "c_tax": c_tax,
+        "c_total": c_total,
+        "val_new_total": val_new_total,
+        "ratio_landlord": ratio_landlord,
+        # 現金流 T0..T4
+        "flows": (-initial_out, -yearly_cost, -yearly_cost, -yearly_cost, final_in),
+    }
+
+
+def evaluate_batch(base: ModelParams = ModelParams(), with_irr: bool = True, **overrides) -> BatchResult:
+    """向量化計算共同負擔、總銷、現金流與 IRR（with_irr=False 可略過 IRR 求解）"""
+    c = _columns(base, overrides)
+    shape = np.broadcast_shapes(*(v.shape for v in c.values()))
+    t = _model_terms(c)
+
+    cashflow = np.empty(shape + (len(CASHFLOW_PERIODS),))
+    for i, flow in enumerate(t["flows"]):
+        cashflow[..., i] = flow
+
+    def full(a):
+        return np.broadcast_to(a, shape)
+
+    irr_val, irr_conv = irr_batch(cashflow) if with_irr else (None, None)
+
+    return BatchResult(
+        GFA=full(t["area_total"]),
+        Total_Cost=full(t["c_total"]),
+        Total_Value=full(t["val_new_total"]),
+        Landlord_Ratio=full(t["ratio_landlord"]),
+        Risk_Rate=full(t["risk_rate"]),
+        Details={label: full(t[name]) for label, name in DETAIL_TERMS.items()},
+        Cashflow=cashflow,
+        IRR=irr_val,
+        IRR_Converged=irr_conv,
+    )
+
+
+def iter_batches(columns: Mapping[str, np.ndarray], chunk_size: int = 1_000_000,
+                 base: ModelParams = ModelParams(), with_irr: bool = True) -> Iterator[tuple]:
+    """將一維欄位分塊計算，回傳 (slice, BatchResult)，記憶體用量以 chunk_size 為上限"""
+    n = len(next(iter(columns.values())))
+    for start in range(0, n, chunk_size):
+        sl = slice(start, min(start + chunk_size, n))
+        yield sl, evaluate_batch(base, with_irr, **{k: np.asarray(v)[sl] for k, v in columns.items()})
@@ -0,0 +1,46 @@
+"""欄式匯出效能：`arrow_export` 將批次結果寫為 Parquet / Arrow IPC 及重新載入的耗時
+
+執行：python benchmarks/bench_arrow.py [--rows 1000000] [--out-dir /tmp]
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_batch import random_columns  # noqa: E402
+from arrow_export import pa, pq, result_table, write_table  # noqa: E402
+from batch import evaluate_batch  # noqa: E402
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--out-dir", default=tempfile.gettempdir())
+    args = parser.parse_args(argv)
+
+    cols = random_columns(args.rows)
+    res = evaluate_batch(**cols)
+    t0 = time.perf_counter()
+    table = result_table(res, cols)
+    print(f"{args.rows:,} 列 × {table.num_columns} 欄：建立 Table {time.perf_counter() - t0:.3f} 秒")
+
+    for ext, load in ((".parquet", pq.read_table),
+                      (".arrow", lambda p: pa.ipc.open_file(pa.memory_map(p)).read_all())):
+        path = os.path.join(args.out_dir, f"bench_results{ext}")
+        t0 = time.perf_counter()
+        write_table(table, path)
+        written = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        load(path)
+        loaded = time.perf_counter() - t0
+        print(f"{ext:9s} 寫出 {written:6.2f} 秒  載入 {loaded:6.3f} 秒  檔案 {os.path.getsize(path) / 1e6:7.1f} MB")
+        os.unlink(path)
+
+
+if __name__ == "__main__":
+    main()
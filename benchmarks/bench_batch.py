@@ -0,0 +1,64 @@
+"""批次計算效能比較：逐筆 `engine.evaluate()` vs 向量化 `batch.evaluate_batch()`
+
+執行：python benchmarks/bench_batch.py [--rows 1000000] [--scalar-rows 20000]
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from batch import evaluate_batch  # noqa: E402
+from engine import ModelParams, evaluate  # noqa: E402
+
+
+def random_columns(n: int, seed: int = 0) -> dict:
+    """產生 n 組隨機基地參數"""
+    rng = np.random.default_rng(seed)
+    return {
+        "base_area": rng.uniform(150, 1500, n),
+        "far_base_exist": rng.uniform(1.5, 4.5, n),
+        "bonus_multiplier": rng.uniform(1.0, 2.0, n),
+        "final_unit_cost": rng.uniform(12, 30, n),
+        "loan_ratio": rng.uniform(0.4, 0.8, n),
+        "loan_rate": rng.uniform(0.02, 0.05, n),
+        "dev_months": rng.integers(24, 96, n).astype(float),
+        "num_owners": rng.integers(5, 200, n).astype(float),
+        "price_unit_sale": rng.uniform(35, 110, n),
+        "price_parking": rng.uniform(150, 350, n),
+    }
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--scalar-rows", type=int, default=20_000)
+    args = parser.parse_args(argv)
+
+    cols = random_columns(args.rows)
+
+    n_scalar = min(args.scalar_rows, args.rows)
+    t0 = time.perf_counter()
+    for i in range(n_scalar):
+        p = ModelParams(**{k: float(v[i]) for k, v in cols.items()})
+        evaluate(p)
+    scalar_per_row = (time.perf_counter() - t0) / n_scalar
+
+    t0 = time.perf_counter()
+    res = evaluate_batch(**cols)
+    batch_total = time.perf_counter() - t0
+    batch_per_row = batch_total / args.rows
+
+    print(f"逐筆 evaluate      : {scalar_per_row * 1e6:10.3f} µs/列（取樣 {n_scalar:,} 列）")
+    print(f"向量化 evaluate_batch: {batch_per_row * 1e6:10.3f} µs/列（{args.rows:,} 列，共 {batch_total:.3f} 秒）")
+    print(f"加速倍數            : {scalar_per_row / batch_per_row:10.1f}x")
+    print(f"檢查值（平均地主分回比）: {res.Landlord_Ratio.mean():.6f}")
+
+
+if __name__ == "__main__":
+    main()
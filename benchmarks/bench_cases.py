@@ -0,0 +1,88 @@
+"""參考案件資料庫效能：大量案件下依條件篩選並重算費率統計的耗時（重新彙總 / 快取），以及相似案件搜尋
+
+執行：python benchmarks/bench_cases.py [--cases 50000] [--repeat 20]
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cases import DEVELOPER_TYPES, RATE_FIELDS, CaseFilter, CaseStore  # noqa: E402
+from comparables import ComparableIndex, ProjectProfile, cKDTree  # noqa: E402
+
+DISTRICTS = ("板橋區", "三重區", "中和區", "永和區", "新莊區", "新店區", "土城區", "蘆洲區", "汐止區", "淡水區")
+
+
+def random_cases(n: int, seed: int = 0):
+    """產生 n 筆隨機案件"""
+    rng = np.random.default_rng(seed)
+    area = rng.lognormal(6.5, 0.5, n)
+    above = rng.integers(8, 30, n)
+    below = rng.integers(2, 7, n)
+    rates = {name: rng.uniform(0.5, 1.5, n) * base
+             for name, base in zip(RATE_FIELDS, (3.4, 6.3, 2.3, 5.3, 4.4, 30.7))}
+    for i in range(n):
+        yield {
+            "case_key": f"C{i:06d}",
+            "district": DISTRICTS[i % len(DISTRICTS)],
+            "developer": DEVELOPER_TYPES[int(rng.integers(0, 2))],
+            "area_ping": float(area[i]),
+            "floors": f"{above[i]}F+B{below[i]}",
+            "total_cost": float(area[i] * rng.uniform(1.8e6, 3.2e6)),
+            **{name: float(v[i]) for name, v in rates.items()},
+        }
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cases", type=int, default=50_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    store = CaseStore()
+    t0 = time.perf_counter()
+    store.add_cases(random_cases(args.cases))
+    print(f"匯入 {args.cases:,} 筆案件：{time.perf_counter() - t0:.2f} 秒")
+    t0 = time.perf_counter()
+    store.snapshot()
+    print(f"載入欄位快照：{(time.perf_counter() - t0) * 1e3:.1f} ms（每次寫入後一次）")
+
+    filters = {
+        "全部": CaseFilter(),
+        "建設公司 ≥ 800 坪": CaseFilter(developer="建設公司", min_area=800),
+        "三重/新莊 更新會": CaseFilter(districts=("三重區", "新莊區"), developer="更新會"),
+        "15-20 樓": CaseFilter(min_floors=15, max_floors=20),
+    }
+    for label, flt in filters.items():
+        t0 = time.perf_counter()
+        for _ in range(args.repeat):
+            stats = store._aggregate(flt)
+        cold = (time.perf_counter() - t0) / args.repeat
+        store.aggregate(flt)
+        t0 = time.perf_counter()
+        for _ in range(args.repeat):
+            store.aggregate(flt)
+        warm = (time.perf_counter() - t0) / args.repeat
+        print(f"{label:16s} {stats.count:>7,} 筆  重新彙總 {cold * 1e3:7.2f} ms  快取 {warm * 1e6:6.1f} µs")
+
+    t0 = time.perf_counter()
+    index = ComparableIndex(store)
+    print(f"相似案件索引（{'cKDTree' if cKDTree is not None else 'LeafKDTree'}）：建立 {time.perf_counter() - t0:.2f} 秒")
+    rng = np.random.default_rng(1)
+    profiles = [ProjectProfile(float(rng.uniform(100, 3000)), float(rng.integers(5, 35)), DEVELOPER_TYPES[i % 2],
+                               float(rng.uniform(50, 300))) for i in range(args.repeat * 10)]
+    for k in (1, 5, 10):
+        t0 = time.perf_counter()
+        for profile in profiles:
+            index.search(profile, k)
+        print(f"  k={k:<3d} 平均查詢 {(time.perf_counter() - t0) / len(profiles) * 1e3:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
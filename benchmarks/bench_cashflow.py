@@ -0,0 +1,44 @@
+"""逐月現金流效能：`cashflow.run_monthly()` 的吞吐量與尖峰記憶體
+
+執行：python benchmarks/bench_cashflow.py [--rows 100000] [--months 120] [--chunk-size 20000]
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_batch import random_columns  # noqa: E402
+from cashflow import DEFAULT_CHUNK_SIZE, run_monthly  # noqa: E402
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--months", type=int, default=120)
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    cols = random_columns(args.rows)
+    cols["dev_months"] = np.full(args.rows, float(args.months))
+
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    summary = run_monthly(chunk_size=args.chunk_size, **cols)
+    seconds = time.perf_counter() - t0
+    _cur, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"{args.rows:,} 情境 × {args.months} 個月：{seconds:.2f} 秒（{args.rows / seconds:,.0f} 情境/秒）")
+    print(f"尖峰記憶體：{peak / 1e6:.1f} MB（chunk_size={args.chunk_size:,}）")
+    print(f"XIRR 無解：{np.count_nonzero(np.isnan(summary['xirr'])):,} 列")
+
+
+if __name__ == "__main__":
+    main()
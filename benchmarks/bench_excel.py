@@ -0,0 +1,52 @@
+"""串流 Excel 匯出效能：`excel_stream.write_excel()` 的吞吐量，以及尖峰記憶體不隨列數增加
+
+執行：python benchmarks/bench_excel.py [--rows 100000 1000000] [--chunk-rows 50000]
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_batch import random_columns  # noqa: E402
+from batch import evaluate_batch  # noqa: E402
+from excel_stream import DEFAULT_CHUNK_ROWS, EXCEL_MAX_ROWS, write_excel  # noqa: E402
+
+
+def result_chunks(n: int, chunk_rows: int):
+    """逐塊產生 n 列隨機基地的輸入與試算結果"""
+    for start in range(0, n, chunk_rows):
+        cols = random_columns(min(chunk_rows, n - start), seed=start)
+        res = evaluate_batch(**cols)
+        yield {**cols, "Total_Cost": res.Total_Cost, "Landlord_Ratio": res.Landlord_Ratio, "IRR": res.IRR,
+               "Feasible": np.nan_to_num(res.IRR, nan=-1.0) >= 0.12}
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS)
+    args = parser.parse_args(argv)
+
+    for n in args.rows:
+        tracemalloc.start()
+        t0 = time.perf_counter()
+        path = write_excel({"試算結果": result_chunks(n, args.chunk_rows)})
+        seconds = time.perf_counter() - t0
+        _cur, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        size = os.path.getsize(path)
+        os.unlink(path)
+        sheets = -(-n // (EXCEL_MAX_ROWS - 1))
+        print(f"{n:>10,} 列：{seconds:7.2f} 秒（{n / seconds:,.0f} 列/秒，含 tracemalloc 負擔）"
+              f"  尖峰 {peak / 1e6:6.1f} MB  檔案 {size / 1e6:6.1f} MB  {sheets} 個工作表")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""IRR 求解效能與精度比較：`npf.irr` 逐筆 vs `irr.irr_batch()`
+
+執行：python benchmarks/bench_irr.py [--rows 100000] [--npf-rows 5000]
+（未安裝 numpy-financial 時只量測 irr_batch）
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from batch import evaluate_batch  # noqa: E402
+from bench_batch import random_columns  # noqa: E402
+from irr import irr_batch  # noqa: E402
+
+try:
+    import numpy_financial as npf
+except ImportError:  # numpy-financial 僅作為比對基準
+    npf = None
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--npf-rows", type=int, default=5_000)
+    args = parser.parse_args(argv)
+
+    cashflow = evaluate_batch(with_irr=False, **random_columns(args.rows)).Cashflow
+
+    t0 = time.perf_counter()
+    rate, converged = irr_batch(cashflow)
+    batch_per_row = (time.perf_counter() - t0) / args.rows
+    print(f"irr_batch : {batch_per_row * 1e6:10.3f} µs/列（{args.rows:,} 列，未收斂 {np.count_nonzero(~converged):,} 列）")
+
+    if npf is None:
+        return
+    n_ref = min(args.npf_rows, args.rows)
+    t0 = time.perf_counter()
+    ref = np.array([npf.irr(cf) for cf in cashflow[:n_ref]])
+    npf_per_row = (time.perf_counter() - t0) / n_ref
+    diff = np.nanmax(np.abs(rate[:n_ref] - ref))
+    print(f"npf.irr   : {npf_per_row * 1e6:10.3f} µs/列（取樣 {n_ref:,} 列）")
+    print(f"加速倍數  : {npf_per_row / batch_per_row:10.1f}x，最大絕對誤差 {diff:.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""情境庫全域重算：`ScenarioStore.reevaluate()` 單次批次計算 vs 逐一 `engine.evaluate()`
+
+執行：python benchmarks/bench_scenarios.py [--scenarios 50 200 1000]
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_batch import random_columns  # noqa: E402
+from engine import ModelParams, evaluate  # noqa: E402
+from scenarios import ScenarioStore  # noqa: E402
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenarios", type=int, nargs="+", default=[50, 200, 1000])
+    args = parser.parse_args(argv)
+
+    for n in args.scenarios:
+        cols = random_columns(n)
+        store = ScenarioStore()
+        for i in range(n):
+            store.add(f"情境 {i + 1}", ModelParams(**{k: float(v[i]) for k, v in cols.items()}))
+        t0 = time.perf_counter()
+        store.reevaluate(loan_rate=0.04)
+        batched = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        for i in range(n):
+            evaluate(store.params(i).replace(loan_rate=0.04))
+        looped = time.perf_counter() - t0
+        print(f"{n:>6,} 個情境：批次 {batched * 1e3:7.2f} ms  逐一 {looped * 1e3:8.2f} ms"
+              f"（{looped / batched:5.1f}×）  儲存 {store.nbytes() / 1024:6.1f} KB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""冷啟動成本：app.py 模組層級匯入在新行程中的逐模組耗時
+
+以 `python -X importtime` 在全新的直譯器中依 app.py 的順序匯入其模組層級依賴，
+列出每個模組「額外」增加的匯入時間（已被前面模組載入者為 0），以及自身耗時最高的子模組。
+函式內延遲匯入的套件（plotly.express、openpyxl、各標籤頁分析模組）不計入。
+
+執行：python benchmarks/bench_startup.py [--repeat 3] [--top 15]
+"""
+from __future__ import annotations
+
+import argparse
+import ast
+import os
+import re
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(ROOT, "app.py")
+
+_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)$")
+
+
+def top_level_imports(path: str = APP_PATH) -> List[str]:
+    """模組層級（非函式內）匯入的模組，依出現順序"""
+    with open(path, encoding="utf-8") as fh:
+        tree = ast.parse(fh.read())
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            names = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module != "__future__":
+            names = [node.module]
+        else:
+            continue
+        modules.extend(n for n in names if n not in modules)
+    return modules
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, float, float]]:
+    """解析 -X importtime 輸出為 [(模組, 深度, 自身秒數, 累計秒數)]"""
+    rows = []
+    for line in stderr.splitlines():
+        m = _LINE.match(line)
+        if m:
+            rows.append((m.group(4), len(m.group(3)) // 2, int(m.group(1)) / 1e6, int(m.group(2)) / 1e6))
+    return rows
+
+
+def import_profile(modules: List[str]) -> Tuple[float, Dict[str, float], List[Tuple[str, int, float, float]]]:
+    """新行程依序匯入 modules；回傳 (行程總耗時, 各模組額外匯入秒數, 完整 importtime 紀錄)"""
+    code = "; ".join(f"import {m}" for m in modules)
+    t0 = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT,
+                          capture_output=True, text=True, check=True)
+    wall = time.perf_counter() - t0
+    rows = parse_importtime(proc.stderr)
+    top = {name: cum for name, depth, _self, cum in rows if depth == 0}
+    return wall, {m: top.get(m, 0.0) for m in modules}, rows
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3, help="重複次數，各數值取最小值")
+    parser.add_argument("--top", type=int, default=15, help="列出自身耗時最高的前 N 個子模組")
+    args = parser.parse_args(argv)
+
+    modules = top_level_imports()
+    walls, per_module, self_times = [], {m: [] for m in modules}, {}
+    for _ in range(args.repeat):
+        wall, costs, rows = import_profile(modules)
+        walls.append(wall)
+        for m, s in costs.items():
+            per_module[m].append(s)
+        for name, _depth, self_s, _cum in rows:
+            self_times[name] = min(self_times.get(name, self_s), self_s)
+
+    best = {m: min(v) for m, v in per_module.items()}
+    total = sum(best.values())
+    print(f"app.py 模組層級匯入：{total * 1e3:.1f} ms（含直譯器啟動的行程總耗時 {min(walls) * 1e3:.1f} ms）")
+    print(f"{'模組':24s} {'額外匯入 (ms)':>14s} {'佔比':>7s}")
+    for m in sorted(modules, key=best.get, reverse=True):
+        print(f"{m:24s} {best[m] * 1e3:14.1f} {best[m] / total:7.1%}")
+    print(f"\n自身耗時最高的 {args.top} 個子模組")
+    for name, s in sorted(self_times.items(), key=lambda kv: kv[1], reverse=True)[:args.top]:
+        print(f"{name:48s} {s * 1e3:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
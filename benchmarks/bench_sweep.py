@@ -0,0 +1,42 @@
+"""多核心掃描擴展性：`sweep.run_sweep()` 在不同 worker 數下的吞吐量
+
+執行：python benchmarks/bench_sweep.py [--rows 5000000] [--workers 1 2 4 8]
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_batch import random_columns  # noqa: E402
+from sweep import DEFAULT_CHUNK_SIZE, run_sweep  # noqa: E402
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=5_000_000)
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--workers", type=int, nargs="+", default=None)
+    args = parser.parse_args(argv)
+
+    cpu = os.cpu_count() or 1
+    counts = args.workers or sorted({1, *(w for w in (2, 4, 8, 16, 32) if w <= cpu), cpu})
+    cols = random_columns(args.rows)
+
+    baseline = None
+    reference = None
+    for w in counts:
+        res = run_sweep(workers=w, chunk_size=args.chunk_size, **cols)
+        if reference is None:
+            baseline, reference = res.rows_per_sec, res["IRR"]
+        same = np.array_equal(res["IRR"], reference, equal_nan=True)
+        print(f"workers={res.workers:3d}: {res.rows_per_sec:14,.0f} 列/秒  "
+              f"{res.rows_per_sec / baseline:6.2f}x  {res.seconds:7.2f} 秒  結果一致={same}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+"""效能基準測試組：模型、敏感度熱力圖、報告匯出、冷啟動匯入與完整重跑
+
+以 Streamlit bare mode 執行一次 `app.py` 取得其中的函式（元件回傳預設值），
+再個別計時；完整重跑則以 `streamlit.testing.v1.AppTest` 無頭執行。
+全部離線執行，不需啟動伺服器或瀏覽器。
+
+    python benchmarks/suite.py --save benchmarks/baseline.json
+    python benchmarks/suite.py --compare benchmarks/baseline.json [--threshold 0.25]
+
+比較時任一項最短耗時（受雜訊影響最小）或尖峰記憶體超過基準 (1 + threshold) 倍即標示為退步，
+結束碼為 1。
+基準值與機器相關，請在同一台機器上產生與比較。
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import platform
+import runpy
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(ROOT, "app.py")
+sys.path.insert(0, ROOT)
+
+MIN_SAMPLE_SECONDS = 0.05
+
+
+def _quiet_streamlit() -> None:
+    """bare mode 會對每個元件記錄「missing ScriptRunContext」與棄用提示，基準測試時關閉
+
+    AppTest 執行時會依設定重設 Streamlit 的日誌層級，因此直接停用 WARNING 以下的日誌。
+    """
+    logging.disable(logging.WARNING)
+
+
+def load_app() -> dict:
+    """以 bare mode 執行 app.py，回傳其全域命名空間"""
+    _quiet_streamlit()
+    return runpy.run_path(APP_PATH, run_name="app")
+
+
+def measure(fn: Callable[[], object], repeat: int = 5, number: Optional[int] = None) -> dict:
+    """計時（每次取樣自動調整呼叫次數至至少 MIN_SAMPLE_SECONDS），另以 tracemalloc 量測一次尖峰記憶體"""
+    fn()  # 暖機
+    if number is None:
+        number = 1
+        while True:
+            t0 = time.perf_counter()
+            for _ in range(number):
+                fn()
+            if time.perf_counter() - t0 >= MIN_SAMPLE_SECONDS or number >= 1 << 20:
+                break
+            number *= 2
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - t0) / number)
+
+    tracemalloc.start()
+    fn()
+    _cur, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "median_s": statistics.median(samples),
+        "min_s": min(samples),
+        "peak_mb": peak / 1e6,
+        "repeat": repeat,
+        "number": number,
+    }
+
+
+def build_cases(ns: dict) -> Dict[str, Callable[[], object]]:
+    """基準項目：名稱 → 無參數函式"""
+    from streamlit.testing.v1 import AppTest
+
+    from bench_startup import import_profile, top_level_imports
+
+    params, res = ns["params"], ns["res"]
+    get_risk_fee_rate = ns["get_risk_fee_rate"]
+    risk_inputs = [(g, o) for g in range(500, 10_001, 500) for o in range(5, 201, 10)]
+
+    def risk_table():
+        for g, o in risk_inputs:
+            get_risk_fee_rate(g, o)
+
+    startup_modules = top_level_imports(APP_PATH)
+
+    def startup_imports():
+        # 新行程匯入 app.py 的模組層級依賴（冷啟動成本，含直譯器啟動）
+        import_profile(startup_modules)
+
+    state = {}
+
+    def apptest_cold():
+        state["at"] = AppTest.from_file(APP_PATH, default_timeout=300).run()
+
+    def apptest_rerun():
+        if "at" not in state:
+            apptest_cold()
+        state["at"].run()
+
+    def apptest_rerun_changed():
+        # 每次改動預售單價，使模型、圖表與快取都必須重算
+        if "at" not in state:
+            apptest_cold()
+        at = state["at"]
+        widget = next(w for w in at.sidebar.number_input if w.label.startswith("更新後預售單價"))
+        widget.set_value(widget.value + 0.5).run()
+
+    return {
+        "calculate_model": ns["calculate_model"],
+        f"get_risk_fee_rate_x{len(risk_inputs)}": risk_table,
+        "heatmap_landlord": lambda: ns["build_heatmap_figure"](params, (-10, 10), 2.0, (-4, 6), 1.0, "地主分回比"),
+        "heatmap_irr": lambda: ns["build_heatmap_figure"](params, (-10, 10), 2.0, (-4, 6), 1.0, "實施者 IRR"),
+        "heatmap_fine_irr": lambda: ns["build_heatmap_figure"](params, (-15, 15), 0.1, (-6, 8), 0.1, "實施者 IRR"),
+        "generate_report": lambda: ns["generate_report"](res, params, ns["base_unit_cost"], ns["mat_coeff"],
+                                                          ns["rate_source"]),
+        "generate_excel": lambda: ns["generate_excel"](res),
+        "startup_imports": startup_imports,
+        "apptest_cold": apptest_cold,
+        "apptest_rerun": apptest_rerun,
+        "apptest_rerun_changed": apptest_rerun_changed,
+    }
+
+
+# 完整重跑較慢，固定呼叫 1 次
+FIXED_NUMBER = {"startup_imports": 1, "apptest_cold": 1, "apptest_rerun": 1, "apptest_rerun_changed": 1}
+
+
+def run_suite(only=None, repeat: int = 5) -> dict:
+    import numpy
+    import pandas
+    import streamlit
+
+    t0 = time.perf_counter()
+    ns = load_app()
+    load_seconds = time.perf_counter() - t0
+    results = {"app_bare_run": {"median_s": load_seconds, "min_s": load_seconds, "peak_mb": float("nan"),
+                                "repeat": 1, "number": 1}}
+    for name, fn in build_cases(ns).items():
+        if only and name not in only:
+            continue
+        results[name] = measure(fn, repeat=min(repeat, 3) if name in FIXED_NUMBER else repeat,
+                                number=FIXED_NUMBER.get(name))
+        print(f"  {name:28s} {results[name]['median_s'] * 1e3:12.3f} ms  峰值 {results[name]['peak_mb']:8.1f} MB",
+              file=sys.stderr)
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+            "numpy": numpy.__version__,
+            "pandas": pandas.__version__,
+            "streamlit": streamlit.__version__,
+        },
+        "results": results,
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list:
+    """回傳退步項目 [(名稱, 指標, 基準, 目前, 倍數)]"""
+    regressions = []
+    for name, cur in current["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if base is None:
+            continue
+        for key in ("min_s", "peak_mb"):
+            b, c = base.get(key), cur.get(key)
+            if b is None or c is None or not b > 0 or c != c:
+                continue
+            if c > b * (1 + threshold):
+                regressions.append((name, key, b, c, c / b))
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--save", metavar="JSON", help="將結果寫入 JSON 作為基準")
+    parser.add_argument("--compare", metavar="JSON", help="與基準 JSON 比較")
+    parser.add_argument("--threshold", type=float, default=0.25, help="允許的退步比例（預設 0.25 = 25%%）")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--only", nargs="+", help="只執行指定項目")
+    args = parser.parse_args(argv)
+
+    current = run_suite(args.only, args.repeat)
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as fh:
+            json.dump(current, fh, ensure_ascii=False, indent=2)
+        print(f"已寫入 {args.save}")
+
+    if not args.compare:
+        return 0
+    with open(args.compare, encoding="utf-8") as fh:
+        baseline = json.load(fh)
+    print(f"{'項目（最短耗時）':28s} {'基準 (ms)':>12s} {'目前 (ms)':>12s} {'倍數':>8s}")
+    for name, cur in current["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if base is None:
+            print(f"{name:28s} {'-':>12s} {cur['min_s'] * 1e3:12.3f} {'新項目':>8s}")
+            continue
+        print(f"{name:28s} {base['min_s'] * 1e3:12.3f} {cur['min_s'] * 1e3:12.3f} "
+              f"{cur['min_s'] / base['min_s']:8.2f}x")
+    regressions = compare(current, baseline, args.threshold)
+    for name, key, b, c, ratio in regressions:
+        unit, scale = ("ms", 1e3) if key == "min_s" else ("MB", 1.0)
+        print(f"⚠️ 退步：{name} {key} {b * scale:.3f} → {c * scale:.3f} {unit}（{ratio:.2f}x）")
+    if not regressions:
+        print(f"✅ 無超過 {args.threshold:.0%} 的退步")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,289 @@
+"""參考案件資料庫（SQLite）
+
+已審議案件存於內嵌 SQLite 資料庫，行政區、實施主體、基地面積與地上樓層皆建有索引，
+供篩選查詢案件明細。費率統計（平均 / 最小 / 最大）則由每個資料版本載入一次的數值欄位
+快照以 NumPy 遮罩計算：SQLite 逐列解碼數萬筆案件的彙總需數十毫秒，欄位快照只需約 1 毫秒；
+結果再依（篩選條件, 資料版本）快取，資料寫入後自動失效。
+
+- 論文五案件（3.2.2節）以 data/reference_cases.csv 隨程式發佈，作為預設資料。
+- 環境變數 CASES_DB 可指定資料庫檔案；檔案不存在時建立並匯入預設資料。
+- 費率欄位於 stat_exclude 標記「不列入統計」的項目（例如原地安置的拆遷費用、
+  更新會的稅捐減免），平均值與論文表3-2 相同取兩位小數。
+"""
+from __future__ import annotations
+
+import csv
+import os
+import re
+import sqlite3
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+from memo import LRUCache
+
+CASES_DB_ENV = "CASES_DB"
+SEED_CASES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "reference_cases.csv")
+
+DEVELOPER_TYPES = ("更新會", "建設公司")
+RATE_FIELDS = ("demolition_pct", "reloc_comp_pct", "design_fee_pct", "loan_interest_pct", "tax_pct", "mgmt_fee_pct")
+# ModelParams 中直接採用案件統計的費率
+MODEL_RATE_FIELDS = ("demolition_pct", "reloc_comp_pct", "design_fee_pct", "tax_pct")
+STAT_DECIMALS = 2
+IMPLIED_GFA_COEFF = 1.8  # 由基地面積推估總樓地板面積，計算隱含營建單價
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS cases (
+    id INTEGER PRIMARY KEY,
+    case_key TEXT UNIQUE,
+    location TEXT NOT NULL DEFAULT '',
+    district TEXT NOT NULL,
+    developer TEXT NOT NULL CHECK (developer IN ({", ".join(f"'{d}'" for d in DEVELOPER_TYPES)})),
+    area_ping REAL NOT NULL,
+    floors TEXT NOT NULL DEFAULT '',
+    floors_above INTEGER,
+    basements INTEGER,
+    total_cost REAL,
+    {", ".join(f"{name} REAL" for name in RATE_FIELDS)},
+    stat_exclude INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_cases_district ON cases (district);
+CREATE INDEX IF NOT EXISTS idx_cases_developer_area ON cases (developer, area_ping);
+CREATE INDEX IF NOT EXISTS idx_cases_area ON cases (area_ping);
+CREATE INDEX IF NOT EXISTS idx_cases_floors ON cases (floors_above);
+"""
+_COLUMNS = ("case_key", "location", "district", "developer", "area_ping", "floors", "floors_above", "basements",
+            "total_cost") + RATE_FIELDS + ("stat_exclude",)
+
+
+def parse_floors(text: str) -> Tuple[Optional[int], Optional[int]]:
+    """「17F+16F+B4」→（地上最高 17 層, 地下 4 層）"""
+    above = [int(n) for n in re.findall(r"(\d+)F", text or "")]
+    below = [int(n) for n in re.findall(r"B(\d+)", text or "")]
+    return (max(above) if above else None), (max(below) if below else None)
+
+
+def exclude_mask(names: Iterable[str]) -> int:
+    """不列入統計的費率欄位 → 位元遮罩（第 i 位對應 RATE_FIELDS[i]）"""
+    mask = 0
+    for name in names:
+        if name not in RATE_FIELDS:
+            raise ValueError(f"未知的費率欄位：{name}")
+        mask |= 1 << RATE_FIELDS.index(name)
+    return mask
+
+
+def read_cases_csv(path: str = SEED_CASES_PATH) -> List[dict]:
+    """讀取案件 CSV：數值欄位轉為 float，stat_exclude 為以分號分隔的費率欄位名稱"""
+    numeric = ("area_ping", "total_cost") + RATE_FIELDS
+    rows = []
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        for raw in csv.DictReader(f):
+            row = {k: (float(v) if k in numeric and v != "" else v) for k, v in raw.items()}
+            row["stat_exclude"] = tuple(s for s in (raw.get("stat_exclude") or "").split(";") if s)
+            rows.append(row)
+    return rows
+
+
+def mean_rates(rows: Iterable[Mapping]) -> Dict[str, Optional[float]]:
+    """各費率的平均（排除 stat_exclude 標記的項目，取 STAT_DECIMALS 位小數）"""
+    rows = list(rows)
+    out = {}
+    for name in RATE_FIELDS:
+        values = [row[name] for row in rows if name not in row.get("stat_exclude", ())]
+        out[name] = round(sum(values) / len(values), STAT_DECIMALS) if values else None
+    return out
+
+
+def _row_dict(row: tuple) -> dict:
+    """資料列 → 欄位字典；stat_exclude 還原為費率欄位名稱（與 read_cases_csv 相同）"""
+    d = dict(zip(_COLUMNS, row))
+    d["stat_exclude"] = tuple(name for i, name in enumerate(RATE_FIELDS) if d["stat_exclude"] >> i & 1)
+    return d
+
+
+@dataclass(frozen=True)
+class CaseFilter:
+    """案件篩選條件（None / 空值表示不限）"""
+    districts: Tuple[str, ...] = ()
+    developer: Optional[str] = None
+    min_area: Optional[float] = None
+    max_area: Optional[float] = None
+    min_floors: Optional[int] = None
+    max_floors: Optional[int] = None
+
+    def where(self) -> Tuple[str, list]:
+        clauses, args = [], []
+        if self.districts:
+            clauses.append(f"district IN ({', '.join('?' * len(self.districts))})")
+            args.extend(self.districts)
+        for sql, value in (("developer = ?", self.developer), ("area_ping >= ?", self.min_area),
+                           ("area_ping <= ?", self.max_area), ("floors_above >= ?", self.min_floors),
+                           ("floors_above <= ?", self.max_floors)):
+            if value is not None:
+                clauses.append(sql)
+                args.append(value)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), args
+
+
+@dataclass(frozen=True)
+class CaseStats:
+    """篩選後案件的費率統計（%）；count 為 0 時各值為 None"""
+    count: int
+    mean: Dict[str, Optional[float]] = field(default_factory=dict)
+    min: Dict[str, Optional[float]] = field(default_factory=dict)
+    max: Dict[str, Optional[float]] = field(default_factory=dict)
+    implied_unit_cost: Optional[float] = None  # 萬/坪
+
+    def model_rates(self, fallback: Mapping[str, float]) -> Dict[str, float]:
+        """ModelParams 的費率欄位；沒有可用樣本的項目沿用 fallback"""
+        return {name: self.mean[name] if self.mean.get(name) is not None else fallback[name]
+                for name in MODEL_RATE_FIELDS}
+
+
+class CaseSnapshot:
+    """某一資料版本的數值欄位（ids 為資料列 id）；不列入統計的費率為 NaN，行政區 / 實施主體以整數代碼表示"""
+
+    def __init__(self, rows: List[tuple]):
+        cols = list(zip(*rows)) or [()] * (7 + len(RATE_FIELDS))
+        self.ids = np.array(cols[0], dtype=np.int64)
+        self.districts, self.district = np.unique(np.array(cols[1], dtype=object).astype(str), return_inverse=True)
+        codes = {d: i for i, d in enumerate(DEVELOPER_TYPES)}
+        self.developer = np.array([codes[d] for d in cols[2]], dtype=np.int8)
+        num = lambda c: np.array(c, dtype=float)  # noqa: E731  None → NaN
+        self.area = num(cols[3])
+        self.floors = num(cols[4])
+        self.unit_cost = num(cols[5]) / (self.area * IMPLIED_GFA_COEFF)  # 元/坪
+        rates = np.column_stack([num(c) for c in cols[6:6 + len(RATE_FIELDS)]]) if rows else \
+            np.empty((0, len(RATE_FIELDS)))
+        excluded = (np.array(cols[-1], dtype=np.int64)[:, None] >> np.arange(len(RATE_FIELDS))) & 1
+        self.rates = np.where(excluded.astype(bool), np.nan, rates)
+
+    def mask(self, flt: CaseFilter) -> np.ndarray:
+        m = np.ones(len(self.area), dtype=bool)
+        if flt.districts:
+            m &= np.isin(self.district, np.flatnonzero(np.isin(self.districts, list(flt.districts))))
+        if flt.developer is not None:
+            m &= self.developer == DEVELOPER_TYPES.index(flt.developer)
+        for arr, lo, hi in ((self.area, flt.min_area, flt.max_area), (self.floors, flt.min_floors, flt.max_floors)):
+            if lo is not None:
+                m &= arr >= lo
+            if hi is not None:
+                m &= arr <= hi
+        return m
+
+
+class CaseStore:
+    """參考案件資料庫；連線可跨執行緒共用（以鎖保護）"""
+
+    def __init__(self, path: str = ":memory:", cache_size: int = 64):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        self._cache = LRUCache(maxsize=cache_size)
+        self._snapshot: Optional[Tuple[int, CaseSnapshot]] = None
+        self.version = 0
+
+    @classmethod
+    def open_default(cls) -> "CaseStore":
+        """依 CASES_DB 開啟資料庫（未設定時為記憶體資料庫）；空資料庫自動匯入論文五案件"""
+        store = cls(os.environ.get(CASES_DB_ENV) or ":memory:")
+        if len(store) == 0:
+            store.add_cases(read_cases_csv())
+        return store
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM cases").fetchone()[0]
+
+    def add_cases(self, rows: Iterable[Mapping]) -> int:
+        """新增（或依 case_key 覆寫）案件；floors_above / basements 未給時由 floors 解析"""
+        records = []
+        for row in rows:
+            above, below = parse_floors(row.get("floors", ""))
+            rec = {**row, "floors_above": row.get("floors_above", above), "basements": row.get("basements", below)}
+            excl = rec.get("stat_exclude", 0)
+            rec["stat_exclude"] = excl if isinstance(excl, int) else exclude_mask(excl)
+            rec.setdefault("location", "")
+            rec.setdefault("floors", "")
+            records.append(tuple(rec.get(c) for c in _COLUMNS))
+        sql = (f"INSERT OR REPLACE INTO cases ({', '.join(_COLUMNS)}) "
+               f"VALUES ({', '.join('?' * len(_COLUMNS))})")
+        with self._lock, self._conn:
+            self._conn.executemany(sql, records)
+            self.version += 1
+        return len(records)
+
+    def import_csv(self, path: str) -> int:
+        return self.add_cases(read_cases_csv(path))
+
+    def districts(self) -> List[str]:
+        with self._lock:
+            return [r[0] for r in self._conn.execute("SELECT DISTINCT district FROM cases ORDER BY district")]
+
+    def cases(self, flt: CaseFilter = CaseFilter(), limit: Optional[int] = None) -> List[dict]:
+        """篩選後的案件明細（依基地面積排序）"""
+        where, args = flt.where()
+        sql = f"SELECT {', '.join(_COLUMNS)} FROM cases{where} ORDER BY area_ping"
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        with self._lock:
+            return [_row_dict(r) for r in self._conn.execute(sql, args)]
+
+    def cases_by_id(self, ids: Iterable[int]) -> List[dict]:
+        """依資料列 id 取得案件明細（順序與 ids 相同）"""
+        ids = [int(i) for i in ids]
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id, {', '.join(_COLUMNS)} FROM cases WHERE id IN ({', '.join('?' * len(ids))})", ids)
+            found = {r[0]: _row_dict(r[1:]) for r in rows}
+        return [found[i] for i in ids if i in found]
+
+    def aggregate(self, flt: CaseFilter = CaseFilter()) -> CaseStats:
+        """篩選後案件的費率統計（快取至下次寫入）"""
+        return self._cache.get_or_compute((flt, self.version), lambda: self._aggregate(flt))
+
+    def snapshot(self) -> CaseSnapshot:
+        """目前資料版本的數值欄位快照（寫入後重新載入）"""
+        cached = self._snapshot
+        if cached is not None and cached[0] == self.version:
+            return cached[1]
+        with self._lock:
+            version = self.version
+            rows = self._conn.execute(
+                f"SELECT id, district, developer, area_ping, floors_above, total_cost, {', '.join(RATE_FIELDS)}, "
+                "stat_exclude FROM cases").fetchall()
+        snap = CaseSnapshot(rows)
+        self._snapshot = (version, snap)
+        return snap
+
+    def _aggregate(self, flt: CaseFilter) -> CaseStats:
+        snap = self.snapshot()
+        m = snap.mask(flt)
+        rates = snap.rates[m]
+        valid = ~np.isnan(rates)
+        n = valid.sum(axis=0)
+        mean = np.where(n > 0, np.where(valid, rates, 0.0).sum(axis=0) / np.maximum(n, 1), np.nan)
+        lo = np.fmin.reduce(rates, axis=0, initial=np.inf)
+        hi = np.fmax.reduce(rates, axis=0, initial=-np.inf)
+        unit_cost = snap.unit_cost[m]
+        unit_cost = unit_cost[~np.isnan(unit_cost)]
+        pick = lambda a, i, digits=None: (None if n[i] == 0  # noqa: E731
+                                          else float(a[i]) if digits is None else round(float(a[i]), digits))
+        return CaseStats(
+            count=int(m.sum()),
+            mean={name: pick(mean, i, STAT_DECIMALS) for i, name in enumerate(RATE_FIELDS)},
+            min={name: pick(lo, i) for i, name in enumerate(RATE_FIELDS)},
+            max={name: pick(hi, i) for i, name in enumerate(RATE_FIELDS)},
+            implied_unit_cost=float(unit_cost.mean()) / 10000 if len(unit_cost) else None,
+        )
+
+    def cache_stats(self) -> dict:
+        return self._cache.stats()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
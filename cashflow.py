@@ -0,0 +1,156 @@
+"""逐月現金流引擎
+
+原模型的 IRR 現金流固定為 T0..T4 五期，利息以 `資金需求 × 貸款成數 × 利率 × 年期 × 0.5`
+估算。本模組依 `dev_months` 建立逐月現金流（實施者觀點）：
+
+- 第 0 月：進階費用 + 設計費。
+- 第 1..M 月：工程費依 S 曲線 S(u) = 3u² − 2u³ 撥付，拆遷安置費平均撥付。
+- 預售款：總銷的 deposit_pct 於工期內平均收取，先支應當月支出、其餘償還貸款，
+  仍有剩餘則留在信託專戶至完工撥付；餘款於第 M 月交屋時收取。
+- 當月未被預售款支應的支出由貸款負擔 loan_ratio、自有資金負擔其餘；
+  利息按月以期初貸款餘額 × 月利率計算並由實施者支付，第 M 月一次清償本金。
+- 第 M 月另支付稅捐與管理費（同原模型）。
+
+在此設計下，實施者現金流在完工前皆為流出，只變號一次，`irr.irr_batch()`
+可走快速路徑。逐月迴圈只跑 M 次，每次對所有情境向量化；大量情境請用
+`run_monthly()` 分塊計算，記憶體只與 chunk_size × 月數有關。
+"""
+from __future__ import annotations
+
+import datetime
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+import numpy as np
+
+from batch import evaluate_batch
+from engine import MODEL_EPOCH, ModelParams
+from irr import irr_batch
+
+DEFAULT_CHUNK_SIZE = 20_000
+DEPOSIT_PCT = 0.15  # 預售期間分期收取的價金比例
+
+
+@dataclass(slots=True)
+class MonthlyResult:
+    """逐月計算結果；cashflow 形狀 (N, max_M + 1)，超過各情境工期的月份為 0"""
+    months: np.ndarray          # (N,) 各情境工期（月）
+    cashflow: np.ndarray        # 實施者淨現金流
+    loan_balance: np.ndarray    # 月底貸款餘額
+    interest: np.ndarray        # (N,) 累計利息
+    peak_loan: np.ndarray       # (N,) 貸款餘額峰值
+    irr_monthly: Optional[np.ndarray] = None
+    irr_annual: Optional[np.ndarray] = None  # (1 + 月 IRR)^12 − 1
+    xirr: Optional[np.ndarray] = None        # 以實際日期（365 日制）計算
+
+
+def s_curve(u: np.ndarray) -> np.ndarray:
+    """累計撥付比例（u 為已完成工期比例，0..1）"""
+    u = np.clip(u, 0.0, 1.0)
+    return u * u * (3.0 - 2.0 * u)
+
+
+def month_offsets(n_months: int, start: datetime.date = MODEL_EPOCH) -> np.ndarray:
+    """第 0..n_months 月距起始日的年數（365 日制），供 XIRR 使用"""
+    years = []
+    for m in range(n_months + 1):
+        y, mo = divmod(start.month - 1 + m, 12)
+        day = min(start.day, 28)
+        years.append((datetime.date(start.year + y, mo + 1, day) - start.replace(day=day)).days / 365.0)
+    return np.array(years)
+
+
+def xirr_batch(cashflows: np.ndarray, years: np.ndarray, guess: np.ndarray,
+               tol: float = 1e-12, maxiter: int = 50) -> np.ndarray:
+    """不等距現金流的 IRR：以年化月 IRR 為初值做牛頓迭代（未收斂者為 NaN）"""
+    cf = np.ascontiguousarray(np.asarray(cashflows, dtype=float).T)  # (T, N)
+    t = np.asarray(years, dtype=float)[:, None]
+    r = np.where(np.isfinite(guess), guess, 0.1)
+    done = ~np.isfinite(guess)
+    out = np.full(r.shape, np.nan)
+    with np.errstate(all="ignore"):
+        for _ in range(maxiter):
+            disc = np.exp(-t * np.log1p(r))
+            f = (cf * disc).sum(axis=0)
+            df = -(cf * t * disc).sum(axis=0) / (1.0 + r)
+            step = f / df
+            r_new = r - step
+            # 越過 −100% 時改為折半靠近
+            r_new = np.where(r_new <= -1.0, (r - 1.0) / 2.0, r_new)
+            conv = ~done & (np.abs(step) <= tol * np.maximum(1.0, np.abs(r_new)))
+            out[conv] = r_new[conv]
+            done |= conv | ~np.isfinite(r_new)
+            r = np.where(done, r, r_new)
+            if done.all():
+                break
+    return out
+
+
+def monthly_batch(base: ModelParams = ModelParams(), deposit_pct: float = DEPOSIT_PCT, with_irr: bool = True,
+                  start: datetime.date = MODEL_EPOCH, **overrides) -> MonthlyResult:
+    """一批情境的逐月現金流（輸入同 `evaluate_batch()`，結果攤平為一維情境）；start 為第 0 月的日期"""
+    res = evaluate_batch(base, with_irr=False, **overrides)
+    n = res.GFA.size
+    c = {k: np.broadcast_to(np.asarray(overrides.get(k, getattr(base, k)), dtype=float), res.shape).reshape(-1)
+         for k in ("loan_ratio", "loan_rate", "dev_months")}
+    d = {k: np.asarray(v).reshape(-1) for k, v in res.Details.items()}
+    value = np.asarray(res.Total_Value).reshape(-1)
+
+    months = np.maximum(np.rint(c["dev_months"]), 1).astype(np.int64)
+    width = int(months.max()) + 1
+    monthly_rate = c["loan_rate"] / 12
+    mgmt_total = d["風險管理費"] + d["人事管理費"] + d["銷售管理費"]
+
+    cashflow = np.zeros((n, width))
+    balance_hist = np.zeros((n, width))
+    cashflow[:, 0] = -(d["進階費用"] + d["設計費"])
+    balance = np.zeros(n)
+    escrow = np.zeros(n)
+    interest = np.zeros(n)
+    peak = np.zeros(n)
+    deposit = value * deposit_pct / months
+    reloc = d["拆遷安置費"] / months
+    for m in range(1, width):
+        active = m <= months
+        spend = np.where(active, d["工程費(含拆除)"] * (s_curve(m / months) - s_curve((m - 1) / months)) + reloc, 0.0)
+        receipts = np.where(active, deposit, 0.0)
+        interest_m = np.where(active, balance * monthly_rate, 0.0)
+        uncovered = np.maximum(spend - receipts, 0.0)
+        surplus = np.maximum(receipts - spend, 0.0)
+        repay = np.minimum(surplus, balance)
+        balance = balance + uncovered * c["loan_ratio"] - repay
+        escrow += surplus - repay
+        interest += interest_m
+        np.maximum(peak, balance, out=peak)
+        balance_hist[:, m] = balance
+        cashflow[:, m] = -uncovered * (1 - c["loan_ratio"]) - interest_m
+
+    # 第 M 月交屋：收取餘款與信託專戶，清償貸款並支付稅捐與管理費
+    rows = np.arange(n)
+    cashflow[rows, months] += value * (1 - deposit_pct) + escrow - balance - d["稅捐"] - mgmt_total
+    balance_hist[np.arange(width)[None, :] >= months[:, None]] = 0.0
+
+    out = MonthlyResult(months=months, cashflow=cashflow, loan_balance=balance_hist, interest=interest, peak_loan=peak)
+    if with_irr:
+        r_m, _conv = irr_batch(cashflow)
+        out.irr_monthly = r_m
+        with np.errstate(invalid="ignore"):
+            out.irr_annual = (1 + r_m) ** 12 - 1
+        out.xirr = xirr_batch(cashflow, month_offsets(width - 1, start), out.irr_annual)
+    return out
+
+
+def run_monthly(base: ModelParams = ModelParams(), deposit_pct: float = DEPOSIT_PCT,
+                chunk_size: int = DEFAULT_CHUNK_SIZE, start: datetime.date = MODEL_EPOCH,
+                **columns) -> Dict[str, np.ndarray]:
+    """大量情境分塊計算，只保留每個情境的摘要（年化 IRR、XIRR、累計利息、貸款峰值）"""
+    cols = {k: np.asarray(v, dtype=float).reshape(-1) for k, v in columns.items()}
+    n = max((v.size for v in cols.values()), default=1)
+    summary = {name: np.empty(n) for name in ("irr_annual", "xirr", "interest", "peak_loan")}
+    for lo in range(0, n, chunk_size):
+        sl = slice(lo, min(lo + chunk_size, n))
+        res = monthly_batch(base, deposit_pct, start=start,
+                            **{k: (v[sl] if v.size == n else v) for k, v in cols.items()})
+        for name, buf in summary.items():
+            buf[sl] = getattr(res, name)
+    return summary
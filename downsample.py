@@ -0,0 +1,40 @@
+"""大型圖表資料的伺服器端縮減
+
+瀏覽器的傳輸量與繪製時間隨資料點數成長，而超過螢幕解析度的細節本來就看不到。
+送出前先將格點以區塊平均合併到螢幕解析度，並轉為 float32：Plotly ≥ 6 會把 NumPy 陣列
+序列化為 base64 型別陣列，不再逐值寫成 JSON 數字。
+"""
+from __future__ import annotations
+
+from typing import Tuple
+
+import numpy as np
+
+# (列, 欄)：約為 500px 高、全寬圖表的可見解析度
+HEATMAP_MAX_SHAPE = (250, 500)
+
+
+def block_mean(a: np.ndarray, factor: int, axis: int = 0) -> np.ndarray:
+    """沿 axis 每 factor 個相鄰元素取平均（忽略 NaN，全為 NaN 時為 NaN；最後一組可不足 factor 個）"""
+    a = np.asarray(a, dtype=float)
+    if factor <= 1:
+        return a
+    a = np.moveaxis(a, axis, 0)
+    pad = (-a.shape[0]) % factor
+    if pad:
+        a = np.concatenate([a, np.full((pad,) + a.shape[1:], np.nan)])
+    blocks = a.reshape((-1, factor) + a.shape[1:])
+    valid = ~np.isnan(blocks)
+    sums = np.where(valid, blocks, 0.0).sum(axis=1)
+    counts = valid.sum(axis=1)
+    out = np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
+    return np.moveaxis(out, 0, axis)
+
+
+def downsample_grid(z: np.ndarray, x: np.ndarray, y: np.ndarray,
+                    max_shape: Tuple[int, int] = HEATMAP_MAX_SHAPE) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """z 形狀 (len(y), len(x))；超過 max_shape 時以區塊平均縮減，座標取區塊中心。回傳 (z, x, y)，z 為 float32"""
+    fy = -(-len(y) // max_shape[0])
+    fx = -(-len(x) // max_shape[1])
+    z = block_mean(block_mean(z, fy, axis=0), fx, axis=1)
+    return z.astype(np.float32), block_mean(x, fx), block_mean(y, fy)
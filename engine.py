@@ -0,0 +1,186 @@
+"""都更權利變換試算核心引擎（不依賴 Streamlit / Plotly / openpyxl）
+
+`app.py` 的 `calculate_model()` 只負責把側邊欄參數組成 `ModelParams`，
+實際計算全部在 `evaluate()` 完成，批次作業與服務可直接 import 本模組。
+IRR 由 `irr.irr()` 求解（與 `npf.irr` 結果一致，無解時為 NaN）。
+"""
+from __future__ import annotations
+
+import datetime
+from dataclasses import dataclass, replace
+from typing import Dict, Optional
+
+from typing_extensions import TypedDict
+
+from cases import mean_rates, read_cases_csv
+from irr import irr
+from risk_fee import DEFAULT_SCHEDULE, RiskFeeSchedule
+
+# ============================================================================
+# 📊 五案件統計數據（論文3.2.2節，資料見 data/reference_cases.csv）
+# ============================================================================
+FIVE_CASES_DATA = {row.pop("case_key"): row for row in read_cases_csv()}
+
+# 統計平均值（論文表3-2；原地安置的拆遷費用、更新會的稅捐不列入統計）
+STATISTICS_AVG = mean_rates(FIVE_CASES_DATA.values())
+
+# 官方基準（論文表3-2）
+OFFICIAL_STANDARD = {
+    "demolition_pct": 3.50,
+    "reloc_comp_pct": 7.00,
+    "design_fee_pct": 2.50,
+    "loan_interest_pct": 5.50,
+    "tax_pct": 4.00,
+    "mgmt_fee_pct": 30.00,
+}
+
+# 建材結構等級 → 建材係數
+CONST_TYPES = {
+    "RC 一般標準 (S0)": 0.0,
+    "RC 高階 (+0.11)": 0.11,
+    "SRC/SC (+0.30)": 0.30,
+}
+
+# 每個車位折算的總樓地板面積（坪）
+PARKING_GFA_PER_SPACE = 35
+
+# 逐月現金流的預設起算日（XIRR 依實際日期計算，固定起算日使結果不隨執行日期變動）
+MODEL_EPOCH = datetime.date(2026, 1, 1)
+
+
+# ============================================================================
+# 🔧 參數與結果型別
+# ============================================================================
+
+@dataclass(frozen=True, slots=True)
+class ModelParams:
+    """模型輸入參數（預設值與側邊欄預設一致，比率皆為小數）"""
+    # 1. 基地與容積
+    base_area: float = 300.0          # 基地面積 (坪)
+    far_base_exist: float = 3.0       # 原建築容積率
+    bonus_multiplier: float = 1.5     # 防災獎勵倍數
+    coeff_gfa: float = 1.8            # 總樓地板係數 K_GFA
+    coeff_sale: float = 1.6           # 銷售面積係數 K_Sale
+    # 2. 營建
+    final_unit_cost: float = 16.23    # 修正後營建單價 (萬/坪)
+    # 3. 財務與風險
+    num_owners: int = 20              # 產權人數
+    loan_ratio: float = 0.60          # 貸款成數
+    rate_personnel: float = 0.03      # 人事行政管理費率
+    rate_sales: float = 0.06          # 銷售管理費率
+    loan_rate: float = 0.03           # 貸款年利率
+    dev_months: float = 48            # 開發期程 (月)
+    # 4. 進階費用 (萬)
+    cost_bonus_app: float = 500
+    cost_urban_plan: float = 300
+    cost_transfer: float = 0
+    # 5. 銷售
+    price_unit_sale: float = 60.0     # 更新後預售單價 (萬/坪)
+    price_parking: float = 220        # 車位單價 (萬/個)
+    # 6. 五案件統計費率 (%)
+    demolition_pct: float = STATISTICS_AVG["demolition_pct"]
+    reloc_comp_pct: float = STATISTICS_AVG["reloc_comp_pct"]
+    design_fee_pct: float = STATISTICS_AVG["design_fee_pct"]
+    tax_pct: float = STATISTICS_AVG["tax_pct"]
+
+    def replace(self, **changes) -> "ModelParams":
+        """回傳修改部分欄位後的新參數"""
+        return replace(self, **changes)
+
+
+class ModelResult(TypedDict):
+    """`evaluate()` 回傳結構，與原 `calculate_model()` 相同"""
+    GFA: float
+    Total_Cost: float
+    Total_Value: float
+    Landlord_Ratio: float
+    IRR: float
+    Risk_Rate: float
+    Details: Dict[str, float]
+    Cashflow: Dict[str, float]
+
+
+# ============================================================================
+# 🔧 核心計算
+# ============================================================================
+
+def get_risk_fee_rate(gfa_ping: float, owners: int, schedule: Optional[RiskFeeSchedule] = None) -> float:
+    """風險管理費率查表（表3-1，費率表見 `risk_fee`）"""
+    return (schedule or DEFAULT_SCHEDULE).rate(gfa_ping, owners)
+
+
+def evaluate(p: ModelParams) -> ModelResult:
+    """核心財務模型計算 - 整合五案件費率"""
+    # 1. 面積計算
+    area_far = p.base_area * p.far_base_exist * p.bonus_multiplier
+    area_total = area_far * p.coeff_gfa
+    area_sale = area_far * p.coeff_sale
+    num_parking = int(area_total / PARKING_GFA_PER_SPACE)
+    risk_rate = get_risk_fee_rate(area_total, p.num_owners)
+
+    # 2. 工程費（使用五案件平均或官方基準）
+    c_demo = area_total * p.demolition_pct / 100  # 改用統計百分比
+    c_build = area_total * p.final_unit_cost
+    c_engineering = c_demo + c_build
+
+    # 3. 進階費用
+    c_advanced = p.cost_bonus_app + p.cost_urban_plan + p.cost_transfer
+
+    # 4. 設計 / 安置費（使用五案件平均）
+    c_design = c_build * (p.design_fee_pct / 100)
+    c_reloc = c_build * (p.reloc_comp_pct / 100)
+
+    # 5. 管理費（含查表風險費）
+    c_mgmt_risk = c_build * risk_rate
+    c_mgmt_personnel = c_build * p.rate_personnel
+    c_mgmt_sales = (area_sale * p.price_unit_sale) * p.rate_sales
+    c_mgmt_total = c_mgmt_risk + c_mgmt_personnel + c_mgmt_sales
+
+    # 6. 利息（使用五案件平均百分比）
+    fund_demand = c_engineering + c_advanced + c_design + c_reloc
+    c_interest = fund_demand * p.loan_ratio * p.loan_rate * (p.dev_months / 12) * 0.5
+
+    # 7. 稅捐（使用五案件平均）
+    c_tax = c_build * (p.tax_pct / 100)
+
+    # 8. 總成本（共同負擔）
+    c_total = c_engineering + c_advanced + c_design + c_reloc + c_mgmt_total + c_interest + c_tax
+
+    # 9. 總銷價值
+    val_parking_total = num_parking * p.price_parking
+    val_new_total = (area_sale * p.price_unit_sale) + val_parking_total
+
+    ratio_burden = c_total / val_new_total if val_new_total > 0 else 0
+    ratio_landlord = 1 - ratio_burden
+
+    # 10. IRR 現金流
+    equity_ratio = 1 - p.loan_ratio
+    initial_out = (c_advanced + c_design) + (c_engineering * equity_ratio * 0.1)
+    yearly_cost = (c_engineering * equity_ratio * 0.9) / 3
+    loan_repay = fund_demand * p.loan_ratio
+    final_in = val_new_total - loan_repay - c_tax - c_mgmt_total - c_interest
+
+    cashflow = [-initial_out, -yearly_cost, -yearly_cost, -yearly_cost, final_in]
+
+    irr_val = irr(cashflow)  # 無解時為 NaN
+
+    return {
+        "GFA": area_total,
+        "Total_Cost": c_total,
+        "Total_Value": val_new_total,
+        "Landlord_Ratio": ratio_landlord,
+        "IRR": irr_val,
+        "Risk_Rate": risk_rate,
+        "Details": {
+            "工程費(含拆除)": c_engineering,
+            "設計費": c_design,
+            "拆遷安置費": c_reloc,
+            "風險管理費": c_mgmt_risk,
+            "人事管理費": c_mgmt_personnel,
+            "銷售管理費": c_mgmt_sales,
+            "貸款利息": c_interest,
+            "稅捐": c_tax,
+            "進階費用": c_advanced,
+        },
+        "Cashflow": {"T0": cashflow[0], "T1": cashflow[1], "T2": cashflow[2], "T3": cashflow[3], "T4": cashflow[4]},
+    }
@@ -0,0 +1,146 @@
+"""目標搜尋（反推可行條件）
+
+求單一輸入（售價、營建單價或獎勵倍數）使指定輸出（IRR、地主分回比或共同負擔）
+等於目標值。所有案件同時以向量化的括區法求解：每次迭代只呼叫一次
+`batch.evaluate_batch()`，以 Illinois 修正的割線法（regula falsi）逼近，
+割線點落在區間外或端點非有限值時改用二分法。
+
+車位數取整與風險費率查表使模型呈階梯狀：目標落在跳躍處時區間會收斂到跳躍點，
+但該處輸出與目標仍有差距，此時回傳跳躍點與其實際輸出，並標示為未收斂。
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+import numpy as np
+
+from batch import BATCH_FIELDS, evaluate_batch
+from engine import ModelParams
+
+# 可反推的輸入與預設搜尋區間
+GOAL_INPUTS = {
+    "price_unit_sale": (1.0, 1000.0),   # 更新後預售單價 (萬/坪)
+    "final_unit_cost": (0.1, 500.0),    # 修正後營建單價 (萬/坪)
+    "bonus_multiplier": (0.05, 20.0),   # 防災獎勵倍數
+}
+
+# 可作為目標的輸出
+GOAL_METRICS = ("IRR", "Landlord_Ratio", "Total_Cost")
+
+TOL = 1e-10
+MAX_ITER = 100
+
+# 視為達標的輸出誤差（比率為小數，共同負擔單位：萬）
+METRIC_ATOL = {"IRR": 1e-6, "Landlord_Ratio": 1e-6, "Total_Cost": 1e-3}
+
+
+@dataclass(slots=True)
+class GoalSeekResult:
+    """value 為所需輸入值；區間內無解者為 NaN，converged 為 False
+
+    目標落在跳躍點上時 value 為跳躍點、achieved 為該處實際輸出，converged 同樣為 False。
+    """
+    value: np.ndarray
+    converged: np.ndarray
+    achieved: np.ndarray  # value 下的實際輸出值
+
+
+def _metric(res, metric: str) -> np.ndarray:
+    """取出目標輸出；IRR 無解時依現金流總和視為 ±∞，以維持括區的正負號"""
+    if metric == "IRR":
+        v = res.IRR.copy()
+        nan = np.isnan(v)
+        if nan.any():
+            v[nan] = np.where(res.Cashflow[nan].sum(axis=-1) < 0, -np.inf, np.inf)
+        return v
+    return np.array(getattr(res, metric), dtype=float)
+
+
+def goal_seek_batch(
+    base: ModelParams = ModelParams(),
+    solve_for: str = "price_unit_sale",
+    metric: str = "IRR",
+    target=0.12,
+    bounds: Optional[Tuple[float, float]] = None,
+    tol: float = TOL,
+    maxiter: int = MAX_ITER,
+    atol: Optional[float] = None,
+    **columns,
+) -> GoalSeekResult:
+    """批次反推：每個案件求 solve_for 使 metric == target
+
+    columns 同 `evaluate_batch()`（不可包含 solve_for），target 可為純量或陣列，
+    形狀依 broadcasting 決定。bounds 預設取 `GOAL_INPUTS`；tol 為區間的相對寬度，
+    atol 為輸出與目標的容許誤差（預設取 `METRIC_ATOL`）。
+    """
+    if solve_for not in GOAL_INPUTS:
+        raise ValueError(f"不支援反推的參數：{solve_for}")
+    if metric not in GOAL_METRICS:
+        raise ValueError(f"不支援的目標輸出：{metric}")
+    if solve_for in columns:
+        raise TypeError(f"{solve_for} 為求解變數，不可同時作為輸入欄位")
+    unknown = set(columns) - set(BATCH_FIELDS)
+    if unknown:
+        raise TypeError(f"未知的批次參數：{', '.join(sorted(unknown))}")
+
+    names = list(columns)
+    arrays = np.broadcast_arrays(np.asarray(target, dtype=float), *(np.asarray(columns[k], dtype=float) for k in names))
+    shape = arrays[0].shape
+    goal = arrays[0].reshape(-1)
+    cols = {k: a.reshape(-1) for k, a in zip(names, arrays[1:])}
+    n = goal.size
+    with_irr = metric == "IRR"
+    atol = METRIC_ATOL[metric] if atol is None else atol
+
+    def f(x, rows):
+        res = evaluate_batch(base, with_irr, **{k: v[rows] for k, v in cols.items()}, **{solve_for: x})
+        return _metric(res, metric) - goal[rows]
+
+    lo_b, hi_b = bounds or GOAL_INPUTS[solve_for]
+    rows = np.arange(n)
+    lo, hi = np.full(n, float(lo_b)), np.full(n, float(hi_b))
+    f_lo, f_hi = f(lo, rows), f(hi, rows)
+
+    value = np.full(n, np.nan)
+    conv = np.zeros(n, dtype=bool)
+    achieved = np.full(n, np.nan)
+    for x_end, f_end in ((lo, f_lo), (hi, f_hi)):
+        hit = f_end == 0
+        value[hit], conv[hit], achieved[hit] = x_end[hit], True, goal[hit]
+
+    live = ~conv & (np.sign(f_lo) * np.sign(f_hi) < 0)
+    rows, lo, hi, f_lo, f_hi = rows[live], lo[live], hi[live], f_lo[live], f_hi[live]
+    side = np.zeros(rows.size, dtype=np.int8)  # 上次更新的端點：-1 為 lo、+1 為 hi
+    for _ in range(maxiter):
+        if rows.size == 0:
+            break
+        with np.errstate(divide="ignore", invalid="ignore"):
+            x = hi - f_hi * (hi - lo) / (f_hi - f_lo)
+        mid = 0.5 * (lo + hi)
+        x = np.where(np.isfinite(x) & (x > lo) & (x < hi), x, mid)
+        fx = f(x, rows)
+
+        same_lo = np.sign(fx) == np.sign(f_lo)
+        # Illinois 修正：同一端點連續被保留時，將其函數值減半以避免割線法停滯
+        f_hi = np.where(same_lo & (side == -1), 0.5 * f_hi, f_hi)
+        f_lo = np.where(~same_lo & (side == 1), 0.5 * f_lo, f_lo)
+        lo, f_lo = np.where(same_lo, x, lo), np.where(same_lo, fx, f_lo)
+        hi, f_hi = np.where(same_lo, hi, x), np.where(same_lo, f_hi, fx)
+        side = np.where(same_lo, -1, 1).astype(np.int8)
+
+        done = (fx == 0) | (hi - lo <= tol * np.maximum(1.0, np.abs(x)))
+        value[rows[done]] = x[done]
+        # 區間收斂到跳躍點時輸出仍與目標有差距，不視為收斂
+        conv[rows[done]] = np.abs(fx[done]) <= atol
+        achieved[rows[done]] = np.where(np.isfinite(fx[done]), fx[done] + goal[rows[done]], np.nan)
+        keep = ~done
+        rows, lo, hi, f_lo, f_hi, side = rows[keep], lo[keep], hi[keep], f_lo[keep], f_hi[keep], side[keep]
+
+    return GoalSeekResult(value=value.reshape(shape), converged=conv.reshape(shape), achieved=achieved.reshape(shape))
+
+
+def goal_seek(p: ModelParams, solve_for: str, metric: str, target: float,
+              bounds: Optional[Tuple[float, float]] = None) -> GoalSeekResult:
+    """單一案件反推（結果為 0 維陣列），無解時 value 為 NaN"""
+    return goal_seek_batch(p, solve_for, metric, target, bounds)
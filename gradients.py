@@ -0,0 +1,88 @@
+"""解析偏導數與彈性
+
+模型除風險費率查表與車位取整外皆為乘積與加總的組合，因此以前向模式自動微分
+（值 + 對各輸入的切向量）與正向計算同時求出精確偏導數，不需有限差分。
+公式與 `batch.evaluate_batch()` 共用 `batch._model_terms()`，輸出值與其完全一致。
+
+- 風險費率、車位數為階梯函數，除跳躍點外導數為 0。
+- IRR 以 NPV(r, θ) = 0 隱函數微分：dr/dθ = -(∂NPV/∂θ) / (∂NPV/∂r)。
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, Sequence
+
+import numpy as np
+
+from batch import _columns, _Dual, _model_terms
+from engine import ModelParams
+from irr import irr_batch
+from sensitivity import PARAM_LABELS
+
+# 提供偏導數的輸出
+GRADIENT_METRICS = ("Total_Cost", "Total_Value", "Landlord_Ratio", "IRR")
+
+
+@dataclass(slots=True)
+class GradientResult:
+    """輸出值與偏導數；grads[metric] 形狀 (..., P)，最後一軸順序同 fields"""
+    fields: tuple
+    inputs: np.ndarray              # (..., P) 輸入值
+    values: Dict[str, np.ndarray]
+    grads: Dict[str, np.ndarray]
+
+    def elasticity(self, metric: str) -> np.ndarray:
+        """彈性：輸入變動 1% 時輸出變動的百分比（輸出為 0 時為 NaN）"""
+        y = np.asarray(self.values[metric])[..., None]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(y != 0, self.grads[metric] * self.inputs / y, np.nan)
+
+
+def evaluate_gradients(base: ModelParams = ModelParams(), fields: Sequence[str] = tuple(PARAM_LABELS),
+                       **overrides) -> GradientResult:
+    """計算輸出值與對 fields 各輸入的偏導數（輸入可如 `evaluate_batch()` 批次給定）"""
+    fields = tuple(fields)
+    c = _columns(base, overrides)
+    shape = np.broadcast_shapes(*(v.shape for v in c.values()))
+    p = len(fields)
+    d = {}
+    for name, v in c.items():
+        dot = np.zeros(shape + (p,))
+        if name in fields:
+            dot[..., fields.index(name)] = 1.0
+        d[name] = _Dual(np.broadcast_to(v, shape), dot)
+
+    terms = _model_terms(d)
+    flows = terms["flows"]
+
+    cashflow = np.stack([np.broadcast_to(f.val, shape) for f in flows], axis=-1)
+    irr_val, irr_conv = irr_batch(cashflow)
+
+    # IRR 隱函數微分：以 x = 1/(1+r) 計算 ∂NPV/∂θ = Σ dCF_t x^t、∂NPV/∂r = -Σ t CF_t x^(t+1)
+    x = 1.0 / (1.0 + irr_val)
+    dnpv_dtheta = np.zeros(shape + (p,))
+    dnpv_dr = np.zeros(shape)
+    for t, f in enumerate(flows):
+        xt = x ** t
+        dnpv_dtheta += f.dot * xt[..., None]
+        dnpv_dr -= t * f.val * xt * x
+    with np.errstate(divide="ignore", invalid="ignore"):
+        irr_grad = np.where(irr_conv[..., None], -dnpv_dtheta / dnpv_dr[..., None], np.nan)
+
+    inputs = np.stack([np.broadcast_to(c[name], shape) for name in fields], axis=-1) if p else np.zeros(shape + (0,))
+    return GradientResult(
+        fields=fields,
+        inputs=inputs,
+        values={
+            "Total_Cost": terms["c_total"].val,
+            "Total_Value": terms["val_new_total"].val,
+            "Landlord_Ratio": terms["ratio_landlord"].val,
+            "IRR": irr_val,
+        },
+        grads={
+            "Total_Cost": terms["c_total"].dot,
+            "Total_Value": terms["val_new_total"].dot,
+            "Landlord_Ratio": terms["ratio_landlord"].dot,
+            "IRR": irr_grad,
+        },
+    )
@@ -0,0 +1,229 @@
+"""批次 IRR 求解
+
+以 x = 1/(1+r) 將 NPV 寫成多項式 p(x) = Σ v_t x^t，求 p 在 x > 0 的實根；
+與 `npf.irr` 相同，多根時取最接近 0 的報酬率。
+
+- 現金流只有一次正負號變化（本模型 T0..T3 流出、T4 流入）時，x > 0 恰有一根：
+  以 [0, X] 括區（X 倍增至變號），再用「牛頓法 + 二分法」保護迭代求解。
+- 多次變號時於對數網格上掃描變號區間，選最接近 r = 0 的區間後同樣求解。
+- 全部同號或找不到變號區間者回傳 NaN，並在 converged 遮罩標示 False。
+"""
+from __future__ import annotations
+
+import math
+from typing import Sequence, Tuple
+
+import numpy as np
+
+TOL = 1e-13
+MAX_ITER = 100
+
+# 多次變號時的掃描網格：x 介於 1e-4 ~ 1e4（r 約 -0.9999 ~ 9999）
+_SCAN_GRID = np.concatenate([np.geomspace(1e-4, 1.0, 200, endpoint=False), np.geomspace(1.0, 1e4, 200)])
+
+
+def _horner(v: np.ndarray, x: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """回傳 p(x) 與 p'(x)；v 為轉置後的 (T, N) 係數，x 形狀 (N,)"""
+    f = v[-1].copy()
+    df = np.zeros_like(f)
+    for t in range(len(v) - 2, -1, -1):
+        df *= x
+        df += f
+        f *= x
+        f += v[t]
+    return f, df
+
+
+def _sign_changes(v: np.ndarray) -> np.ndarray:
+    """每列非零現金流的正負號變化次數（v 為 (T, N)）"""
+    s = np.sign(v)
+    if np.all(s != 0):
+        return np.count_nonzero((s[1:] * s[:-1]) < 0, axis=0)
+    # 零值沿用前一個非零符號，避免 0 造成假變號
+    idx = np.where(s != 0, np.arange(len(v))[:, None], 0)
+    np.maximum.accumulate(idx, axis=0, out=idx)
+    s = np.take_along_axis(s, idx, axis=0)
+    return np.count_nonzero((s[1:] * s[:-1]) < 0, axis=0)
+
+
+def _low_sign(v: np.ndarray) -> np.ndarray:
+    """x → 0⁺ 時 p(x) 的正負號（最低次非零係數的符號）"""
+    first = np.argmax(v != 0, axis=0)
+    return np.sign(v[first, np.arange(v.shape[1])])
+
+
+def _duration_guess(v: np.ndarray) -> np.ndarray:
+    """以流入 / 流出的加權平均時點估計初值：x0 = (流出 / 流入)^(1 / 時距)，兩期現金流時即為精確解"""
+    p_sum = np.zeros(v.shape[1])
+    n_sum = np.zeros(v.shape[1])
+    p_t = np.zeros(v.shape[1])
+    n_t = np.zeros(v.shape[1])
+    for t, row in enumerate(v):
+        pos = np.maximum(row, 0.0)
+        neg = pos - row
+        p_sum += pos
+        n_sum += neg
+        p_t += t * pos
+        n_t += t * neg
+    with np.errstate(divide="ignore", invalid="ignore"):
+        span = p_t / p_sum - n_t / n_sum
+        return (n_sum / p_sum) ** (1.0 / span)
+
+
+def _newton(v: np.ndarray, x: np.ndarray, steps: int) -> np.ndarray:
+    """不設防的牛頓迭代，用來把初值快速推近根；發散者交給保護式迭代處理"""
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        for _ in range(steps):
+            f, df = _horner(v, x)
+            x = x - f / df
+    return x
+
+
+def _solve_bracketed(v, lo, hi, sign_lo, tol, maxiter, x0=None):
+    """在 [lo, hi] 內以保護式牛頓法求根，回傳 (x, converged)
+
+    已收斂的列先以遮罩凍結，待剩餘列不到一半時才壓縮工作陣列，減少花式索引的複製成本。
+    """
+    n = v.shape[1]
+    out = np.full(n, np.nan)
+    conv = np.zeros(n, dtype=bool)
+    idx = np.arange(n)
+    if x0 is None:
+        x0 = np.full(n, 1.0 / 1.1)
+    x = np.where((x0 > lo) & (x0 < hi), x0, 0.5 * (lo + hi))
+    done = np.zeros(n, dtype=bool)
+    for _ in range(maxiter):
+        f, df = _horner(v, x)
+        below = np.sign(f) == sign_lo
+        lo = np.where(below, x, lo)
+        hi = np.where(below, hi, x)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            dx = f / df
+        step = x - dx
+        ok = (step >= lo) & (step <= hi)  # NaN 比較為 False
+        x_new = np.where(ok, step, 0.5 * (lo + hi))
+        x = np.where(done | (f == 0), x, x_new)
+        done |= (f == 0) | (ok & (np.abs(dx) <= tol * x)) | (hi - lo <= tol * hi)
+        n_live = len(done) - np.count_nonzero(done)
+        if n_live == 0 or n_live * 2 < len(done):
+            out[idx[done]] = x[done]
+            conv[idx[done]] = True
+            if n_live == 0:
+                break
+            live = ~done
+            v, x, lo, hi, sign_lo, idx = np.ascontiguousarray(v[:, live]), x[live], lo[live], hi[live], sign_lo[live], idx[live]
+            done = np.zeros(n_live, dtype=bool)
+    return out, conv
+
+
+def irr_batch(cashflows, tol: float = TOL, maxiter: int = MAX_ITER) -> Tuple[np.ndarray, np.ndarray]:
+    """批次計算 IRR
+
+    cashflows 形狀 (..., T)；回傳 (irr, converged)，形狀為 (...)。
+    未收斂或無根者 irr 為 NaN、converged 為 False。
+    """
+    cf = np.asarray(cashflows, dtype=float)
+    lead = cf.shape[:-1]
+    v = np.ascontiguousarray(cf.reshape(-1, cf.shape[-1]).T)
+    n = v.shape[1]
+    x = np.full(n, np.nan)
+    conv = np.zeros(n, dtype=bool)
+
+    finite = np.isfinite(v).all(axis=0)
+    changes = _sign_changes(np.where(finite, v, 0) if not finite.all() else v)
+
+    # 一次變號：[0, X] 括區
+    single = np.flatnonzero(changes == 1)
+    if single.size:
+        vs = v if single.size == n else np.ascontiguousarray(v[:, single])
+        sign_lo = _low_sign(vs)
+        hi = np.ones(single.size)
+        pending = np.arange(single.size)
+        for _ in range(64):
+            f, _df = _horner(vs if pending.size == single.size else vs[:, pending], hi[pending])
+            grow = np.sign(f) == sign_lo[pending]
+            if not grow.any():
+                break
+            hi[pending[grow]] *= 2.0
+            pending = pending[grow]
+        lo = np.zeros(single.size)
+        x[single], conv[single] = _solve_bracketed(vs, lo, hi, sign_lo, tol, maxiter,
+                                                      _newton(vs, _duration_guess(vs), 4))
+
+    # 多次變號：網格掃描，取最接近 r = 0 的兩個變號區間分別求根後擇近者
+    multi = np.flatnonzero(changes >= 2)
+    if multi.size:
+        vm = np.ascontiguousarray(v[:, multi])
+        grid = _SCAN_GRID
+        vals = np.stack([_horner(vm, np.full(multi.size, g))[0] for g in grid], axis=1)
+        flips = np.sign(vals[:, 1:]) * np.sign(vals[:, :-1]) <= 0
+        dist = np.minimum(np.abs(1 / grid[:-1] - 1), np.abs(1 / grid[1:] - 1))
+        score = np.where(flips, dist[None, :], np.inf)
+        rows_all = np.arange(multi.size)
+        for _ in range(2):
+            k = np.argmin(score, axis=1)
+            found = np.isfinite(score[rows_all, k])
+            score[rows_all, k] = np.inf
+            if not found.any():
+                break
+            rows, kk = multi[found], k[found]
+            cand, ok = _solve_bracketed(np.ascontiguousarray(v[:, rows]), grid[kk].copy(), grid[kk + 1].copy(),
+                                        np.sign(vals[found, kk]), tol, maxiter)
+            with np.errstate(divide="ignore"):
+                better = ok & (~conv[rows] | (np.abs(1 / cand - 1) < np.abs(1 / x[rows] - 1)))
+            x[rows[better]] = cand[better]
+            conv[rows[better]] = True
+
+    with np.errstate(divide="ignore"):
+        rate = np.where(conv & (x > 0), 1.0 / x - 1.0, np.nan)
+    conv &= np.isfinite(rate)
+    return rate.reshape(lead), conv.reshape(lead)
+
+
+def irr(values: Sequence[float], tol: float = TOL, maxiter: int = MAX_ITER) -> float:
+    """單一現金流 IRR（無根時回傳 NaN）
+
+    常見的一次變號現金流以純 Python 迭代求解以省去陣列開銷，其餘交給 `irr_batch`。
+    """
+    v = [float(a) for a in values]
+    nz = [a for a in v if a != 0]
+    if all(map(math.isfinite, v)) and nz and sum(1 for a, b in zip(nz, nz[1:]) if a * b < 0) == 1:
+        sign_lo = 1.0 if nz[0] > 0 else -1.0
+
+        def horner(x):
+            f, df = v[-1], 0.0
+            for c in reversed(v[:-1]):
+                df = df * x + f
+                f = f * x + c
+            return f, df
+
+        lo, hi = 0.0, 1.0
+        for _ in range(64):
+            f_hi = horner(hi)[0]
+            if (f_hi > 0) - (f_hi < 0) != sign_lo:
+                break
+            lo, hi = hi, hi * 2.0
+        x = 1.0 / 1.1 if lo < 1.0 < hi else 0.5 * (lo + hi)
+        for _ in range(maxiter):
+            f, df = horner(x)
+            if f == 0:
+                return 1.0 / x - 1.0
+            if (f > 0) - (f < 0) == sign_lo:
+                lo = x
+            else:
+                hi = x
+            dx = f / df if df != 0 else math.nan
+            step = x - dx
+            if lo <= step <= hi:
+                x = step
+                if abs(dx) <= tol * abs(step):
+                    break
+            else:
+                x = 0.5 * (lo + hi)
+            if hi - lo <= tol * hi:
+                break
+        else:
+            return math.nan
+        return 1.0 / x - 1.0 if x > 0 else math.nan
+    rate, _conv = irr_batch([v], tol, maxiter)
+    return float(rate[0])
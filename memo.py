@@ -0,0 +1,83 @@
+"""以模型參數為鍵的 LRU 快取
+
+Streamlit 每次互動都會重跑整個 `app.py`；把模型結果、表格與圖表依參數雜湊存入
+session 內的 `LRUCache`，只調整無關元件（例如熱力圖範圍）時即可直接重用。
+"""
+from __future__ import annotations
+
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import astuple
+from typing import TYPE_CHECKING, Any, Callable, Hashable
+
+if TYPE_CHECKING:  # engine 經 cases 間接 import 本模組
+    from engine import ModelParams
+
+
+def _canonical(value: Any) -> str:
+    """數值一律轉成 float 的十六進位表示，避免 300 與 300.0 產生不同的鍵"""
+    if isinstance(value, bool):
+        return repr(value)
+    if isinstance(value, (int, float)):
+        return float(value).hex()
+    if isinstance(value, (tuple, list)):
+        return "(" + ",".join(_canonical(v) for v in value) + ")"
+    return repr(value)
+
+
+def params_key(params: ModelParams, *extra: Any) -> str:
+    """模型參數（可附加其他設定值）的標準化雜湊"""
+    payload = _canonical(astuple(params)) + "|" + _canonical(extra)
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class LRUCache:
+    """固定容量的 LRU 快取，附命中 / 未命中計數
+
+    下載按鈕的 callable 在背景執行緒執行，故字典操作以鎖保護；compute() 在鎖外執行。
+    """
+
+    def __init__(self, maxsize: int = 64):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """命中則回傳快取值，否則呼叫 compute() 並存入"""
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+        value = compute()
+        with self._lock:
+            self._data[key] = value
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
@@ -0,0 +1,320 @@
+"""蒙地卡羅不確定性分析
+
+以參考案件的費率範圍（最小 / 最大，不含不列入統計的項目）與目前套用的費率（眾數）
+建立三角分布，搭配售價與營建單價的
+常態分布抽樣，各分塊交給 `sweep.SweepPool` 計算（抽樣數夠多時分散到多個行程）。
+結果以固定分箱直方圖（含地主分回比 × IRR 二維直方圖）累計，記憶體只與 chunk_size 有關，
+與抽樣總數無關；同一組 (seed, chunk_size) 結果可重現，與 worker 數無關。
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterator, Optional, Sequence, Tuple
+
+import numpy as np
+
+from batch import BATCH_FIELDS, evaluate_batch
+from cases import CaseStats
+from engine import FIVE_CASES_DATA, ModelParams
+from sweep import SweepPool, auto_workers
+
+PERCENTILES = (5, 10, 25, 50, 75, 90, 95)
+DEFAULT_CHUNK_SIZE = 200_000
+DRAW_OUTPUTS = ("IRR", "Landlord_Ratio", "Total_Cost")
+SUMMARY_OUTPUTS = ("IRR", "IRR_Converged", "Landlord_Ratio", "Total_Cost")
+SAMPLE_POINTS = 50_000  # 保留前 N 次抽樣的 (地主分回比, IRR) 供散點圖（抽樣獨立同分布，即為隨機樣本）
+
+# 由參考案件統計抽樣的費率欄位
+CASE_RATE_FIELDS = ("demolition_pct", "reloc_comp_pct", "design_fee_pct", "tax_pct")
+
+
+# ============================================================================
+# 🎲 機率分布
+# ============================================================================
+
+@dataclass(frozen=True, slots=True)
+class Fixed:
+    value: float
+
+    def sample(self, rng: np.random.Generator, n: int) -> np.ndarray:
+        return np.full(n, self.value)
+
+
+@dataclass(frozen=True, slots=True)
+class Uniform:
+    low: float
+    high: float
+
+    def sample(self, rng: np.random.Generator, n: int) -> np.ndarray:
+        return rng.uniform(self.low, self.high, n)
+
+
+@dataclass(frozen=True, slots=True)
+class Triangular:
+    low: float
+    mode: float
+    high: float
+
+    def sample(self, rng: np.random.Generator, n: int) -> np.ndarray:
+        if self.high <= self.low:
+            return np.full(n, self.mode)
+        return rng.triangular(self.low, self.mode, self.high, n)
+
+
+@dataclass(frozen=True, slots=True)
+class Normal:
+    mean: float
+    sd: float
+    low: float = 0.0  # 截斷下限（單價、費率不為負）
+
+    def sample(self, rng: np.random.Generator, n: int) -> np.ndarray:
+        return np.maximum(rng.normal(self.mean, self.sd, n), self.low)
+
+
+def default_distributions(base: ModelParams, price_sd: float = 0.10, cost_sd: float = 0.08,
+                          stats: Optional[CaseStats] = None) -> Dict[str, object]:
+    """預設分布：費率取三角分布，售價 / 營建單價取以目前設定為中心的常態分布
+
+    費率範圍取 stats（`CaseStore.aggregate()` 的篩選結果；未給時為五案件）中列入統計的最小 / 最大值，
+    眾數為 base 的費率（即模型套用的費率，範圍不含眾數時擴大至眾數）；沒有樣本的費率固定為 base 值。
+    price_sd、cost_sd 為相對標準差（例如 0.10 = ±10%）。
+    """
+    dists: Dict[str, object] = {}
+    for name in CASE_RATE_FIELDS:
+        mode = getattr(base, name)
+        if stats is not None:
+            low, high = stats.min.get(name), stats.max.get(name)
+        else:
+            values = [case[name] for case in FIVE_CASES_DATA.values() if name not in case.get("stat_exclude", ())]
+            low, high = (min(values), max(values)) if values else (None, None)
+        dists[name] = Fixed(mode) if low is None else Triangular(min(low, mode), mode, max(high, mode))
+    dists["price_unit_sale"] = Normal(base.price_unit_sale, base.price_unit_sale * price_sd)
+    dists["final_unit_cost"] = Normal(base.final_unit_cost, base.final_unit_cost * cost_sd)
+    return dists
+
+
+# ============================================================================
+# 📈 串流統計
+# ============================================================================
+
+class StreamingHistogram:
+    """固定分箱直方圖，用於串流估計分位數；超出範圍的值計入最外側分箱"""
+
+    def __init__(self, low: float, high: float, bins: int):
+        self.edges = np.linspace(low, high, bins + 1)
+        self.counts = np.zeros(bins, dtype=np.int64)
+        self.n = 0
+        self.total = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def add(self, values: np.ndarray) -> None:
+        values = values[np.isfinite(values)]
+        if values.size == 0:
+            return
+        lo, hi = self.edges[0], self.edges[-1]
+        width = (hi - lo) / len(self.counts)
+        idx = np.clip(((values - lo) / width).astype(np.int64), 0, len(self.counts) - 1)
+        self.counts += np.bincount(idx, minlength=len(self.counts))
+        self.n += values.size
+        self.total += float(values.sum())
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.n if self.n else float("nan")
+
+    def coarsen(self, n_bins: int = 100) -> Tuple[np.ndarray, np.ndarray]:
+        """將有資料的範圍合併為 n_bins 個分箱，回傳 (分箱中心, 次數) 供繪圖"""
+        nz = np.flatnonzero(self.counts)
+        if nz.size == 0:
+            return np.empty(0), np.empty(0, dtype=np.int64)
+        counts = self.counts[nz[0]:nz[-1] + 1]
+        edges = self.edges[nz[0]:nz[-1] + 2]
+        group = -(-len(counts) // n_bins)
+        pad = (-len(counts)) % group
+        merged = np.pad(counts, (0, pad)).reshape(-1, group).sum(axis=1)
+        left = edges[:-1:group]
+        width = (edges[1] - edges[0]) * group
+        return left + width / 2, merged
+
+    def quantile(self, q: float) -> float:
+        """分箱內線性內插的分位數（誤差不超過一個分箱寬度）"""
+        if self.n == 0:
+            return float("nan")
+        cum = np.cumsum(self.counts)
+        target = q * self.n
+        k = int(np.searchsorted(cum, target))
+        k = min(k, len(self.counts) - 1)
+        prev = cum[k - 1] if k > 0 else 0
+        frac = (target - prev) / self.counts[k] if self.counts[k] else 0.0
+        value = self.edges[k] + frac * (self.edges[k + 1] - self.edges[k])
+        return float(min(max(value, self.min), self.max))
+
+
+class StreamingHistogram2D:
+    """固定分箱二維直方圖（成對的 x, y），供密度圖；超出範圍的值計入最外側分箱"""
+
+    def __init__(self, x_range: Tuple[float, float], y_range: Tuple[float, float], bins: Tuple[int, int]):
+        self.x_edges = np.linspace(x_range[0], x_range[1], bins[0] + 1)
+        self.y_edges = np.linspace(y_range[0], y_range[1], bins[1] + 1)
+        self.counts = np.zeros((bins[1], bins[0]), dtype=np.int32)  # (y, x)，與 go.Heatmap 的 z 相同
+
+    def _index(self, values: np.ndarray, edges: np.ndarray) -> np.ndarray:
+        n = len(edges) - 1
+        return np.clip(((values - edges[0]) / (edges[-1] - edges[0]) * n).astype(np.int64), 0, n - 1)
+
+    def add(self, x: np.ndarray, y: np.ndarray) -> None:
+        ok = np.isfinite(x) & np.isfinite(y)
+        ny, nx = self.counts.shape
+        flat = self._index(y[ok], self.y_edges) * nx + self._index(x[ok], self.x_edges)
+        self.counts += np.bincount(flat, minlength=nx * ny).reshape(ny, nx).astype(np.int32)
+
+    def coarsen(self, max_bins: Tuple[int, int] = (150, 150)) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """裁切至有資料的範圍並合併為不超過 max_bins (x, y) 個分箱，回傳 (x 中心, y 中心, 次數)"""
+        rows = np.flatnonzero(self.counts.any(axis=1))
+        cols = np.flatnonzero(self.counts.any(axis=0))
+        if rows.size == 0:
+            return np.empty(0), np.empty(0), np.empty((0, 0), dtype=np.int64)
+        counts = self.counts[rows[0]:rows[-1] + 1, cols[0]:cols[-1] + 1].astype(np.int64)
+        gy = -(-counts.shape[0] // max_bins[1])
+        gx = -(-counts.shape[1] // max_bins[0])
+        counts = np.pad(counts, ((0, (-counts.shape[0]) % gy), (0, (-counts.shape[1]) % gx)))
+        merged = counts.reshape(counts.shape[0] // gy, gy, counts.shape[1] // gx, gx).sum(axis=(1, 3))
+        wx = (self.x_edges[1] - self.x_edges[0]) * gx
+        wy = (self.y_edges[1] - self.y_edges[0]) * gy
+        x = self.x_edges[cols[0]] + wx * (np.arange(merged.shape[1]) + 0.5)
+        y = self.y_edges[rows[0]] + wy * (np.arange(merged.shape[0]) + 0.5)
+        return x, y, merged
+
+
+@dataclass
+class MonteCarloSummary:
+    """蒙地卡羅結果摘要"""
+    base: ModelParams
+    n_draws: int
+    seed: int
+    irr_target: float
+    landlord_band: Tuple[float, float]
+    irr: StreamingHistogram = field(repr=False)
+    landlord: StreamingHistogram = field(repr=False)
+    total_cost: StreamingHistogram = field(repr=False)
+    n_irr_ok: int = 0
+    n_landlord_in_band: int = 0
+    n_irr_nan: int = 0
+    distributions: Dict[str, object] = field(default_factory=dict, repr=False)
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+    joint: Optional[StreamingHistogram2D] = field(default=None, repr=False)  # x：地主分回比，y：IRR
+    sample: Dict[str, np.ndarray] = field(default_factory=dict, repr=False)  # 前 SAMPLE_POINTS 次抽樣（float32）
+
+    @property
+    def p_irr_ok(self) -> float:
+        """P(IRR ≥ 目標)，無解的 IRR 視為未達標"""
+        return self.n_irr_ok / self.n_draws if self.n_draws else float("nan")
+
+    @property
+    def p_landlord_in_band(self) -> float:
+        return self.n_landlord_in_band / self.n_draws if self.n_draws else float("nan")
+
+    def percentiles(self) -> Dict[str, Dict[int, float]]:
+        return {
+            name: {q: hist.quantile(q / 100) for q in PERCENTILES}
+            for name, hist in (("IRR", self.irr), ("Landlord_Ratio", self.landlord), ("Total_Cost", self.total_cost))
+        }
+
+
+# ============================================================================
+# 🔧 主程式
+# ============================================================================
+
+def chunk_seeds(seed: int, n_draws: int, chunk_size: int) -> list:
+    """每個分塊獨立的亂數種子（分塊順序或平行執行都不影響結果）"""
+    n_chunks = max(1, -(-n_draws // chunk_size))
+    return np.random.SeedSequence(seed).spawn(n_chunks)
+
+
+def sample_chunk(distributions: Dict[str, object], seed_seq, n: int) -> Dict[str, np.ndarray]:
+    """依分布抽樣一個分塊的輸入欄位"""
+    rng = np.random.default_rng(seed_seq)
+    return {name: dist.sample(rng, n) for name, dist in distributions.items()}
+
+
+def run_monte_carlo(
+    base: ModelParams,
+    n_draws: int = 1_000_000,
+    seed: int = 0,
+    distributions: Optional[Dict[str, object]] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    irr_target: float = 0.12,
+    landlord_band: Tuple[float, float] = (0.45, 0.55),
+    on_chunk: Optional[Callable[[int, int], None]] = None,
+    sample_points: int = SAMPLE_POINTS,
+    workers: Optional[int] = None,
+) -> MonteCarloSummary:
+    """執行蒙地卡羅模擬並回傳串流統計摘要
+
+    on_chunk(done, total) 於每個分塊完成後呼叫，可用於進度條。workers 未指定時依抽樣數
+    由 `sweep.auto_workers()` 決定；每個分塊再平分給各 worker。
+    """
+    if distributions is None:
+        distributions = default_distributions(base)
+    unknown = set(distributions) - set(BATCH_FIELDS)
+    if unknown:
+        raise TypeError(f"未知的抽樣參數：{', '.join(sorted(unknown))}")
+
+    summary = MonteCarloSummary(
+        base=base,
+        n_draws=n_draws,
+        seed=seed,
+        irr_target=irr_target,
+        landlord_band=landlord_band,
+        irr=StreamingHistogram(-1.0, 3.0, 40_000),
+        landlord=StreamingHistogram(-1.0, 1.0, 20_000),
+        total_cost=StreamingHistogram(0.0, 1e7, 100_000),
+        distributions=distributions,
+        chunk_size=chunk_size,
+        joint=StreamingHistogram2D((-1.0, 1.0), (-1.0, 3.0), (500, 1000)),
+        sample={name: np.empty(0, dtype=np.float32) for name in ("Landlord_Ratio", "IRR")},
+    )
+    seeds = chunk_seeds(seed, n_draws, chunk_size)
+    workers = workers or auto_workers(n_draws)
+    with SweepPool(base, list(distributions), SUMMARY_OUTPUTS, capacity=min(chunk_size, n_draws),
+                   workers=workers, chunk_size=-(-chunk_size // workers)) as pool:
+        done = 0
+        for seed_seq in seeds:
+            n = min(chunk_size, n_draws - done)
+            out, _ = pool.evaluate(sample_chunk(distributions, seed_seq, n))
+            _accumulate(summary, out, sample_points)
+            done += n
+            if on_chunk is not None:
+                on_chunk(done, n_draws)
+    return summary
+
+
+def _accumulate(summary: MonteCarloSummary, res: Dict[str, np.ndarray], sample_points: int) -> None:
+    """將一個分塊的 SUMMARY_OUTPUTS 計入摘要"""
+    irr, landlord = res["IRR"], res["Landlord_Ratio"]
+    summary.irr.add(irr)
+    summary.landlord.add(landlord)
+    summary.total_cost.add(res["Total_Cost"])
+    summary.joint.add(landlord, irr)
+    need = sample_points - len(summary.sample["IRR"])
+    if need > 0:
+        for name in summary.sample:
+            summary.sample[name] = np.concatenate([summary.sample[name], res[name][:need].astype(np.float32)])
+    summary.n_irr_ok += int(np.count_nonzero(irr >= summary.irr_target))
+    summary.n_irr_nan += int(np.count_nonzero(~res["IRR_Converged"]))
+    lo, hi = summary.landlord_band
+    summary.n_landlord_in_band += int(np.count_nonzero((landlord >= lo) & (landlord <= hi)))
+
+
+def iter_draws(summary: MonteCarloSummary, outputs: Sequence[str] = DRAW_OUTPUTS) -> Iterator[Dict[str, np.ndarray]]:
+    """重現 summary 的每一次抽樣，逐塊產出抽樣輸入與 outputs 欄位（供匯出明細，記憶體只與 chunk_size 有關）"""
+    done = 0
+    for seed_seq in chunk_seeds(summary.seed, summary.n_draws, summary.chunk_size):
+        n = min(summary.chunk_size, summary.n_draws - done)
+        inputs = sample_chunk(summary.distributions, seed_seq, n)
+        res = evaluate_batch(summary.base, **inputs)
+        yield {**inputs, **{name: getattr(res, name) for name in outputs}}
+        done += n
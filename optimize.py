@@ -0,0 +1,133 @@
+"""協商參數最佳化
+
+在使用者給定的範圍內搜尋貸款成數、獎勵倍數、建材等級與管理費率，
+使實施者 IRR 最大且地主分回比不低於下限（或反之）。
+
+風險費率查表與車位取整使模型呈階梯狀，建材等級又是離散選項，因此不用梯度法，
+而以批次隨機搜尋逐輪縮小範圍：每輪抽樣大量候選組合，一次以
+`batch.evaluate_batch()` 計算，保留最佳的一小群後以其涵蓋範圍作為下一輪的搜尋區間。
+"""
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from batch import evaluate_batch
+from engine import CONST_TYPES, ModelParams
+
+# 可協商的連續參數與預設範圍
+OPT_BOUNDS = {
+    "loan_ratio": (0.40, 0.80),
+    "bonus_multiplier": (1.0, 2.0),
+    "rate_personnel": (0.01, 0.05),
+    "rate_sales": (0.03, 0.08),
+}
+
+# 目標 → 另一方的下限條件
+OPT_OBJECTIVES = {
+    "IRR": "Landlord_Ratio",
+    "Landlord_Ratio": "IRR",
+}
+
+
+@dataclass
+class OptimizeResult:
+    """最佳化結果；找不到滿足下限的組合時 feasible 為 False，回傳最接近下限者"""
+    params: ModelParams
+    const_type: str
+    objective: str
+    objective_value: float
+    constraint_value: float
+    feasible: bool
+    n_evaluated: int
+    seconds: float
+    history: List[float] = field(default_factory=list, repr=False)  # 每輪最佳目標值
+
+
+def _sample(rng, box: Mapping[str, Tuple[float, float]], grades: Sequence[int], n: int) -> Dict[str, np.ndarray]:
+    cand = {name: rng.uniform(lo, hi, n) for name, (lo, hi) in box.items()}
+    cand["grade"] = rng.choice(np.asarray(grades), n)
+    return cand
+
+
+def optimize(
+    base: ModelParams,
+    objective: str = "IRR",
+    floor: float = 0.50,
+    bounds: Optional[Mapping[str, Tuple[float, float]]] = None,
+    grades: Optional[Sequence[str]] = None,
+    base_unit_cost: Optional[float] = None,
+    n_candidates: int = 200_000,
+    rounds: int = 4,
+    elite_frac: float = 0.01,
+    seed: int = 0,
+) -> OptimizeResult:
+    """最大化 objective（"IRR" 或 "Landlord_Ratio"），條件為另一項 ≥ floor
+
+    grades 為可選的 `CONST_TYPES` 標籤；base_unit_cost 為建材係數前的營建基準單價，
+    預設視 base.final_unit_cost 為一般標準 (S0) 單價。
+    """
+    if objective not in OPT_OBJECTIVES:
+        raise ValueError(f"不支援的最佳化目標：{objective}")
+    bounds = dict(OPT_BOUNDS if bounds is None else bounds)
+    unknown = set(bounds) - set(OPT_BOUNDS)
+    if unknown:
+        raise TypeError(f"未知的最佳化參數：{', '.join(sorted(unknown))}")
+    grade_labels = list(grades) if grades else list(CONST_TYPES)
+    coeffs = np.array([CONST_TYPES[g] for g in grade_labels])
+    unit_cost = base.final_unit_cost if base_unit_cost is None else base_unit_cost
+    constraint = OPT_OBJECTIVES[objective]
+
+    rng = np.random.default_rng(seed)
+    box = dict(bounds)
+    live_grades = list(range(len(grade_labels)))
+    per_round = max(1, n_candidates // rounds)
+    best = None  # (feasible, score, candidate dict)
+    history = []
+    t0 = time.perf_counter()
+
+    for _ in range(rounds):
+        cand = _sample(rng, box, live_grades, per_round)
+        res = evaluate_batch(base, final_unit_cost=unit_cost * (1 + coeffs[cand["grade"]]),
+                             **{k: v for k, v in cand.items() if k != "grade"})
+        obj = getattr(res, objective)
+        con = getattr(res, constraint)
+        ok = np.isfinite(obj) & np.isfinite(con)
+        feasible = ok & (con >= floor)
+        # 可行者依目標排序；尚無可行解時改以違反量最小者引導下一輪
+        score = np.where(feasible, obj, np.where(ok, con - floor - 1e6, -np.inf))
+        order = np.argsort(score)[::-1]
+        i = order[0]
+        if best is None or (feasible[i], score[i]) > (best[0], best[1]):
+            best = (bool(feasible[i]), float(score[i]), {k: v[i] for k, v in cand.items()},
+                    float(obj[i]), float(con[i]))
+        history.append(best[3] if best[0] else float("nan"))
+
+        elite = order[:max(16, int(per_round * elite_frac))]
+        elite = elite[np.isfinite(score[elite])]
+        if elite.size == 0:
+            continue
+        for name, (lo, hi) in bounds.items():
+            e_lo, e_hi = cand[name][elite].min(), cand[name][elite].max()
+            pad = 0.1 * (e_hi - e_lo)
+            box[name] = (max(lo, e_lo - pad), min(hi, e_hi + pad))
+        live_grades = sorted(set(cand["grade"][elite].tolist()))
+
+    feasible, _score, point, obj_val, con_val = best
+    grade = int(point.pop("grade"))
+    params = base.replace(final_unit_cost=float(unit_cost * (1 + coeffs[grade])),
+                          **{k: float(v) for k, v in point.items()})
+    return OptimizeResult(
+        params=params,
+        const_type=grade_labels[grade],
+        objective=objective,
+        objective_value=obj_val,
+        constraint_value=con_val,
+        feasible=feasible,
+        n_evaluated=per_round * rounds,
+        seconds=time.perf_counter() - t0,
+        history=history,
+    )
@@ -0,0 +1,161 @@
+"""重跑效能剖析
+
+記錄 `app.py` 每次重跑各區段的耗時與記憶體配置，可匯出為 JSON Lines 結構化日誌
+或 Chrome trace（chrome://tracing、Perfetto 可開啟）。
+
+- `checkpoint(name)`：結束上一個頂層區段並開始新區段，不需縮排既有程式碼。
+- `section(name)`：巢狀區段（context manager），用於函式內部。
+- 停用時兩者都立即返回（`section` 回傳共用的空 context），額外成本僅一次屬性判斷。
+- 記憶體配置以 tracemalloc 量測（區段內淨配置與尖峰），只在 track_alloc=True 時啟動。
+  tracemalloc 是整個行程共用的，會拖慢所有 session，且數字包含同時執行的其他執行緒；
+  因此只能由伺服器端環境變數 APP_PROFILE_ALLOC=1 開啟，並由啟動追蹤的 profiler 在
+  finish()（或物件回收時）停止。
+"""
+from __future__ import annotations
+
+import contextlib
+import json
+import logging
+import os
+import threading
+import time
+import tracemalloc
+import weakref
+from dataclasses import asdict, dataclass
+from typing import List, Optional
+
+_NULL = contextlib.nullcontext()
+_LOGGER = logging.getLogger("thesis_model.profile")
+
+# 環境變數 APP_PROFILE=1 時預設啟用；APP_PROFILE_ALLOC=1 另記錄記憶體配置
+ENV_FLAG = "APP_PROFILE"
+ALLOC_ENV_FLAG = "APP_PROFILE_ALLOC"
+
+
+@dataclass(slots=True)
+class Span:
+    name: str
+    start: float        # 相對重跑起點（秒）
+    duration: float     # 秒
+    depth: int
+    alloc_kb: float = 0.0   # 區段結束時的淨配置變化
+    peak_kb: float = 0.0    # 區段內的配置尖峰（相對區段起點）
+    thread: int = 0
+
+
+def env_enabled(flag: str = ENV_FLAG) -> bool:
+    return os.environ.get(flag, "").lower() in ("1", "true", "yes")
+
+
+class RerunProfiler:
+    """單次重跑的區段計時器"""
+
+    def __init__(self, enabled: bool = False, track_alloc: bool = False, t0: Optional[float] = None):
+        self.enabled = enabled
+        self.track_alloc = enabled and track_alloc
+        self.t0 = time.perf_counter() if t0 is None else t0
+        self.wall_start = time.time() - (time.perf_counter() - self.t0)
+        self.spans: List[Span] = []
+        self._depth = 0
+        self._current = None  # 目前的頂層 checkpoint：(名稱, 起點, 配置起點)
+        self._lock = threading.Lock()
+        self.total = 0.0
+        # 只停止自己啟動的追蹤；重跑中途中斷（例如 st.rerun()）時於物件回收時停止
+        self._stop_tracing = None
+        if self.track_alloc and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._stop_tracing = weakref.finalize(self, tracemalloc.stop)
+
+    def _alloc(self) -> int:
+        return tracemalloc.get_traced_memory()[0] if self.track_alloc else 0
+
+    def _record(self, name, start, alloc_start, depth, peak=0) -> None:
+        end = time.perf_counter()
+        alloc = self._alloc()
+        span = Span(name, start - self.t0, end - start, depth,
+                    (alloc - alloc_start) / 1024, max(0, peak - alloc_start) / 1024, threading.get_ident())
+        with self._lock:
+            self.spans.append(span)
+
+    def checkpoint(self, name: str) -> None:
+        """結束上一個頂層區段並開始 name"""
+        if not self.enabled:
+            return
+        if self._current is not None:
+            self._record(*self._current, 0, self._peak())
+        elif self.track_alloc:
+            tracemalloc.reset_peak()
+        self._current = (name, time.perf_counter(), self._alloc())
+
+    def _peak(self) -> int:
+        if not self.track_alloc:
+            return 0
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.reset_peak()
+        return peak
+
+    def section(self, name: str):
+        """巢狀區段；停用時回傳共用的空 context"""
+        if not self.enabled:
+            return _NULL
+        return self._section(name)
+
+    @contextlib.contextmanager
+    def _section(self, name: str):
+        self._depth += 1
+        start, alloc_start = time.perf_counter(), self._alloc()
+        try:
+            yield
+        finally:
+            self._depth -= 1
+            self._record(name, start, alloc_start, self._depth + 1)
+
+    def finish(self) -> None:
+        """結束最後一個頂層區段並計算總耗時"""
+        if not self.enabled:
+            return
+        if self._current is not None:
+            self._record(*self._current, 0, self._peak())
+            self._current = None
+        self.total = time.perf_counter() - self.t0
+        if self._stop_tracing is not None:
+            self._stop_tracing()
+
+    # ------------------------------------------------------------------ 匯出
+    def to_records(self) -> List[dict]:
+        return [asdict(s) for s in self.spans]
+
+    def to_jsonl(self) -> str:
+        """每個區段一行 JSON（結構化日誌）"""
+        return "\n".join(json.dumps({"rerun_start": self.wall_start, **r}, ensure_ascii=False)
+                         for r in self.to_records())
+
+    def log(self) -> None:
+        """以 INFO 層級將本次重跑輸出到 thesis_model.profile logger"""
+        if self.enabled and _LOGGER.isEnabledFor(logging.INFO):
+            _LOGGER.info(json.dumps({"rerun_start": self.wall_start, "total": self.total,
+                                     "spans": self.to_records()}, ensure_ascii=False))
+
+
+def chrome_trace(profilers: List[RerunProfiler]) -> dict:
+    """多次重跑合併為 Chrome trace（Trace Event Format 的 complete event）"""
+    events = []
+    if not profilers:
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+    origin = min(p.wall_start for p in profilers)
+    for i, p in enumerate(profilers):
+        offset = (p.wall_start - origin) * 1e6
+        events.append({"name": f"rerun #{i + 1}", "ph": "X", "ts": offset, "dur": p.total * 1e6,
+                       "pid": 1, "tid": 0, "cat": "rerun"})
+        for s in p.spans:
+            events.append({
+                "name": s.name,
+                "ph": "X",
+                "ts": offset + s.start * 1e6,
+                "dur": s.duration * 1e6,
+                "pid": 1,
+                "tid": 0 if s.thread == p.spans[0].thread else s.thread,
+                "cat": "section",
+                "args": {"alloc_kb": round(s.alloc_kb, 1), "peak_kb": round(s.peak_kb, 1), "depth": s.depth},
+            })
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
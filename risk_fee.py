@@ -0,0 +1,130 @@
+"""風險管理費率表（表3-1）
+
+費率表以資料檔定義，主管機關修訂級距或費率時只需替換檔案，不必修改程式：
+預設讀取 data/risk_fee_schedule.json，可用環境變數 RISK_FEE_SCHEDULE 指定其他檔案。
+
+每個維度以依序排列的上限條件描述級距，例如 [["<=", 2500], ["<=", 7500]] 表示
+≤2500、≤7500、其餘三級；rates[面積級距][人數級距] 為費率。
+查表等同原本的 if/elif：第一個成立的條件即為級距，都不成立（含 NaN）落在最後一級。
+向量版以 np.searchsorted 做區間搜尋，與純量版在所有邊界上結果逐位元相同。
+"""
+from __future__ import annotations
+
+import json
+import os
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass, field
+from typing import Mapping, Optional, Tuple
+
+import numpy as np
+
+SCHEDULE_ENV = "RISK_FEE_SCHEDULE"
+DEFAULT_SCHEDULE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "risk_fee_schedule.json")
+_OPS = ("<", "<=")
+
+
+@dataclass(frozen=True)
+class FeeAxis:
+    """單一查表維度：ops[i] / bounds[i] 為第 i 級的上限條件（bounds 須嚴格遞增）"""
+    label: str
+    ops: Tuple[str, ...]
+    bounds: Tuple[float, ...]
+    # 「≤ b」不成立 ⇔ b < x，「< b」不成立 ⇔ b ≤ x；級距 = 不成立的條件數
+    _le: Tuple[float, ...] = field(init=False, repr=False, compare=False)
+    _lt: Tuple[float, ...] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        if len(self.ops) != len(self.bounds):
+            raise ValueError(f"{self.label}：條件與上限數量不符")
+        bad = set(self.ops) - set(_OPS)
+        if bad:
+            raise ValueError(f"{self.label}：不支援的條件 {', '.join(sorted(bad))}（僅限 < 與 <=）")
+        if any(not a < b for a, b in zip(self.bounds, self.bounds[1:])):
+            raise ValueError(f"{self.label}：級距上限須嚴格遞增")
+        object.__setattr__(self, "_le", tuple(b for op, b in zip(self.ops, self.bounds) if op == "<="))
+        object.__setattr__(self, "_lt", tuple(b for op, b in zip(self.ops, self.bounds) if op == "<"))
+
+    @property
+    def levels(self) -> int:
+        return len(self.bounds) + 1
+
+    def level(self, x: float) -> int:
+        if x != x:  # NaN 與所有條件比較皆不成立
+            return len(self.bounds)
+        return bisect_left(self._le, x) + bisect_right(self._lt, x)
+
+    def level_batch(self, x) -> np.ndarray:
+        # searchsorted 將 NaN 排在最後，恰好落在最後一級
+        x = np.asarray(x, dtype=float)
+        return (np.searchsorted(np.asarray(self._le, dtype=float), x, side="left")
+                + np.searchsorted(np.asarray(self._lt, dtype=float), x, side="right"))
+
+    def band_labels(self) -> list:
+        """各級距的文字說明，例如 ['≤ 2500', '≤ 7500', '> 7500']"""
+        sym = {"<": "<", "<=": "≤"}
+        last = {"<": "≥", "<=": ">"}[self.ops[-1]] if self.ops else ""
+        labels = [f"{sym[op]} {b:g}" for op, b in zip(self.ops, self.bounds)]
+        return labels + ([f"{last} {self.bounds[-1]:g}"] if self.bounds else ["全部"])
+
+    @classmethod
+    def from_dict(cls, d: Mapping, label: str = "") -> "FeeAxis":
+        bands = [tuple(b) for b in d["bands"]]
+        return cls(label=d.get("label", label), ops=tuple(op for op, _ in bands),
+                   bounds=tuple(float(b) for _, b in bands))
+
+
+@dataclass(frozen=True)
+class RiskFeeSchedule:
+    """二維費率表：rates[面積級距][人數級距]"""
+    gfa: FeeAxis
+    owners: FeeAxis
+    rates: Tuple[Tuple[float, ...], ...]
+    name: str = ""
+    _table: np.ndarray = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        table = np.array(self.rates, dtype=float)
+        if table.shape != (self.gfa.levels, self.owners.levels):
+            raise ValueError(f"費率表形狀 {table.shape} 與級距數 ({self.gfa.levels}, {self.owners.levels}) 不符")
+        table.setflags(write=False)
+        object.__setattr__(self, "_table", table)
+
+    def rate(self, gfa_ping: float, owners: float) -> float:
+        return self.rates[self.gfa.level(gfa_ping)][self.owners.level(owners)]
+
+    def rate_batch(self, gfa_ping, owners) -> np.ndarray:
+        """陣列輸入依 NumPy broadcasting 查表"""
+        return self._table[self.gfa.level_batch(gfa_ping), self.owners.level_batch(owners)]
+
+    def to_frame(self):
+        """費率表轉為 DataFrame（列：面積級距，欄：人數級距）"""
+        import pandas as pd
+
+        return pd.DataFrame(self._table, index=pd.Index(self.gfa.band_labels(), name=self.gfa.label),
+                            columns=pd.Index(self.owners.band_labels(), name=self.owners.label))
+
+    @classmethod
+    def from_dict(cls, d: Mapping) -> "RiskFeeSchedule":
+        return cls(gfa=FeeAxis.from_dict(d["gfa"], "gfa"), owners=FeeAxis.from_dict(d["owners"], "owners"),
+                   rates=tuple(tuple(float(r) for r in row) for row in d["rates"]), name=d.get("name", ""))
+
+    def to_dict(self) -> dict:
+        axis = lambda a: {"label": a.label, "bands": [[op, b] for op, b in zip(a.ops, a.bounds)]}  # noqa: E731
+        return {"name": self.name, "gfa": axis(self.gfa), "owners": axis(self.owners),
+                "rates": [list(row) for row in self.rates]}
+
+
+def load_schedule(path: Optional[str] = None) -> RiskFeeSchedule:
+    """讀取費率表 JSON；path 未給時依序使用環境變數 RISK_FEE_SCHEDULE、預設檔案"""
+    path = path or os.environ.get(SCHEDULE_ENV) or DEFAULT_SCHEDULE_PATH
+    with open(path, encoding="utf-8") as f:
+        return RiskFeeSchedule.from_dict(json.load(f))
+
+
+def save_schedule(schedule: RiskFeeSchedule, path: str) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(schedule.to_dict(), f, ensure_ascii=False, indent=2)
+
+
+DEFAULT_SCHEDULE = load_schedule()
+
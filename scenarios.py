@@ -0,0 +1,111 @@
+"""情境庫：儲存多組參數與試算結果，並以批次計算一次重算全部情境
+
+每個情境為一組 `ModelParams` 與其主要輸出。儲存採欄式：每個參數欄位、每個輸出指標各為一個
+float64 NumPy 陣列（容量不足時倍增），情境名稱另存 list；數百個情境只佔數十 KB，
+比較表直接由欄位陣列組成，不需逐筆轉換。
+
+全域修改（例如新的貸款利率）以 `reevaluate(**overrides)` 將所有情境的參數欄位連同修改值
+交給 `sweep.run_sweep()`，一次向量化計算（情境數極多時分散到多個行程），而非逐一呼叫 `engine.evaluate()`。
+"""
+from __future__ import annotations
+
+from dataclasses import fields
+from typing import Dict, Iterable, List, Mapping, Optional
+
+import numpy as np
+
+from batch import BATCH_FIELDS
+from engine import ModelParams, evaluate
+from sweep import SWEEP_OUTPUTS, SweepResult, auto_workers, run_sweep
+
+SCENARIO_OUTPUTS = SWEEP_OUTPUTS
+_INT_FIELDS = frozenset(f.name for f in fields(ModelParams) if isinstance(getattr(ModelParams(), f.name), int))
+
+
+class ScenarioStore:
+    """欄式情境庫；索引 i 對應第 i 個情境（刪除後其後情境往前遞補）"""
+
+    def __init__(self, capacity: int = 16):
+        self.names: List[str] = []
+        self._n = 0
+        self._params = {name: np.empty(capacity) for name in BATCH_FIELDS}
+        self._outputs = {name: np.empty(capacity) for name in SCENARIO_OUTPUTS}
+
+    def __len__(self) -> int:
+        return self._n
+
+    def _reserve(self, n: int) -> None:
+        capacity = len(self._params[BATCH_FIELDS[0]])
+        if n <= capacity:
+            return
+        capacity = max(n, 2 * capacity)
+        for cols in (self._params, self._outputs):
+            for name, arr in cols.items():
+                grown = np.empty(capacity)
+                grown[:self._n] = arr[:self._n]
+                cols[name] = grown
+
+    def add(self, name: str, params: ModelParams, res: Optional[Mapping] = None) -> int:
+        """儲存一個情境（res 為 `engine.evaluate()` 結果，未給時即時計算），回傳索引"""
+        res = res if res is not None else evaluate(params)
+        self._reserve(self._n + 1)
+        i = self._n
+        for field in BATCH_FIELDS:
+            self._params[field][i] = getattr(params, field)
+        for out in SCENARIO_OUTPUTS:
+            self._outputs[out][i] = res.get(out, np.nan)
+        self.names.append(name)
+        self._n += 1
+        return i
+
+    def remove(self, indices: Iterable[int]) -> None:
+        drop = set(int(i) for i in indices)
+        keep = np.array([i for i in range(self._n) if i not in drop], dtype=np.int64)
+        for cols in (self._params, self._outputs):
+            for arr in cols.values():
+                arr[:len(keep)] = arr[keep]
+        self.names = [self.names[i] for i in keep]
+        self._n = len(keep)
+
+    def clear(self) -> None:
+        self.names = []
+        self._n = 0
+
+    def params(self, i: int) -> ModelParams:
+        """第 i 個情境的參數"""
+        def value(field):
+            v = float(self._params[field][i])
+            return int(v) if field in _INT_FIELDS and v.is_integer() else v
+        return ModelParams(**{field: value(field) for field in BATCH_FIELDS})
+
+    def param_columns(self) -> Dict[str, np.ndarray]:
+        """參數欄位（長度為情境數的唯讀檢視）"""
+        return {name: _view(arr, self._n) for name, arr in self._params.items()}
+
+    def output_columns(self) -> Dict[str, np.ndarray]:
+        """輸出欄位（長度為情境數的唯讀檢視）"""
+        return {name: _view(arr, self._n) for name, arr in self._outputs.items()}
+
+    def reevaluate(self, base: ModelParams = ModelParams(), **overrides) -> SweepResult:
+        """所有情境套用 overrides（純量或長度為情境數的陣列）後一次批次重算，不修改情境庫"""
+        cols = {name: arr[:self._n] for name, arr in self._params.items()}
+        cols.update({name: np.asarray(v, dtype=float) for name, v in overrides.items()})
+        return run_sweep(base, SCENARIO_OUTPUTS, workers=auto_workers(self._n), **cols)
+
+    def apply(self, **overrides) -> SweepResult:
+        """所有情境套用 overrides 並以批次重算結果更新情境庫"""
+        result = self.reevaluate(**overrides)
+        for name, v in overrides.items():
+            self._params[name][:self._n] = v
+        for out in SCENARIO_OUTPUTS:
+            self._outputs[out][:self._n] = result[out]
+        return result
+
+    def nbytes(self) -> int:
+        return sum(arr[:self._n].nbytes for cols in (self._params, self._outputs) for arr in cols.values())
+
+
+def _view(arr: np.ndarray, n: int) -> np.ndarray:
+    v = arr[:n]
+    v.flags.writeable = False
+    return v
@@ -0,0 +1,79 @@
+"""單因子敏感度（龍捲風圖）
+
+每個輸入參數分別 ±pct 擾動、其餘維持不變，2×P 個情境組成一批，
+以一次 `batch.evaluate_batch()` 計算 IRR 與地主分回比的變動並依影響幅度排序。
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Sequence
+
+import numpy as np
+
+from batch import evaluate_batch
+from engine import ModelParams
+
+# 參數顯示名稱（與側邊欄一致），亦為預設的擾動參數清單
+PARAM_LABELS = {
+    "base_area": "基地面積",
+    "far_base_exist": "原建築容積率",
+    "bonus_multiplier": "防災獎勵倍數",
+    "coeff_gfa": "總樓地板係數 K_GFA",
+    "coeff_sale": "銷售面積係數 K_Sale",
+    "final_unit_cost": "營建單價",
+    "num_owners": "產權人數",
+    "loan_ratio": "貸款成數",
+    "rate_personnel": "人事行政管理費率",
+    "rate_sales": "銷售管理費率",
+    "loan_rate": "貸款年利率",
+    "dev_months": "開發期程",
+    "cost_bonus_app": "容積獎勵申請費",
+    "cost_urban_plan": "都計變更 / 審議費",
+    "cost_transfer": "容積移轉 / 折繳代金",
+    "price_unit_sale": "預售單價",
+    "price_parking": "車位單價",
+    "demolition_pct": "拆遷補償費率",
+    "reloc_comp_pct": "拆遷安置費率",
+    "design_fee_pct": "設計費率",
+    "tax_pct": "稅捐費率",
+}
+
+
+@dataclass(slots=True)
+class TornadoResult:
+    """各參數 -pct / +pct 時的輸出；陣列順序同 fields"""
+    fields: tuple
+    pct: float
+    base_irr: float
+    base_landlord: float
+    irr_low: np.ndarray
+    irr_high: np.ndarray
+    landlord_low: np.ndarray
+    landlord_high: np.ndarray
+
+    def ranking(self, metric: str = "IRR") -> np.ndarray:
+        """依擺幅（|high - low|）由大到小排序的索引；無解的 IRR 排在最後"""
+        low, high = (self.irr_low, self.irr_high) if metric == "IRR" else (self.landlord_low, self.landlord_high)
+        swing = np.abs(high - low)
+        return np.argsort(np.where(np.isnan(swing), -np.inf, swing))[::-1]
+
+
+def tornado(base: ModelParams, pct: float = 0.10, fields: Sequence[str] = tuple(PARAM_LABELS)) -> TornadoResult:
+    """單因子 ±pct 擾動，所有情境（含基準）一次批次計算"""
+    fields = tuple(fields)
+    n = 2 * len(fields) + 1  # 最後一列為基準情境
+    cols = {name: np.full(n, float(getattr(base, name))) for name in fields}
+    for i, name in enumerate(fields):
+        cols[name][2 * i] *= 1 - pct
+        cols[name][2 * i + 1] *= 1 + pct
+    res = evaluate_batch(base, **cols)
+    return TornadoResult(
+        fields=fields,
+        pct=pct,
+        base_irr=float(res.IRR[-1]),
+        base_landlord=float(res.Landlord_Ratio[-1]),
+        irr_low=res.IRR[:-1:2],
+        irr_high=res.IRR[1:-1:2],
+        landlord_low=res.Landlord_Ratio[:-1:2],
+        landlord_high=res.Landlord_Ratio[1:-1:2],
+    )
@@ -0,0 +1,295 @@
+"""多核心參數掃描
+
+把參數網格或抽樣結果切成分塊，交給行程池以 `batch.evaluate_batch()` 計算。
+輸入欄位與輸出結果都放在 `multiprocessing.shared_memory` 的 NumPy 緩衝區：
+worker 啟動時掛載一次，之後每個分塊只傳 (start, stop) 兩個整數，結果直接寫回
+共用記憶體，不會逐列 pickle 回主行程。
+
+支援取消（`threading.Event`）與每塊進度回呼；workers=1 時在本行程直接計算。
+`SweepPool` 保留行程池與緩衝區供多次計算（蒙地卡羅各抽樣分塊共用同一組 worker），
+`run_sweep()` 則為單次掃描（熱力圖網格、情境庫重算）；`auto_workers()` 在列數不足以
+抵銷啟動成本時回傳 1。使用 spawn 啟動 worker（Streamlit 為多執行緒程式，fork 不安全），從腳本呼叫時
+請放在 `if __name__ == "__main__":` 之下。
+"""
+from __future__ import annotations
+
+import multiprocessing as mp
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from multiprocessing import shared_memory
+from typing import Callable, Dict, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from batch import BATCH_FIELDS, evaluate_batch
+from engine import ModelParams
+
+# 預設輸出欄位（亦可指定 `BatchResult.Details` 的鍵，例如 "貸款利息"）
+SWEEP_OUTPUTS = ("GFA", "Total_Cost", "Total_Value", "Landlord_Ratio", "Risk_Rate", "IRR")
+
+DEFAULT_CHUNK_SIZE = 100_000
+# 列數達此值才值得啟動行程池（spawn worker 需載入 NumPy 與模型，約數百毫秒）
+PARALLEL_MIN_ROWS = 1_000_000
+
+# worker 行程掛載的共用緩衝區
+_WORKER: dict = {}
+
+
+# ============================================================================
+# 🧠 共用記憶體緩衝區
+# ============================================================================
+
+class SharedArrays:
+    """一組以 shared_memory 為底的 NumPy 陣列；spec 可傳給其他行程重新掛載"""
+
+    def __init__(self, spec: Mapping[str, Tuple[str, tuple, str]]):
+        """掛載 spec 描述的既有緩衝區"""
+        self.spec = dict(spec)
+        self._shm = {}
+        self.arrays: Dict[str, np.ndarray] = {}
+        for name, (shm_name, shape, dtype) in self.spec.items():
+            self._attach(name, shared_memory.SharedMemory(name=shm_name), shape, dtype)
+
+    def _attach(self, name: str, shm: shared_memory.SharedMemory, shape: tuple, dtype: str) -> None:
+        self._shm[name] = shm
+        self.arrays[name] = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+    @classmethod
+    def allocate(cls, layout: Mapping[str, Tuple[tuple, str]]) -> "SharedArrays":
+        """依 {名稱: (shape, dtype)} 建立新的共用緩衝區（區段名稱由系統產生，不會與其他行程衝突）"""
+        self = cls({})
+        try:
+            for name, (shape, dtype) in layout.items():
+                shape, dtype = tuple(shape), np.dtype(dtype).str
+                nbytes = max(1, int(np.prod(shape)) * np.dtype(dtype).itemsize)
+                shm = shared_memory.SharedMemory(create=True, size=nbytes)
+                self._attach(name, shm, shape, dtype)
+                self.spec[name] = (shm.name, shape, dtype)
+        except BaseException:
+            self.close()
+            self.unlink()
+            raise
+        return self
+
+    def close(self) -> None:
+        self.arrays.clear()
+        for shm in self._shm.values():
+            shm.close()
+
+    def unlink(self) -> None:
+        for shm in self._shm.values():
+            shm.unlink()
+
+
+def _output_dtype(name: str) -> str:
+    return "?" if name == "IRR_Converged" else "f8"
+
+
+def _evaluate_into(inputs: Mapping[str, np.ndarray], outputs: Mapping[str, np.ndarray],
+                   base: ModelParams, start: int, stop: int) -> int:
+    """計算 [start, stop) 並寫入輸出緩衝區"""
+    with_irr = "IRR" in outputs or "IRR_Converged" in outputs
+    res = evaluate_batch(base, with_irr, **{k: v[start:stop] for k, v in inputs.items()})
+    for name, buf in outputs.items():
+        buf[start:stop] = res.Details[name] if name in res.Details else getattr(res, name)
+    return stop - start
+
+
+def _init_worker(in_spec, out_spec, base, cancel_event) -> None:
+    inputs = SharedArrays(in_spec)
+    outputs = SharedArrays(out_spec)
+    _WORKER.update(inputs=inputs, outputs=outputs, base=base, cancel=cancel_event)
+
+
+def _run_chunk(start: int, stop: int) -> int:
+    if _WORKER["cancel"].is_set():
+        return 0
+    return _evaluate_into(_WORKER["inputs"].arrays, _WORKER["outputs"].arrays, _WORKER["base"], start, stop)
+
+
+# ============================================================================
+# 🔧 主程式
+# ============================================================================
+
+@dataclass
+class SweepResult:
+    """掃描結果；取消時未完成分塊的輸出為 NaN，completed 標示已計算的列"""
+    outputs: Dict[str, np.ndarray] = field(repr=False)
+    completed: np.ndarray = field(repr=False)
+    shape: tuple
+    cancelled: bool
+    seconds: float
+    workers: int
+
+    @property
+    def rows_per_sec(self) -> float:
+        return int(self.completed.sum()) / self.seconds if self.seconds else float("nan")
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.outputs[name]
+
+
+def default_workers() -> int:
+    return os.cpu_count() or 1
+
+
+def auto_workers(rows: int) -> int:
+    """rows 列的計算應使用的 worker 數：未達 PARALLEL_MIN_ROWS 時在本行程計算"""
+    return default_workers() if rows >= PARALLEL_MIN_ROWS else 1
+
+
+class SweepPool:
+    """可重複使用的行程池與共用緩衝區
+
+    輸入欄位（names）與輸出欄位固定，每次 `evaluate()` 最多 capacity 列，以 chunk_size 分塊派發；
+    workers=1 時不建立行程池，直接在本行程計算。用完請呼叫 `close()`（或以 with 使用）。
+    """
+
+    def __init__(
+        self,
+        base: ModelParams,
+        names: Sequence[str],
+        outputs: Sequence[str] = SWEEP_OUTPUTS,
+        capacity: int = DEFAULT_CHUNK_SIZE,
+        workers: Optional[int] = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ):
+        unknown = set(names) - set(BATCH_FIELDS)
+        if unknown:
+            raise TypeError(f"未知的掃描參數：{', '.join(sorted(unknown))}")
+        self.base = base
+        self.names = list(names)
+        self.outputs = list(outputs)
+        self.capacity = capacity
+        self.chunk_size = max(1, chunk_size)
+        self.workers = max(1, min(workers or default_workers(), -(-capacity // self.chunk_size) or 1))
+        self._pool = None
+        self._shared_in = self._shared_out = None
+        if self.workers == 1:
+            return
+        try:
+            self._shared_in = SharedArrays.allocate({k: ((capacity,), "f8") for k in self.names})
+            self._shared_out = SharedArrays.allocate({name: ((capacity,), _output_dtype(name)) for name in self.outputs})
+            ctx = mp.get_context("spawn")
+            self._worker_cancel = ctx.Event()
+            self._pool = ProcessPoolExecutor(self.workers, mp_context=ctx, initializer=_init_worker,
+                                             initargs=(self._shared_in.spec, self._shared_out.spec, base,
+                                                       self._worker_cancel))
+        except BaseException:
+            self.close()
+            raise
+
+    def __enter__(self) -> "SweepPool":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+        for shared in (self._shared_in, self._shared_out):
+            if shared is not None:
+                shared.close()
+                shared.unlink()
+        self._shared_in = self._shared_out = None
+
+    def evaluate(
+        self,
+        columns: Mapping[str, np.ndarray],
+        on_chunk: Optional[Callable[[int, int], None]] = None,
+        cancel: Optional[threading.Event] = None,
+    ) -> Tuple[Dict[str, np.ndarray], np.ndarray]:
+        """計算一組一維輸入欄位（長度相同且不超過 capacity），回傳（輸出欄位, 已計算的列）
+
+        on_chunk(done, total) 於每塊完成後呼叫；cancel 被設定後不再派發新分塊，未計算的列輸出為 NaN。
+        """
+        if set(columns) != set(self.names):
+            raise TypeError(f"輸入欄位須為：{', '.join(self.names)}")
+        inputs = {k: np.asarray(columns[k], dtype=float).reshape(-1) for k in self.names}
+        total = len(next(iter(inputs.values()))) if inputs else 1
+        if total > self.capacity:
+            raise ValueError(f"列數 {total:,} 超過緩衝區容量 {self.capacity:,}")
+        cancel = cancel if cancel is not None else threading.Event()
+        chunks = [(s, min(s + self.chunk_size, total)) for s in range(0, total, self.chunk_size)]
+        completed = np.zeros(total, dtype=bool)
+        done = 0
+
+        if self._pool is None:
+            out = {name: np.full(total, np.nan) if _output_dtype(name) == "f8" else np.zeros(total, dtype=bool)
+                   for name in self.outputs}
+            for start, stop in chunks:
+                if cancel.is_set():
+                    break
+                done += _evaluate_into(inputs, out, self.base, start, stop)
+                completed[start:stop] = True
+                if on_chunk is not None:
+                    on_chunk(done, total)
+            return out, completed
+
+        for k, a in inputs.items():
+            self._shared_in.arrays[k][:total] = a
+        for buf in self._shared_out.arrays.values():
+            buf[:total] = np.nan if buf.dtype.kind == "f" else False
+        self._worker_cancel.clear()
+        # 同時在途的分塊數以 2 × workers 為限，取消時不必清空大量排隊工作
+        pending = {}
+        queue = iter(chunks)
+        for start, stop in queue:
+            pending[self._pool.submit(_run_chunk, start, stop)] = (start, stop)
+            if len(pending) >= 2 * self.workers:
+                break
+        while pending:
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in finished:
+                start, stop = pending.pop(fut)
+                n = fut.result()
+                if n:
+                    done += n
+                    completed[start:stop] = True
+                    if on_chunk is not None:
+                        on_chunk(done, total)
+            if cancel.is_set():
+                self._worker_cancel.set()
+                continue
+            for start, stop in queue:
+                pending[self._pool.submit(_run_chunk, start, stop)] = (start, stop)
+                if len(pending) >= 2 * self.workers:
+                    break
+        return {name: buf[:total].copy() for name, buf in self._shared_out.arrays.items()}, completed
+
+
+def run_sweep(
+    base: ModelParams = ModelParams(),
+    outputs: Sequence[str] = SWEEP_OUTPUTS,
+    workers: Optional[int] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    on_chunk: Optional[Callable[[int, int], None]] = None,
+    cancel: Optional[threading.Event] = None,
+    **columns,
+) -> SweepResult:
+    """以行程池計算參數掃描
+
+    columns 與 `evaluate_batch()` 相同，可 broadcasting（例如二維網格），
+    輸出形狀即為 broadcasting 後的形狀。on_chunk(done, total) 於每塊完成後呼叫；
+    cancel 被設定後不再派發新分塊，已派發者盡快結束。
+    """
+    names = list(columns)
+    arrays = np.broadcast_arrays(*(np.asarray(columns[k], dtype=float) for k in names)) if names else []
+    shape = arrays[0].shape if names else ()
+    total = int(np.prod(shape))
+    t0 = time.perf_counter()
+    with SweepPool(base, names, outputs, capacity=total, workers=workers, chunk_size=chunk_size) as pool:
+        out, completed = pool.evaluate({k: a.reshape(-1) for k, a in zip(names, arrays)}, on_chunk, cancel)
+    return SweepResult(
+        outputs={name: v.reshape(shape) for name, v in out.items()},
+        completed=completed.reshape(shape),
+        shape=shape,
+        cancelled=not completed.all(),
+        seconds=time.perf_counter() - t0,
+        workers=pool.workers,
+    )
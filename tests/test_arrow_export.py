@@ -0,0 +1,88 @@
+"""arrow_export：Parquet / Arrow IPC 寫出後以 pyarrow 讀回，比對欄位型別與數值"""
+import threading
+from dataclasses import fields
+
+import numpy as np
+import pytest
+
+from arrow_export import ParquetResultWriter, sweep_table, to_parquet_bytes, write_table
+from batch import CASHFLOW_PERIODS, evaluate_batch
+from engine import ModelParams, evaluate
+from sweep import run_sweep
+
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+
+PARAM_NAMES = [f.name for f in fields(ModelParams)]
+
+
+def _expected_names(details, inputs=()):
+    return [*inputs, "GFA", *details, "Total_Cost", "Total_Value", "Landlord_Ratio", "Risk_Rate",
+            "IRR", "IRR_Converged", *(f"Cashflow_{t}" for t in CASHFLOW_PERIODS)]
+
+
+def test_single_result_round_trip():
+    p = ModelParams()
+    res = evaluate(p)
+    table = pq.read_table(pa.BufferReader(to_parquet_bytes(res, p)))
+
+    assert table.num_rows == 1
+    assert table.column_names == _expected_names(res["Details"], PARAM_NAMES)
+    for f in table.schema:
+        assert f.type == (pa.bool_() if f.name == "IRR_Converged" else pa.float64()), f.name
+    row = table.to_pylist()[0]
+    for name in PARAM_NAMES:
+        assert row[name] == float(getattr(p, name))
+    for name, v in res["Details"].items():
+        assert row[name] == v
+    for name in ("GFA", "Total_Cost", "Total_Value", "Landlord_Ratio", "Risk_Rate", "IRR"):
+        assert row[name] == res[name]
+    assert row["IRR_Converged"] is True
+    assert [row[f"Cashflow_{t}"] for t in CASHFLOW_PERIODS] == [res["Cashflow"][t] for t in CASHFLOW_PERIODS]
+
+
+def test_batch_writer_round_trip(tmp_path):
+    prices = np.linspace(40, 80, 50)
+    costs = np.array([15.0, 20.0, 25.0])
+    path = tmp_path / "batch.parquet"
+    with ParquetResultWriter(str(path), row_group_size=40) as writer:
+        for chunk in np.array_split(prices, 4):
+            grid = dict(price_unit_sale=chunk[:, None], final_unit_cost=costs[None, :])
+            writer.write(evaluate_batch(ModelParams(), **grid), grid)
+    ref = evaluate_batch(ModelParams(), price_unit_sale=prices[:, None], final_unit_cost=costs[None, :])
+
+    pf = pq.ParquetFile(path)
+    assert writer.rows == pf.metadata.num_rows == prices.size * costs.size
+    assert [pf.metadata.row_group(i).num_rows for i in range(pf.num_row_groups)] == [40, 40, 40, 30]
+    table = pf.read()
+    assert table.column_names == _expected_names(ref.Details, ["price_unit_sale", "final_unit_cost"])
+    np.testing.assert_array_equal(table["price_unit_sale"].to_numpy(), np.repeat(prices, costs.size))
+    np.testing.assert_array_equal(table["final_unit_cost"].to_numpy(), np.tile(costs, prices.size))
+    for name in ("Total_Cost", "Landlord_Ratio", "IRR"):
+        np.testing.assert_array_equal(table[name].to_numpy(), getattr(ref, name).reshape(-1))
+    np.testing.assert_array_equal(table["IRR_Converged"].to_numpy(zero_copy_only=False), ref.IRR_Converged.reshape(-1))
+    np.testing.assert_array_equal(table["Cashflow_T4"].to_numpy(), ref.Cashflow[..., 4].reshape(-1))
+
+
+@pytest.mark.parametrize("suffix", [".parquet", ".arrow"])
+def test_sweep_round_trip(tmp_path, suffix):
+    inputs = dict(price_unit_sale=np.linspace(40, 80, 6)[None, :], final_unit_cost=np.array([15.0, 20.0])[:, None])
+    res = run_sweep(ModelParams(), ("IRR", "Landlord_Ratio"), workers=1, **inputs)
+    path = str(tmp_path / f"sweep{suffix}")
+    write_table(sweep_table(res, inputs), path)
+    table = pq.read_table(path) if suffix == ".parquet" else pa.ipc.open_file(path).read_all()
+
+    assert table.column_names == ["price_unit_sale", "final_unit_cost", "IRR", "Landlord_Ratio"]
+    assert all(f.type == pa.float64() for f in table.schema)
+    np.testing.assert_array_equal(table["IRR"].to_numpy(), res["IRR"].reshape(-1))
+    np.testing.assert_array_equal(table["final_unit_cost"].to_numpy(), np.repeat([15.0, 20.0], 6))
+
+
+def test_cancelled_sweep_adds_completed_column():
+    cancel = threading.Event()
+    res = run_sweep(ModelParams(), ("IRR",), workers=1, chunk_size=4, on_chunk=lambda done, total: cancel.set(),
+                    cancel=cancel, price_unit_sale=np.linspace(40, 80, 10))
+    table = sweep_table(res)
+    assert table.column_names == ["IRR", "Completed"]
+    assert table["Completed"].to_pylist() == [True] * 4 + [False] * 6
+    assert table["IRR"].null_count == 0 and np.isnan(table["IRR"].to_numpy()[4:]).all()
@@ -0,0 +1,65 @@
+"""batch：`evaluate_batch()` 與逐筆 `engine.evaluate()` 的一致性"""
+import math
+
+import numpy as np
+import pytest
+
+from batch import BATCH_FIELDS, evaluate_batch
+from engine import CONST_TYPES, PARKING_GFA_PER_SPACE, ModelParams, evaluate
+
+# 基地面積 = 總樓地板面積，方便把總樓地板放在風險費率級距的邊界上
+FLAT = dict(far_base_exist=1.0, bonus_multiplier=1.0, coeff_gfa=1.0)
+
+CASES = {
+    "預設": {},
+    "面積 = 2500": dict(base_area=2500.0, **FLAT),
+    "面積 2500 之後": dict(base_area=np.nextafter(2500.0, np.inf), **FLAT),
+    "面積 = 7500": dict(base_area=7500.0, **FLAT),
+    "面積 7500 之後": dict(base_area=np.nextafter(7500.0, np.inf), **FLAT),
+    "人數 29": dict(num_owners=29),
+    "人數 30": dict(num_owners=30),
+    "人數 100": dict(num_owners=100),
+    "人數 101": dict(num_owners=101),
+    "無車位": dict(base_area=PARKING_GFA_PER_SPACE - 1.0, **FLAT),
+    "恰一個車位": dict(base_area=float(PARKING_GFA_PER_SPACE), **FLAT),
+    "IRR 無解": dict(price_unit_sale=5.0),
+    **{f"建材 {grade}": dict(final_unit_cost=16.23 * (1 + coeff)) for grade, coeff in CONST_TYPES.items()},
+}
+
+
+def _assert_matches(row: dict, ref: dict) -> None:
+    for key in ("GFA", "Risk_Rate", "Total_Cost", "Total_Value", "Landlord_Ratio"):
+        assert row[key] == pytest.approx(ref[key], rel=1e-12), key
+    assert row["Details"].keys() == ref["Details"].keys()
+    for key, value in ref["Details"].items():
+        assert row["Details"][key] == pytest.approx(value, rel=1e-12, abs=1e-9), key
+    for key, value in ref["Cashflow"].items():
+        assert row["Cashflow"][key] == pytest.approx(value, rel=1e-12), key
+    if math.isnan(ref["IRR"]):
+        assert math.isnan(row["IRR"])
+    else:
+        assert row["IRR"] == pytest.approx(ref["IRR"], rel=1e-9)
+
+
+@pytest.mark.parametrize("case", list(CASES))
+def test_scalar_matches_engine(case):
+    p = ModelParams(**CASES[case])
+    res = evaluate_batch(p)
+    _assert_matches(res.row(()), evaluate(p))
+
+
+def test_stacked_rows_match_engine():
+    params = [ModelParams(**c) for c in CASES.values()]
+    cols = {name: np.array([getattr(p, name) for p in params], dtype=float) for name in BATCH_FIELDS}
+    res = evaluate_batch(**cols)
+    for i, p in enumerate(params):
+        _assert_matches(res.row(i), evaluate(p))
+
+
+def test_bands_and_parking_are_exercised():
+    rates = {case: evaluate(ModelParams(**c))["Risk_Rate"] for case, c in CASES.items()}
+    assert rates["面積 = 2500"] != rates["面積 2500 之後"]
+    assert rates["面積 = 7500"] != rates["面積 7500 之後"]
+    assert rates["人數 29"] != rates["人數 30"] and rates["人數 100"] != rates["人數 101"]
+    assert evaluate(ModelParams(**CASES["無車位"]))["Total_Value"] == pytest.approx(
+        (PARKING_GFA_PER_SPACE - 1.0) * ModelParams().coeff_sale * ModelParams().price_unit_sale)
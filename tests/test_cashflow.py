@@ -0,0 +1,73 @@
+"""cashflow：S 曲線撥付、貸款利息與 XIRR"""
+import datetime
+
+import numpy as np
+import pytest
+
+from batch import evaluate_batch
+from cashflow import monthly_batch, month_offsets, s_curve, xirr_batch
+from engine import ModelParams
+
+# (預售比例, 模型參數)
+SETTINGS = {
+    "無貸款無預售": (0.0, dict(loan_ratio=0.0)),
+    "預設": (0.15, {}),
+    "高貸款": (0.3, dict(loan_ratio=0.8, loan_rate=0.05, dev_months=30)),
+}
+
+
+@pytest.mark.parametrize("months", [1, 7, 36])
+def test_s_curve_drawdown_sums_to_one(months):
+    steps = np.diff(s_curve(np.arange(months + 1) / months))
+    assert (steps >= 0).all()
+    assert steps.sum() == pytest.approx(1.0, abs=1e-15)
+
+
+def test_drawdown_sums_to_construction_cost():
+    res = monthly_batch(ModelParams(), deposit_pct=0.0, with_irr=False, loan_ratio=0.0)
+    ref = evaluate_batch(ModelParams(), with_irr=False, loan_ratio=0.0)
+    m = int(res.months[0])
+    # 無貸款、無預售：第 1..M 月的流出即工程費與拆遷安置費
+    final_in = ref.Total_Value - ref.Details["稅捐"] - ref.Details["風險管理費"] - ref.Details["人事管理費"] \
+        - ref.Details["銷售管理費"]
+    spent = -(res.cashflow[0, 1:m + 1].sum() - final_in)
+    assert spent == pytest.approx(ref.Details["工程費(含拆除)"] + ref.Details["拆遷安置費"], rel=1e-12)
+
+
+@pytest.mark.parametrize("deposit_pct, overrides", SETTINGS.values(), ids=SETTINGS.keys())
+def test_cashflow_nets_to_value_less_total_cost(deposit_pct, overrides):
+    res = monthly_batch(ModelParams(), deposit_pct=deposit_pct, with_irr=False, **overrides)
+    ref = evaluate_batch(ModelParams(), with_irr=False, **overrides)
+    # 貸款於交屋時清償，淨現金流 = 總銷 − 共同負擔（以逐月利息取代原模型的利息估算）
+    expected = ref.Total_Value - (ref.Total_Cost - ref.Details["貸款利息"]) - res.interest[0]
+    assert res.cashflow[0].sum() == pytest.approx(expected, rel=1e-12)
+
+
+@pytest.mark.parametrize("deposit_pct, overrides", SETTINGS.values(), ids=SETTINGS.keys())
+def test_interest_accrues_on_opening_balance(deposit_pct, overrides):
+    res = monthly_batch(ModelParams(), deposit_pct=deposit_pct, with_irr=False, **overrides)
+    p = ModelParams(**overrides)
+    m = int(res.months[0])
+    opening = res.loan_balance[0, :m]  # 第 1..M 月的期初餘額
+    assert res.interest[0] == pytest.approx((opening * p.loan_rate / 12).sum(), rel=1e-12)
+    assert res.peak_loan[0] == pytest.approx(opening.max(), rel=1e-12)
+    assert (res.loan_balance[0, m:] == 0).all()
+    if p.loan_ratio > 0:
+        assert res.interest[0] > 0
+
+
+def test_xirr_of_whole_year():
+    years = month_offsets(12, datetime.date(2026, 1, 1))
+    assert years[-1] == 1.0
+    cf = np.zeros((1, 13))
+    cf[0, 0], cf[0, -1] = -1000.0, 1100.0
+    assert xirr_batch(cf, years, np.array([0.05]))[0] == pytest.approx(0.1, rel=1e-12)
+
+
+def test_xirr_matches_known_series():
+    # Excel XIRR 說明文件範例，結果 37.34%（Excel 顯示 0.373362535，其收斂容差約 1e-8）
+    dates = [datetime.date(2008, 1, 1), datetime.date(2008, 3, 1), datetime.date(2008, 10, 30),
+             datetime.date(2009, 2, 15), datetime.date(2009, 4, 1)]
+    values = np.array([[-10000.0, 2750.0, 4250.0, 3250.0, 2750.0]])
+    years = np.array([(d - dates[0]).days / 365.0 for d in dates])
+    assert xirr_batch(values, years, np.array([0.1]))[0] == pytest.approx(0.373362535, abs=1e-8)
@@ -0,0 +1,49 @@
+"""comparables：逐欄標準化與相似案件搜尋"""
+import numpy as np
+import pytest
+
+from cases import IMPLIED_GFA_COEFF, CaseStore
+from comparables import FEATURES, ComparableIndex, ProjectProfile
+
+
+def _store(floors=""):
+    store = CaseStore()
+    store.add_cases(
+        dict(case_key=f"案件{i}", district="板橋區", developer="建設公司", area_ping=area, floors=floors,
+             total_cost=area * IMPLIED_GFA_COEFF * cost * 10000)
+        for i, (area, cost) in enumerate([(500.0, 20.0), (800.0, 25.0), (1200.0, 22.0), (2000.0, 30.0)]))
+    return store
+
+
+def test_all_nan_column_does_not_disable_other_scaling():
+    snap = _store().snapshot()
+    index = ComparableIndex(_store())
+    area, floors, developer, cost = map(FEATURES.index, ("area_ping", "floors_above", "developer", "unit_cost"))
+    # 樓層整欄缺值：中心 0、尺度 1；實施主體無變異：尺度 1
+    assert index.center[floors] == 0.0 and index.scale[floors] == 1.0
+    assert index.scale[developer] == 1.0
+    # 其餘欄位照常以平均與標準差標準化
+    assert index.center[area] == pytest.approx(np.log(snap.area).mean())
+    assert index.scale[area] == pytest.approx(np.log(snap.area).std())
+    assert index.center[cost] == pytest.approx((snap.unit_cost / 10000).mean())
+    assert index.scale[cost] == pytest.approx((snap.unit_cost / 10000).std())
+    assert np.isfinite(index.center).all() and (index.scale > 0).all()
+
+
+def test_partially_missing_column_uses_known_values():
+    store = _store()
+    store.add_cases([dict(case_key="案件9", district="板橋區", developer="更新會", area_ping=900.0, floors="12F+B2",
+                          total_cost=900.0 * IMPLIED_GFA_COEFF * 24 * 10000)])
+    index = ComparableIndex(store)
+    floors = FEATURES.index("floors_above")
+    assert index.center[floors] == 12.0 and index.scale[floors] == 1.0
+    assert index.scale[FEATURES.index("developer")] == pytest.approx(0.4)
+
+
+def test_search_finds_identical_case_first():
+    index = ComparableIndex(_store())
+    ids, dist = index.search(ProjectProfile(area_ping=1200.0, floors_above=np.nan, developer="建設公司",
+                                            unit_cost=22.0), k=2)
+    assert dist[0] == pytest.approx(0.0, abs=1e-12)
+    assert index.store.cases_by_id(ids[:1])[0]["case_key"] == "案件2"
+    assert dist[1] > 0
@@ -0,0 +1,78 @@
+"""excel_stream：分頁續寫、標題列、數值 / 字串儲存格與 XML 跳脫（以 openpyxl 讀回）"""
+import io
+
+import numpy as np
+import openpyxl
+import pandas as pd
+import pytest
+
+import excel_stream
+from excel_stream import XlsxStreamWriter, sheet_name, write_excel
+
+SPECIAL = ['<a href="x">', "R&D", "it's", "a > b", "中文\x01"]
+
+
+@pytest.fixture
+def small_blocks(monkeypatch):
+    # 每塊 XML 只轉 3 列，讓分塊與分頁邊界交錯
+    monkeypatch.setattr(excel_stream, "_BLOCK_ROWS", 3)
+
+
+def _read(buf):
+    buf.seek(0)
+    wb = openpyxl.load_workbook(buf, read_only=True)
+    return {ws.title: [list(r) for r in ws.iter_rows(values_only=True)] for ws in wb.worksheets}
+
+
+def test_rows_past_limit_continue_on_new_sheet(small_blocks):
+    n = 23
+    df = pd.DataFrame({
+        "序號": np.arange(n),
+        "IRR": np.linspace(0.0, 0.5, n),
+        "名稱": [SPECIAL[i % len(SPECIAL)] for i in range(n)],
+    })
+    df.loc[4, "IRR"] = np.nan
+    df.loc[5, "IRR"] = np.inf
+    buf = io.BytesIO()
+    # 每頁 10 列（含標題）→ 9 + 9 + 5 列資料
+    write_excel({"抽樣明細": df, "成本": {"項目": ["a"], "金額": [1.5]}}, buf, chunk_rows=7, max_rows=10)
+    book = _read(buf)
+
+    assert list(book) == ["抽樣明細", "抽樣明細 (2)", "抽樣明細 (3)", "成本"]
+    parts = [book["抽樣明細"], book["抽樣明細 (2)"], book["抽樣明細 (3)"]]
+    assert [len(p) for p in parts] == [10, 10, 6]
+    for p in parts:
+        assert p[0] == ["序號", "IRR", "名稱"]
+    rows = [r for p in parts for r in p[1:]]
+    assert [r[0] for r in rows] == list(range(n))
+    for i, (seq, irr, name) in enumerate(rows):
+        if i in (4, 5):
+            assert irr is None  # NaN / inf 為空白儲存格
+        else:
+            assert irr == df["IRR"][i]
+        assert name == SPECIAL[i % len(SPECIAL)].replace("\x01", "")
+    assert book["成本"] == [["項目", "金額"], ["a", 1.5]]
+
+
+def test_special_characters_in_headers_and_sheet_names():
+    buf = io.BytesIO()
+    with XlsxStreamWriter(buf, max_rows=3) as writer:
+        writer.write("A&B <1>", pd.DataFrame({'"x" & <y>': ["<&>", "ok", None], "旗標": pd.array([True, False, None], dtype="boolean")}))
+    book = _read(buf)
+    assert list(book) == ["A&B <1>", "A&B <1> (2)"]
+    assert book["A&B <1>"] == [['"x" & <y>', "旗標"], ["<&>", True], ["ok", False]]
+    assert book["A&B <1> (2)"] == [['"x" & <y>', "旗標"], [None, None]]
+
+
+def test_sheet_chunks_must_be_contiguous():
+    with XlsxStreamWriter(io.BytesIO()) as writer:
+        writer.write("a", {"x": [1]})
+        writer.write("b", {"x": [1]})
+        with pytest.raises(ValueError):
+            writer.write("a", {"x": [2]})
+
+
+def test_sheet_name_sanitised_and_truncated():
+    assert sheet_name("a/b:c") == "a_b_c"
+    assert len(sheet_name("x" * 40, part=12)) == 31
+    assert sheet_name("x" * 40, part=12).endswith(" (12)")
@@ -0,0 +1,34 @@
+import numpy as np
+
+from engine import ModelParams, evaluate
+from goalseek import METRIC_ATOL, goal_seek_batch
+
+
+def test_target_on_step_is_not_converged():
+    # 獎勵倍數約 0.26 時總樓地板跨過 420 坪，車位數取整使地主分回比由 54.98% 跳至 55.37%
+    res = goal_seek_batch(ModelParams(), "bonus_multiplier", "Landlord_Ratio", 0.55)
+    assert not res.converged
+    assert np.isfinite(res.value)
+    assert abs(res.achieved - 0.55) > METRIC_ATOL["Landlord_Ratio"]
+    assert res.achieved == evaluate(ModelParams(bonus_multiplier=float(res.value)))["Landlord_Ratio"]
+
+
+def test_target_on_risk_fee_tier_is_not_converged():
+    # 獎勵倍數約 1.543 時跨入下一級風險費率（12% → 12.5%），地主分回比由 58.10% 跳至 57.96%
+    res = goal_seek_batch(ModelParams(), "bonus_multiplier", "Landlord_Ratio", 0.5803, bounds=(1.5, 1.55))
+    assert not res.converged
+    assert abs(res.achieved - 0.5803) > 1e-4
+    below = evaluate(ModelParams(bonus_multiplier=float(res.value) - 1e-6))
+    above = evaluate(ModelParams(bonus_multiplier=float(res.value) + 1e-6))
+    assert below["Risk_Rate"] != above["Risk_Rate"]
+
+
+def test_continuous_target_converges():
+    res = goal_seek_batch(ModelParams(), "price_unit_sale", "IRR", [0.10, 0.12, 0.15])
+    assert res.converged.all()
+    np.testing.assert_allclose(res.achieved, [0.10, 0.12, 0.15], atol=METRIC_ATOL["IRR"])
+
+
+def test_out_of_range_has_no_value():
+    res = goal_seek_batch(ModelParams(), "price_unit_sale", "IRR", 50.0)
+    assert not res.converged and np.isnan(res.value)
@@ -0,0 +1,49 @@
+"""gradients：數值與 `evaluate_batch()` 一致、偏導數與中央差分一致"""
+import numpy as np
+import pytest
+
+from batch import evaluate_batch
+from engine import ModelParams
+from gradients import GRADIENT_METRICS, evaluate_gradients
+from sensitivity import PARAM_LABELS
+
+# 遠離風險費率與車位數跳躍點的幾組參數
+POINTS = {
+    "預設": {},
+    "高單價": dict(price_unit_sale=120.0, final_unit_cost=22.0),
+    "高貸款": dict(loan_ratio=0.8, loan_rate=0.04, num_owners=45),
+}
+
+
+@pytest.mark.parametrize("overrides", POINTS.values(), ids=POINTS.keys())
+def test_values_match_evaluate_batch(overrides):
+    g = evaluate_gradients(ModelParams(), **overrides)
+    r = evaluate_batch(ModelParams(), **overrides)
+    for metric in GRADIENT_METRICS:
+        np.testing.assert_allclose(g.values[metric], getattr(r, metric), rtol=1e-12)
+
+
+@pytest.mark.parametrize("overrides", POINTS.values(), ids=POINTS.keys())
+def test_grads_match_central_differences(overrides):
+    base = ModelParams()
+    g = evaluate_gradients(base, **overrides)
+    for j, name in enumerate(g.fields):
+        x = float(overrides.get(name, getattr(base, name)))
+        h = 1e-6 * max(abs(x), 1.0)
+        up = evaluate_batch(base, **{**overrides, name: x + h})
+        down = evaluate_batch(base, **{**overrides, name: x - h})
+        for metric in GRADIENT_METRICS:
+            fd = (getattr(up, metric) - getattr(down, metric)) / (2 * h)
+            scale = abs(g.values[metric]) / max(abs(x), 1.0)
+            np.testing.assert_allclose(g.grads[metric][..., j], fd, rtol=1e-5, atol=1e-6 * scale,
+                                       err_msg=f"{metric} / {name}")
+
+
+def test_batched_inputs_match_pointwise():
+    prices = np.array([60.0, 80.0, 100.0])
+    g = evaluate_gradients(ModelParams(), price_unit_sale=prices)
+    assert g.grads["IRR"].shape == (3, len(PARAM_LABELS))
+    for i, p in enumerate(prices):
+        one = evaluate_gradients(ModelParams(), price_unit_sale=p)
+        for metric in GRADIENT_METRICS:
+            np.testing.assert_allclose(g.grads[metric][i], one.grads[metric], rtol=1e-12)
@@ -0,0 +1,47 @@
+"""irr：與 `npf.irr`（numpy-financial 1.0）的固定結果對照"""
+import math
+
+import numpy as np
+import pytest
+
+from irr import irr, irr_batch
+
+# (現金流, npf.irr 結果)；多根時 npf.irr 取最接近 0 的報酬率
+NPF_CASES = {
+    "一次變號": ([-100, 39, 59, 55, 20], 0.2809484212),
+    "一次變號、負報酬": ([-100, 0, 0, 74], -0.0954958303),
+    "一次變號、尾端流入": ([-100, 100, 0, 7], 0.0620584856),
+    "兩次變號": ([-100, 100, 0, -7], -0.0832996662),
+    "兩次變號、兩根 10% / 20%": ([-100, 230, -132], 0.10),
+    "三次變號": ([-5, 10.5, 1, -8, 1], 0.0885983385),
+}
+
+# npf.irr 回傳 NaN 者（原版 app 於此情形記為 0）
+NO_ROOT_CASES = {
+    "全部流入": [1, 2, 3],
+    "全部流出": [-1, -2, -3],
+    "全為 0": [0, 0, 0],
+}
+
+
+@pytest.mark.parametrize("cashflow, expected", NPF_CASES.values(), ids=NPF_CASES.keys())
+def test_matches_npf_irr(cashflow, expected):
+    assert irr(cashflow) == pytest.approx(expected, rel=1e-9)
+    rate, conv = irr_batch(np.array([cashflow], dtype=float))
+    assert conv[0]
+    assert rate[0] == pytest.approx(expected, rel=1e-9)
+
+
+@pytest.mark.parametrize("cashflow", NO_ROOT_CASES.values(), ids=NO_ROOT_CASES.keys())
+def test_no_sign_change_is_nan(cashflow):
+    assert math.isnan(irr(cashflow))
+    rate, conv = irr_batch(np.array([cashflow], dtype=float))
+    assert np.isnan(rate[0]) and not conv[0]
+
+
+def test_batch_mixes_cases_row_by_row():
+    flows = [cf for cf, _ in NPF_CASES.values() if len(cf) == 5] + [[1.0, 2.0, 3.0, 4.0, 5.0]]
+    rate, conv = irr_batch(np.array(flows, dtype=float).reshape(len(flows), 1, 5))
+    assert rate.shape == conv.shape == (len(flows), 1)
+    for row, cf in zip(rate[:, 0], flows):
+        np.testing.assert_equal(row, irr(cf))
@@ -0,0 +1,31 @@
+import numpy as np
+
+from cases import CaseFilter, CaseStore
+from engine import STATISTICS_AVG, ModelParams
+from montecarlo import CASE_RATE_FIELDS, Fixed, Triangular, default_distributions, sample_chunk
+
+
+def test_rate_ranges_skip_excluded_cases():
+    # 案件5（原地安置）的拆遷補償為 0 且不列入統計，不應成為三角分布的下限
+    dists = default_distributions(ModelParams())
+    assert dists["demolition_pct"] == Triangular(2.0, ModelParams().demolition_pct, 5.75)
+
+
+def test_rate_ranges_follow_filter_and_model_rates():
+    stats = CaseStore.open_default().aggregate(CaseFilter(developer="更新會"))
+    base = ModelParams(**stats.model_rates(STATISTICS_AVG))
+    dists = default_distributions(base, stats=stats)
+    for name in CASE_RATE_FIELDS:
+        if stats.min[name] is not None:
+            assert dists[name] == Triangular(stats.min[name], getattr(base, name), stats.max[name])
+    # 更新會的稅捐皆不列入統計：無樣本時固定為模型套用的費率
+    assert dists["tax_pct"] == Fixed(base.tax_pct)
+
+
+def test_sampled_rates_stay_within_filtered_range():
+    stats = CaseStore.open_default().aggregate(CaseFilter(developer="建設公司"))
+    base = ModelParams(**stats.model_rates(STATISTICS_AVG))
+    draws = sample_chunk(default_distributions(base, stats=stats), np.random.SeedSequence(0), 10_000)
+    for name in CASE_RATE_FIELDS:
+        assert draws[name].min() >= stats.min[name]
+        assert draws[name].max() <= stats.max[name]
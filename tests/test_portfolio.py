@@ -0,0 +1,55 @@
+"""portfolio：分塊間型別漂移的回歸測試"""
+import numpy as np
+import pandas as pd
+import pytest
+
+import portfolio
+
+
+def _drift_sites() -> pd.DataFrame:
+    # 第一塊 note 全為空白（會被推斷為 float），第二塊起才有文字；lot 數字與文字混雜
+    return pd.DataFrame({
+        "name": [f"基地{i}" for i in range(12)],
+        "note": [None] * 5 + ["待議"] * 7,
+        "lot": ["101"] * 5 + ["102-1"] * 7,
+        "base_area": [300.0] * 5 + [None] + [450.0] * 6,
+        "price_unit_sale": [60.0] * 12,
+    })
+
+
+@pytest.mark.parametrize("ext", [".csv", ".parquet", ".xlsx"])
+def test_type_drift_between_chunks(tmp_path, ext):
+    if ext == ".parquet" and portfolio.pq is None:
+        pytest.skip("需要 pyarrow")
+    src = tmp_path / "sites.csv"
+    _drift_sites().to_csv(src, index=False)
+    dst = tmp_path / f"out{ext}"
+
+    stats = portfolio.run_portfolio(str(src), str(dst), chunk_size=5)
+
+    assert stats["rows"] == 12
+    if ext == ".parquet":
+        out = pd.read_parquet(dst)
+    elif ext == ".csv":
+        out = pd.read_csv(dst, encoding="utf-8-sig", dtype={"lot": str})
+    else:
+        out = pd.read_excel(dst, dtype={"lot": str})
+    assert out["note"].isna().sum() == 5
+    assert list(out["note"].dropna()) == ["待議"] * 7
+    assert list(out["lot"]) == ["101"] * 5 + ["102-1"] * 7
+    assert np.isfinite(out["IRR"].astype(float)).all()
+
+
+def test_parquet_input_with_late_values(tmp_path):
+    if portfolio.pq is None:
+        pytest.skip("需要 pyarrow")
+    src = tmp_path / "sites.parquet"
+    _drift_sites().to_parquet(src, index=False)
+    dst = tmp_path / "out.parquet"
+
+    portfolio.run_portfolio(str(src), str(dst), chunk_size=5)
+
+    out = pd.read_parquet(dst)
+    assert len(out) == 12
+    assert out["base_area"].dtype == np.float64
+    assert out["base_area"].isna().sum() == 1
@@ -0,0 +1,39 @@
+"""risk_fee：預設費率表與原版 if/elif 查表在各級距邊界的結果"""
+import numpy as np
+import pytest
+
+from batch import risk_fee_rate_batch
+from engine import get_risk_fee_rate
+from risk_fee import DEFAULT_SCHEDULE_PATH, load_schedule
+
+# 原版表3-1：面積 ≤2500 / ≤7500 / 其餘 × 人數 <30 / ≤100 / 其餘
+AFTER_2500 = np.nextafter(2500.0, np.inf)
+AFTER_7500 = np.nextafter(7500.0, np.inf)
+GFA_EDGES = {0.0: 0, 2500.0: 0, AFTER_2500: 1, 7500.0: 1, AFTER_7500: 2, 1e9: 2, np.nan: 2}
+OWNER_EDGES = {0: 0, 29: 0, np.nextafter(30.0, -np.inf): 0, 30: 1, 100: 1, np.nextafter(100.0, np.inf): 2,
+               101: 2, np.nan: 2}
+ORIGINAL_RATES = [
+    [0.12, 0.125, 0.13],
+    [0.125, 0.13, 0.135],
+    [0.13, 0.135, 0.14],
+]
+
+EDGE_CASES = [(g, o, ORIGINAL_RATES[i][j]) for g, i in GFA_EDGES.items() for o, j in OWNER_EDGES.items()]
+
+
+@pytest.mark.parametrize("gfa, owners, expected", EDGE_CASES)
+def test_default_schedule_matches_original_table(gfa, owners, expected):
+    schedule = load_schedule(DEFAULT_SCHEDULE_PATH)
+    assert schedule.rate(gfa, owners) == expected
+    assert schedule.rate_batch(gfa, owners) == expected
+    assert get_risk_fee_rate(gfa, owners) == expected
+
+
+def test_batch_lookup_over_all_edges():
+    gfa, owners, expected = (np.array(col, dtype=float) for col in zip(*EDGE_CASES))
+    np.testing.assert_array_equal(risk_fee_rate_batch(gfa, owners), expected)
+    # broadcasting：面積 × 人數網格
+    g = np.array(list(GFA_EDGES))
+    o = np.array(list(OWNER_EDGES), dtype=float)
+    grid = np.array(ORIGINAL_RATES)[np.ix_(list(GFA_EDGES.values()), list(OWNER_EDGES.values()))]
+    np.testing.assert_array_equal(risk_fee_rate_batch(g[:, None], o[None, :]), grid)
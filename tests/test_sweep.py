@@ -0,0 +1,79 @@
+import threading
+from multiprocessing import shared_memory
+
+import numpy as np
+import pytest
+
+from batch import evaluate_batch
+from engine import ModelParams
+from montecarlo import run_monte_carlo
+from sweep import SharedArrays, SweepPool, run_sweep
+
+
+def test_allocate_names_are_unique():
+    layout = {"x": ((4,), "f8")}
+    a = SharedArrays.allocate(layout)
+    b = SharedArrays.allocate(layout)
+    try:
+        assert a.spec["x"][0] != b.spec["x"][0]
+    finally:
+        for shared in (a, b):
+            shared.close()
+            shared.unlink()
+
+
+def test_parallel_sweep_matches_batch():
+    prices = np.linspace(40, 80, 30)
+    costs = np.linspace(20, 40, 20)
+    res = run_sweep(ModelParams(), ("IRR", "Landlord_Ratio"), workers=2, chunk_size=100,
+                    price_unit_sale=prices[None, :], final_unit_cost=costs[:, None])
+    ref = evaluate_batch(ModelParams(), price_unit_sale=prices[None, :], final_unit_cost=costs[:, None])
+    assert res.workers == 2 and res.completed.all()
+    np.testing.assert_allclose(res["IRR"], ref.IRR)
+    np.testing.assert_allclose(res["Landlord_Ratio"], ref.Landlord_Ratio)
+
+
+def test_monte_carlo_independent_of_workers():
+    serial = run_monte_carlo(ModelParams(), 20_000, chunk_size=5_000, workers=1)
+    parallel = run_monte_carlo(ModelParams(), 20_000, chunk_size=5_000, workers=2)
+    assert serial.percentiles() == parallel.percentiles()
+    assert serial.n_irr_ok == parallel.n_irr_ok
+    np.testing.assert_array_equal(serial.joint.counts, parallel.joint.counts)
+
+
+def test_pool_reuse_matches_batch():
+    prices = np.linspace(40, 80, 500)
+    with SweepPool(ModelParams(), ["price_unit_sale"], ("IRR", "Total_Cost"), capacity=500, workers=2,
+                   chunk_size=37) as pool:
+        assert pool.workers == 2
+        for n in (500, 123):
+            out, completed = pool.evaluate({"price_unit_sale": prices[:n]})
+            ref = evaluate_batch(ModelParams(), price_unit_sale=prices[:n])
+            assert completed.all() and len(completed) == n
+            np.testing.assert_array_equal(out["IRR"], ref.IRR)
+            np.testing.assert_array_equal(out["Total_Cost"], ref.Total_Cost)
+
+
+def test_cancel_leaves_unfinished_rows_nan():
+    prices = np.linspace(40, 80, 2_000)
+    cancel = threading.Event()
+    res = run_sweep(ModelParams(), ("IRR", "Landlord_Ratio"), workers=2, chunk_size=50,
+                    on_chunk=lambda done, total: cancel.set(), cancel=cancel, price_unit_sale=prices)
+    ref = evaluate_batch(ModelParams(), price_unit_sale=prices)
+    assert res.cancelled
+    assert 0 < res.completed.sum() < len(prices)
+    assert res.completed.reshape(-1, 50).all(axis=1).sum() == res.completed.sum() // 50  # 以分塊為單位
+    for name in ("IRR", "Landlord_Ratio"):
+        assert np.isnan(res[name][~res.completed]).all()
+        np.testing.assert_array_equal(res[name][res.completed], getattr(ref, name)[res.completed])
+
+
+def test_close_unlinks_shared_memory():
+    pool = SweepPool(ModelParams(), ["price_unit_sale"], ("IRR",), capacity=100, workers=2, chunk_size=10)
+    pool.evaluate({"price_unit_sale": np.linspace(40, 80, 100)})
+    names = [spec[0] for shared in (pool._shared_in, pool._shared_out) for spec in shared.spec.values()]
+    assert len(names) == 2
+    pool.close()
+    for name in names:
+        with pytest.raises(FileNotFoundError):
+            shared_memory.SharedMemory(name=name)